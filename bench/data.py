@@ -0,0 +1,76 @@
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert
+
+from infrastructure.migrations import migrate
+from infrastructure.orm import Base, OrderItemORM, OrderORM, ProductORM
+
+
+@dataclass(frozen=True)
+class DatasetShape:
+    products: int = 10_000
+    orders: int = 20_000
+    min_items: int = 1
+    max_items: int = 5
+    days: int = 365
+    seed: int = 42
+
+
+def generate(engine, shape: DatasetShape, batch_size: int = 10_000):
+    """Fill an empty database with synthetic products and order history.
+
+    Stock is large enough for benchmarks to keep placing orders against it.
+    """
+    Base.metadata.create_all(engine)
+    migrate(engine)
+    rng = random.Random(shape.seed)
+    prices = [round(rng.uniform(0.5, 500), 2) for _ in range(shape.products)]
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    with engine.begin() as conn:
+        for start in range(0, shape.products, batch_size):
+            conn.execute(
+                insert(ProductORM),
+                [
+                    {
+                        "id": i + 1,
+                        "name": f"Product {i}",
+                        "quantity": 1_000_000,
+                        "price": prices[i],
+                    }
+                    for i in range(start, min(shape.products, start + batch_size))
+                ],
+            )
+
+        orders, items = [], []
+        for order_id in range(1, shape.orders + 1):
+            count = rng.randint(shape.min_items, shape.max_items)
+            picked = rng.sample(range(shape.products), min(count, shape.products))
+            total = 0.0
+            for index in picked:
+                quantity = rng.randint(1, 5)
+                total += quantity * prices[index]
+                items.append(
+                    {
+                        "order_id": order_id,
+                        "product_id": index + 1,
+                        "quantity_ordered": quantity,
+                        "price_at_purchase": prices[index],
+                    }
+                )
+            orders.append(
+                {
+                    "id": order_id,
+                    "total_cost": total,
+                    "item_count": len(picked),
+                    "created_at": now
+                    - timedelta(seconds=rng.uniform(0, shape.days * 86400)),
+                }
+            )
+            if len(orders) >= batch_size or order_id == shape.orders:
+                conn.execute(insert(OrderORM), orders)
+                conn.execute(insert(OrderItemORM), items)
+                orders, items = [], []
+        conn.exec_driver_sql("ANALYZE")
@@ -0,0 +1,57 @@
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy.orm import sessionmaker
+
+from domain.services import WarehouseService
+from infrastructure.database import PRESETS, create_warehouse_engine
+from infrastructure.orm import Base
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+
+WRITE_PRESETS = [name for name, settings in PRESETS.items() if not settings.read_only]
+
+
+def measure_commits(preset: str, commits: int, directory: Path) -> float:
+    engine = create_warehouse_engine(
+        f"sqlite:///{directory / f'{preset}.db'}", preset=preset
+    )
+    Base.metadata.create_all(engine)
+    service = WarehouseService(
+        SqlAlchemyUnitOfWork(sessionmaker(bind=engine, autoflush=False))
+    )
+    try:
+        started = time.perf_counter()
+        for i in range(commits):
+            service.create_product(name=f"Bench {i}", quantity=i, price=1.0)
+        return commits / (time.perf_counter() - started)
+    finally:
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare single-row commit throughput between engine presets"
+    )
+    parser.add_argument("--commits", type=int, default=2000)
+    parser.add_argument(
+        "--presets", nargs="+", default=WRITE_PRESETS, choices=WRITE_PRESETS
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {
+            preset: measure_commits(preset, args.commits, Path(tmp))
+            for preset in args.presets
+        }
+
+    baseline = results.get("default")
+    print(f"{'preset':<10} {'commits/sec':>12} {'speedup':>8}")
+    for preset, rate in results.items():
+        speedup = f"{rate / baseline:.1f}x" if baseline else "-"
+        print(f"{preset:<10} {rate:>12.0f} {speedup:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import argparse
+import http.client
+import json
+import random
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+SCENARIOS = ("get-product", "list-products", "create-order")
+
+
+def percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Client(threading.Thread):
+    def __init__(self, host, port, deadline, product_ids, mix, seed):
+        super().__init__(daemon=True)
+        self.conn = http.client.HTTPConnection(host, port, timeout=30)
+        self.deadline = deadline
+        self.product_ids = product_ids
+        self.mix = mix
+        self.rng = random.Random(seed)
+        self.latencies = []
+        self.errors = 0
+
+    def request(self, method, path, body=None):
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload else {}
+        self.conn.request(method, path, body=payload, headers=headers)
+        response = self.conn.getresponse()
+        response.read()
+        return response.status
+
+    def run(self):
+        while time.perf_counter() < self.deadline:
+            scenario = self.rng.choice(self.mix)
+            product_id = self.rng.choice(self.product_ids)
+            started = time.perf_counter()
+            try:
+                if scenario == "get-product":
+                    status = self.request("GET", f"/products/{product_id}")
+                elif scenario == "list-products":
+                    status = self.request("GET", "/products?limit=50")
+                else:
+                    status = self.request(
+                        "POST", "/orders", {"items": [[product_id, 1]]}
+                    )
+            except (OSError, http.client.HTTPException):
+                self.errors += 1
+                self.conn.close()
+                continue
+            self.latencies.append(time.perf_counter() - started)
+            if status >= 500:
+                self.errors += 1
+        self.conn.close()
+
+
+def seed_products(host, port, count):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    ids = []
+    for i in range(count):
+        body = json.dumps({"name": f"Load {i}", "quantity": 10**9, "price": 1.0})
+        conn.request("POST", "/products", body, {"Content-Type": "application/json"})
+        response = conn.getresponse()
+        ids.append(json.loads(response.read())["id"])
+    conn.close()
+    return ids
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load test a running 'main.py serve' instance"
+    )
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--products", type=int, default=20)
+    parser.add_argument(
+        "--mix",
+        nargs="+",
+        choices=SCENARIOS,
+        default=list(SCENARIOS),
+        help="Request types to pick from uniformly",
+    )
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    product_ids = seed_products(host, port, args.products)
+
+    deadline = time.perf_counter() + args.duration
+    clients = [
+        Client(host, port, deadline, product_ids, args.mix, seed)
+        for seed in range(args.clients)
+    ]
+    started = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = [sample for client in clients for sample in client.latencies]
+    errors = sum(client.errors for client in clients)
+    if not latencies:
+        print(f"No successful requests ({errors} errors)")
+        return
+    print(f"requests: {len(latencies)}  errors: {errors}  clients: {args.clients}")
+    print(f"throughput: {len(latencies) / elapsed:.0f} req/s")
+    print(
+        f"latency ms: p50={percentile(latencies, 0.50) * 1000:.2f} "
+        f"p99={percentile(latencies, 0.99) * 1000:.2f} "
+        f"mean={statistics.fmean(latencies) * 1000:.2f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import logging
+import os
+import queue
+import random
+import tempfile
+import time
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+
+from sqlalchemy.orm import sessionmaker
+
+from domain.services import WarehouseService
+from infrastructure.database import create_warehouse_engine
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+from .data import DatasetShape, generate
+
+
+def place_orders(service: WarehouseService, orders: int, items: int, products: int):
+    rng = random.Random(0)
+    started = time.perf_counter()
+    for _ in range(orders):
+        service.create_order([(rng.randint(1, products), 1) for _ in range(items)])
+    return orders / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare order throughput with logging at INFO and at WARNING"
+    )
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=20, help="Items per order")
+    parser.add_argument("--products", type=int, default=1000)
+    args = parser.parse_args()
+
+    # Records go to /dev/null through the same queue setup main.py uses, so
+    # the numbers show the cost on the calling thread.
+    devnull = open(os.devnull, "w")
+    handler = logging.StreamHandler(devnull)
+    handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, handler)
+    root = logging.getLogger()
+    root.addHandler(QueueHandler(log_queue))
+    listener.start()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_warehouse_engine(f"sqlite:///{Path(tmp) / 'logging.db'}")
+        generate(engine, DatasetShape(products=args.products, orders=0))
+        service = WarehouseService(
+            SqlAlchemyUnitOfWork(sessionmaker(bind=engine, autoflush=False))
+        )
+        try:
+            for level in ("WARNING", "INFO", "WARNING", "INFO"):
+                root.setLevel(level)
+                rate = place_orders(service, args.orders, args.items, args.products)
+                results[level] = max(results.get(level, 0.0), rate)
+        finally:
+            listener.stop()
+            devnull.close()
+            engine.dispose()
+
+    print(f"{args.orders} orders x {args.items} items")
+    print(f"{'level':<8} {'orders/sec':>11}")
+    for level, rate in results.items():
+        print(f"{level:<8} {rate:>11.0f}")
+    overhead = results["WARNING"] / results["INFO"] - 1
+    print(f"INFO logging costs {overhead:.0%} of throughput")
+
+
+if __name__ == "__main__":
+    main()
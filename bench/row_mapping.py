@@ -0,0 +1,94 @@
+import argparse
+import gc
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from infrastructure.database import create_warehouse_engine
+from infrastructure.orm import Base, ProductORM
+from infrastructure.repositories import SqlAlchemyProductRepository
+
+
+@dataclass
+class DictProduct:
+    id: Optional[int]
+    name: str
+    quantity: int
+    price: float
+    version: int = 0
+
+
+def orm_to_dict_dataclasses(session):
+    # The previous mapping path: ORM entity per row, then a __dict__ dataclass.
+    return [
+        DictProduct(
+            id=p.id, name=p.name, quantity=p.quantity, price=p.price, version=p.version
+        )
+        for p in session.query(ProductORM).all()
+    ]
+
+
+def core_to_slotted_dataclasses(session):
+    return SqlAlchemyProductRepository(session).list()
+
+
+def populate(engine, count: int, batch_size: int = 50_000):
+    with engine.begin() as conn:
+        for start in range(0, count, batch_size):
+            conn.execute(
+                insert(ProductORM),
+                [
+                    {"name": f"Product {i}", "quantity": i % 500, "price": i / 100}
+                    for i in range(start, min(count, start + batch_size))
+                ],
+            )
+
+
+def measure(session_factory, load: Callable) -> tuple[float, float]:
+    session = session_factory()
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    products = load(session)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert products
+    del products
+    session.close()
+    return elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare ORM+dict mapping with Core+slots mapping for product lists"
+    )
+    parser.add_argument("--products", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_warehouse_engine(f"sqlite:///{Path(tmp) / 'rows.db'}")
+        Base.metadata.create_all(engine)
+        populate(engine, args.products)
+        session_factory = sessionmaker(bind=engine, autoflush=False)
+
+        results = {
+            "orm + __dict__": measure(session_factory, orm_to_dict_dataclasses),
+            "core + __slots__": measure(session_factory, core_to_slotted_dataclasses),
+        }
+        engine.dispose()
+
+    print(f"{args.products} products")
+    print(f"{'path':<18} {'seconds':>8} {'peak MiB':>9}")
+    for name, (elapsed, peak) in results.items():
+        print(f"{name:<18} {elapsed:>8.2f} {peak:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
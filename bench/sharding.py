@@ -0,0 +1,124 @@
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from domain.models import Product
+from domain.services import WarehouseService
+from infrastructure.database import create_warehouse_engine
+from infrastructure.order_runner import run_orders
+from infrastructure.orm import Base
+from infrastructure.sharding import (
+    HashRouter,
+    ShardedUnitOfWork,
+    ShardRouter,
+    create_shard_engines,
+)
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+
+
+def prepare(url: str, shards: int, products: int, preset: str) -> Optional[ShardRouter]:
+    """Create the database files with ``products`` and return the router
+    (None for the single-file baseline)."""
+    router = HashRouter(shards) if shards > 1 else None
+    if router is None:
+        engines = [create_warehouse_engine(url, preset=preset)]
+    else:
+        engines = create_shard_engines(shards, url, preset)
+    for engine in engines:
+        Base.metadata.create_all(engine)
+    factories = [sessionmaker(bind=engine, autoflush=False) for engine in engines]
+    uow = (
+        SqlAlchemyUnitOfWork(factories[0])
+        if router is None
+        else ShardedUnitOfWork(factories, router)
+    )
+    WarehouseService(uow).create_products_bulk(
+        Product(None, f"Bench {i}", 10**9, 1.0) for i in range(products)
+    )
+    for engine in engines:
+        engine.dispose()
+    return router
+
+
+def simulate_commit_latency(milliseconds: float):
+    """Hold every transaction's locks ``milliseconds`` longer before COMMIT,
+    like slow storage would. Forked worker processes inherit the listener."""
+
+    @event.listens_for(Engine, "commit")
+    def _slow_commit(connection):
+        time.sleep(milliseconds / 1000)
+
+
+def measure(
+    url: str,
+    router: Optional[ShardRouter],
+    orders: List[List[tuple[int, int]]],
+    workers: int,
+    preset: str,
+):
+    started = time.perf_counter()
+    outcomes = list(
+        run_orders(
+            orders, database_url=url, preset=preset, workers=workers, router=router
+        )
+    )
+    elapsed = time.perf_counter() - started
+    failed = sum(1 for outcome in outcomes if outcome.error)
+    return len(orders) / elapsed, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare order throughput of worker processes across shard counts"
+    )
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=1, help="Items per order")
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--preset",
+        default="wal",
+        help="Engine preset of every file ('default' syncs each commit to disk)",
+    )
+    parser.add_argument(
+        "--commit-latency",
+        type=float,
+        default=0.0,
+        help="Milliseconds added to every commit while the write lock is held",
+    )
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    orders = [
+        [(rng.randint(1, args.products), 1) for _ in range(args.items)]
+        for _ in range(args.orders)
+    ]
+    if args.commit_latency:
+        simulate_commit_latency(args.commit_latency)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for shards in args.shards:
+            url = f"sqlite:///{Path(tmp) / f'shards{shards}.db'}"
+            router = prepare(url, shards, args.products, args.preset)
+            results[shards] = measure(url, router, orders, args.workers, args.preset)
+
+    baseline = results[args.shards[0]][0]
+    print(
+        f"{args.workers} workers, {args.items} item(s) per order, preset {args.preset}, "
+        f"commit latency {args.commit_latency:g} ms"
+    )
+    print(f"{'shards':>6} {'orders/sec':>11} {'speedup':>8} {'failed':>7}")
+    for shards, (rate, failed) in results.items():
+        print(f"{shards:>6} {rate:>11.0f} {rate / baseline:>7.2f}x {failed:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import logging
+import random
+import time
+from typing import Optional
+
+from domain.models import Product
+from domain.services import WarehouseService
+from infrastructure.memory import InMemoryStore, InMemoryUnitOfWork
+
+
+def simulate(
+    store: InMemoryStore,
+    orders: int,
+    max_items: int = 5,
+    seed: int = 42,
+) -> float:
+    service = WarehouseService(InMemoryUnitOfWork(store))
+    product_count = len(store.product_ids)
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    for _ in range(orders):
+        service.create_order(
+            [
+                (rng.randint(1, product_count), rng.randint(1, 3))
+                for _ in range(rng.randint(1, max_items))
+            ]
+        )
+    return time.perf_counter() - started
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(
+        description="Place synthetic orders through WarehouseService in memory"
+    )
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--max-items", type=int, default=5)
+    parser.add_argument("--stock", type=int, default=1_000)
+    parser.add_argument("--load", type=str, help="Start from a saved store")
+    parser.add_argument("--save", type=str, help="Save the final store here")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    # Stock-outs are expected in a long simulation; keep them out of stderr.
+    logging.getLogger("domain.services").setLevel(logging.ERROR)
+
+    if args.load:
+        store = InMemoryStore.load(args.load)
+    else:
+        store = InMemoryStore()
+        WarehouseService(InMemoryUnitOfWork(store)).create_products_bulk(
+            Product(id=None, name=f"Product {i}", quantity=args.stock, price=1.0)
+            for i in range(args.products)
+        )
+
+    elapsed = simulate(store, args.orders, max_items=args.max_items)
+    placed = len(store.order_ids)
+    print(
+        f"{args.orders} orders in {elapsed:.2f}s ({args.orders / elapsed:.0f} orders/sec), "
+        f"{placed} stored"
+    )
+    if args.save:
+        store.save(args.save)
+        print(f"Store saved to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import sessionmaker
+
+from domain.services import WarehouseService
+from infrastructure.database import create_warehouse_engine
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+from .data import DatasetShape, generate
+
+DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+
+
+def measure(run: Callable[[], int], repeat: int = 3) -> Dict[str, float]:
+    """Best-of-``repeat`` wall time, then one more run under tracemalloc.
+
+    Peak memory is measured separately because tracing slows the code down
+    several times over and would distort the timings.
+    """
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        ops = run()
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best:
+            best = elapsed
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "ops": ops,
+        "seconds": round(best, 6),
+        "ops_per_sec": round(ops / best, 1) if best > 0 else float(ops),
+        "peak_mib": round(peak / 2**20, 3),
+    }
+
+
+def run_suite(
+    engine,
+    shape: DatasetShape,
+    gets: int = 2000,
+    placements: int = 500,
+    repeat: int = 3,
+) -> Dict[str, Dict[str, float]]:
+    service = WarehouseService(
+        SqlAlchemyUnitOfWork(sessionmaker(bind=engine, autoflush=False))
+    )
+    rng = random.Random(shape.seed)
+    product_ids = [rng.randint(1, shape.products) for _ in range(gets)]
+
+    def product_list():
+        return len(service.list_all_products())
+
+    def product_get():
+        for product_id in product_ids:
+            service.get_product_details(product_id)
+        return len(product_ids)
+
+    def order_placement():
+        order_rng = random.Random(shape.seed)
+        for _ in range(placements):
+            count = order_rng.randint(shape.min_items, shape.max_items)
+            service.create_order(
+                [
+                    (order_rng.randint(1, shape.products), order_rng.randint(1, 5))
+                    for _ in range(count)
+                ]
+            )
+        return placements
+
+    def order_history():
+        return sum(1 for _ in service.iter_orders())
+
+    return {
+        "product_list": measure(product_list, repeat),
+        "product_get": measure(product_get, repeat),
+        "order_history": measure(order_history, repeat),
+        "order_placement": measure(order_placement, repeat),
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float,
+) -> List[str]:
+    """Describe every metric that is worse than the baseline by more than
+    ``threshold`` (a fraction, 0.2 means 20%)."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if current["ops_per_sec"] < previous["ops_per_sec"] * (1 - threshold):
+            regressions.append(
+                f"{name}: {current['ops_per_sec']:.0f} ops/sec, "
+                f"baseline {previous['ops_per_sec']:.0f}"
+            )
+        if current["peak_mib"] > previous["peak_mib"] * (1 + threshold):
+            regressions.append(
+                f"{name}: peak {current['peak_mib']:.1f} MiB, "
+                f"baseline {previous['peak_mib']:.1f} MiB"
+            )
+    return regressions
+
+
+def _print_table(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict]):
+    print(f"{'benchmark':<16} {'ops/sec':>10} {'vs base':>8} {'peak MiB':>9}")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        change = (
+            f"{current['ops_per_sec'] / previous['ops_per_sec'] - 1:+.0%}"
+            if previous and previous["ops_per_sec"]
+            else "-"
+        )
+        print(
+            f"{name:<16} {current['ops_per_sec']:>10.0f} {change:>8} "
+            f"{current['peak_mib']:>9.1f}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark repositories and services on a synthetic database"
+    )
+    parser.add_argument("--products", type=int, default=DatasetShape.products)
+    parser.add_argument("--orders", type=int, default=DatasetShape.orders)
+    parser.add_argument("--min-items", type=int, default=DatasetShape.min_items)
+    parser.add_argument("--max-items", type=int, default=DatasetShape.max_items)
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=DatasetShape.days,
+        help="Spread order creation times over this many days",
+    )
+    parser.add_argument("--seed", type=int, default=DatasetShape.seed)
+    parser.add_argument("--gets", type=int, default=2000)
+    parser.add_argument("--placements", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--preset", type=str, default=None)
+    parser.add_argument("--output", type=Path, help="Write results as JSON here")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.3,
+        help="Allowed slowdown or memory growth against the baseline (0.3 = 30%%)",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Store these results as the new baseline",
+    )
+    args = parser.parse_args(argv)
+
+    shape = DatasetShape(
+        products=args.products,
+        orders=args.orders,
+        min_items=args.min_items,
+        max_items=args.max_items,
+        days=args.days,
+        seed=args.seed,
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_warehouse_engine(
+            f"sqlite:///{Path(tmp) / 'bench.db'}", preset=args.preset
+        )
+        try:
+            generate(engine, shape)
+            results = run_suite(
+                engine,
+                shape,
+                gets=args.gets,
+                placements=args.placements,
+                repeat=args.repeat,
+            )
+        finally:
+            engine.dispose()
+
+    report = {
+        "python": platform.python_version(),
+        "shape": asdict(shape),
+        "benchmarks": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+    baseline = {}
+    if args.baseline.exists() and not args.update_baseline:
+        stored = json.loads(args.baseline.read_text())
+        if stored.get("shape") == report["shape"]:
+            baseline = stored["benchmarks"]
+        else:
+            print(f"Baseline {args.baseline} uses a different data shape, skipping it")
+
+    _print_table(results, baseline)
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,6 @@
+class WarehouseError(Exception):
+    pass
+
+
+class ConcurrentUpdateError(WarehouseError):
+    pass
@@ -1,16 +1,18 @@
 from dataclasses import dataclass, field
-from typing import List, Optional
+from datetime import datetime
+from typing import Dict, List, Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class Product:
     id: Optional[int]
     name: str
     quantity: int
     price: float
+    version: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class OrderItem:
     product: Product
     quantity_ordered: int
@@ -21,10 +23,11 @@ class OrderItem:
         return self.quantity_ordered * self.price_at_purchase
 
 
-@dataclass
+@dataclass(slots=True)
 class Order:
     id: Optional[int]
     items: List[OrderItem] = field(default_factory=list)
+    created_at: Optional[datetime] = None
 
     def add_item(self, product: Product, quantity_to_order: int):
         if quantity_to_order <= 0:
@@ -39,3 +42,41 @@ class Order:
     @property
     def total_order_cost(self) -> float:
         return sum(item.total_cost for item in self.items)
+
+
+@dataclass(slots=True)
+class OrderSummary:
+    id: int
+    total_cost: float
+    item_count: int
+    created_at: Optional[datetime]
+
+
+@dataclass(slots=True)
+class ProductSales:
+    product_id: int
+    name: str
+    units_sold: int
+    revenue: float
+
+
+@dataclass(slots=True)
+class SalesSummary:
+    order_count: int
+    units_sold: int
+    revenue: float
+
+    @property
+    def average_order_value(self) -> float:
+        if not self.order_count:
+            return 0.0
+        return self.revenue / self.order_count
+
+
+@dataclass(slots=True)
+class StockAdjustment:
+    records: int = 0
+    applied: int = 0
+    unknown_ids: List[int] = field(default_factory=list)
+    # Product id -> the stock the rejected delta would have left.
+    negative_stock: Dict[int, int] = field(default_factory=dict)
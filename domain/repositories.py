@@ -1,6 +1,14 @@
 from abc import ABC, abstractmethod
-from typing import List
-from .models import Product, Order
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+from .models import (
+    Product,
+    Order,
+    OrderSummary,
+    ProductSales,
+    SalesSummary,
+    StockAdjustment,
+)
 
 
 class ProductRepository(ABC):
@@ -8,18 +16,50 @@ class ProductRepository(ABC):
     def add(self, product: Product):
         pass
 
+    @abstractmethod
+    def add_many(self, products: Iterable[Product]) -> int:
+        pass
+
     @abstractmethod
     def get(self, product_id: int) -> Product:
         pass
 
+    @abstractmethod
+    def get_many(self, product_ids: Iterable[int]) -> Dict[int, Product]:
+        pass
+
     @abstractmethod
     def list(self) -> List[Product]:
         pass
 
+    @abstractmethod
+    def iter_products(
+        self, batch_size: int = 1000, after_id: Optional[int] = None
+    ) -> Iterator[Product]:
+        pass
+
+    @abstractmethod
+    def search_products(self, query: str, limit: int = 20) -> List[Product]:
+        """Products whose name contains every word of ``query`` as a word
+        prefix, best matches first."""
+        pass
+
     @abstractmethod
     def update(self, product_id: int) -> Product:
         pass
 
+    @abstractmethod
+    def reserve_many(self, quantities: Dict[int, int]):
+        """Atomically decrement stock, raising ConcurrentUpdateError if any
+        product no longer has enough quantity."""
+        pass
+
+    @abstractmethod
+    def adjust_stock_many(self, deltas: Dict[int, int]) -> StockAdjustment:
+        """Add each delta to the product's stock. Unknown products and deltas
+        that would make stock negative are skipped and reported."""
+        pass
+
 
 class OrderRepository(ABC):
     @abstractmethod
@@ -33,3 +73,48 @@ class OrderRepository(ABC):
     @abstractmethod
     def list(self) -> List[Order]:
         pass
+
+    @abstractmethod
+    def iter_orders(
+        self,
+        batch_size: int = 500,
+        after_id: Optional[int] = None,
+        max_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> Iterator[Order]:
+        pass
+
+    @abstractmethod
+    def list_summaries(
+        self,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> List[OrderSummary]:
+        pass
+
+
+class SalesReportRepository(ABC):
+    @abstractmethod
+    def summary(
+        self,
+        after_id: Optional[int] = None,
+        max_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> SalesSummary:
+        pass
+
+    @abstractmethod
+    def product_sales(
+        self,
+        after_id: Optional[int] = None,
+        max_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        order_by: str = "revenue",
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> List[ProductSales]:
+        pass
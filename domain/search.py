@@ -0,0 +1,18 @@
+import re
+import unicodedata
+from typing import List
+
+# Letters and digits; "_" separates words like in the FTS5 unicode61 tokenizer.
+_WORD = re.compile(r"[^\W_]+")
+
+# Shorter terms only match whole words, not word prefixes.
+MIN_PREFIX_LENGTH = 2
+
+
+def search_terms(query: str) -> List[str]:
+    """Lowercased words of a product search query without diacritics, as
+    ``unicode61 remove_diacritics 2`` tokenizes them. Everything that is not
+    a letter or digit separates words, so the terms are safe to quote."""
+    decomposed = unicodedata.normalize("NFKD", query)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return [term.lower() for term in _WORD.findall(stripped)]
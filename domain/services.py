@@ -1,47 +1,244 @@
-from typing import List
-from .models import Product, Order
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import islice
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+from .exceptions import ConcurrentUpdateError
+from .models import (
+    Product,
+    Order,
+    OrderSummary,
+    ProductSales,
+    SalesSummary,
+    StockAdjustment,
+)
 from .unit_of_work import UnitOfWork
 
 import logging
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    attempts: int = 5
+    base_delay: float = 0.005
+    max_delay: float = 0.2
+
+    def delay(self, attempt: int) -> float:
+        # Exponential backoff with full jitter.
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+def _describe_items(order: Order, limit: int) -> str:
+    described = [
+        f"{item.product.name} q:{item.quantity_ordered}" for item in order.items[:limit]
+    ]
+    if len(order.items) > limit:
+        described.append(f"... {len(order.items) - limit} more")
+    return ", ".join(described)
+
 
 class WarehouseService:
-    def __init__(self, uow: UnitOfWork):
+    def __init__(
+        self,
+        uow: UnitOfWork,
+        retry_policy: Optional[RetryPolicy] = None,
+        item_log_limit: int = 20,
+    ):
+        if item_log_limit <= 0:
+            raise ValueError("Item log limit must be positive")
         self.uow = uow
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.item_log_limit = item_log_limit
+
+    def _with_retry(self, operation: Callable[..., T], *args) -> T:
+        for attempt in range(1, self.retry_policy.attempts + 1):
+            try:
+                return operation(*args)
+            except ConcurrentUpdateError as e:
+                if attempt == self.retry_policy.attempts:
+                    logger.error("SERVICE: Giving up after %d attempts: %s", attempt, e)
+                    raise
+                delay = self.retry_policy.delay(attempt)
+                logger.warning(
+                    "SERVICE: Concurrent update (%s), retry %d in %.3fs",
+                    e,
+                    attempt,
+                    delay,
+                )
+                time.sleep(delay)
 
     def create_product(self, name: str, quantity: int, price: float) -> Product:
-        logger.info(f"create product with name: {name}")
+        logger.info("create product with name: %s", name)
         with self.uow:
             product = Product(id=None, name=name, quantity=quantity, price=price)
             self.uow.products.add(product)
             self.uow.commit()
             return product
 
+    def create_products_bulk(
+        self, products: Iterable[Product], batch_size: int = 1000
+    ) -> int:
+        if batch_size <= 0:
+            raise ValueError("Batch size must be positive")
+        created = 0
+        products = iter(products)
+        while batch := list(islice(products, batch_size)):
+            with self.uow:
+                created += self.uow.products.add_many(batch)
+                self.uow.commit()
+            logger.debug("SERVICE: Imported batch of %d, total %d", len(batch), created)
+        logger.info("SERVICE: Bulk created %d products", created)
+        return created
+
     def get_product_details(self, product_id: int) -> Product | None:
-        with self.uow:
-            product = self.uow.products.get(product_id)
-            return product
+        with self.uow.read() as uow:
+            return uow.products.get(product_id)
 
-    def list_all_products(self) -> List[Product]:
-        with self.uow:
-            products = self.uow.products.list()
-            return products
+    def list_all_products(
+        self, limit: Optional[int] = None, after_id: Optional[int] = None
+    ) -> List[Product]:
+        return list(self.iter_all_products(limit=limit, after_id=after_id))
+
+    def iter_all_products(
+        self,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[Product]:
+        if limit is not None:
+            if limit <= 0:
+                return
+            batch_size = min(batch_size, limit)
+        with self.uow.read() as uow:
+            products = uow.products.iter_products(
+                batch_size=batch_size, after_id=after_id
+            )
+            yield from islice(products, limit)
+
+    def search_products(self, query: str, limit: int = 20) -> List[Product]:
+        if limit <= 0:
+            raise ValueError("Limit must be positive")
+        with self.uow.read() as uow:
+            return uow.products.search_products(query, limit)
+
+    def iter_orders(
+        self,
+        batch_size: int = 500,
+        after_id: Optional[int] = None,
+        max_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> Iterator[Order]:
+        with self.uow.read() as uow:
+            yield from uow.orders.iter_orders(
+                batch_size=batch_size,
+                after_id=after_id,
+                max_id=max_id,
+                created_from=created_from,
+                created_to=created_to,
+            )
 
-    def update_product_stock(self, product_id: id, new_q: int) -> Product | None:
+    def get_order(self, order_id: int) -> Optional[Order]:
+        with self.uow.read() as uow:
+            return uow.orders.get(order_id)
+
+    def list_order_summaries(
+        self,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> List[OrderSummary]:
+        with self.uow.read() as uow:
+            return uow.orders.list_summaries(
+                limit=limit,
+                after_id=after_id,
+                created_from=created_from,
+                created_to=created_to,
+            )
+
+    def update_product_stock(self, product_id: int, new_q: int) -> Product | None:
+        return self._with_retry(self._update_product_stock, product_id, new_q)
+
+    def _update_product_stock(self, product_id: int, new_q: int) -> Product | None:
         with self.uow:
             product = self.uow.products.get(product_id)
             if product:
                 product.quantity = new_q
+                self.uow.products.update(product)
                 self.uow.commit()
                 return product
             return None
 
+    def adjust_stock_bulk(
+        self, deltas: Iterable[Tuple[int, int]], batch_size: int = 1000
+    ) -> StockAdjustment:
+        """Apply ``(product_id, delta)`` records, one transaction per
+        ``batch_size`` records. Deltas for the same product within a batch
+        are summed before the stock check."""
+        if batch_size <= 0:
+            raise ValueError("Batch size must be positive")
+        report = StockAdjustment()
+        deltas = iter(deltas)
+        while batch := list(islice(deltas, batch_size)):
+            merged: Dict[int, int] = {}
+            for product_id, delta in batch:
+                merged[product_id] = merged.get(product_id, 0) + delta
+            result = self._with_retry(self._adjust_stock, merged)
+            report.records += len(batch)
+            report.applied += result.applied
+            report.unknown_ids.extend(result.unknown_ids)
+            report.negative_stock.update(result.negative_stock)
+            logger.debug(
+                "SERVICE: Adjusted stock batch of %d, total %d",
+                len(batch),
+                report.records,
+            )
+        logger.info(
+            "SERVICE: Stock adjusted for %d products from %d records, "
+            "%d unknown, %d rejected for negative stock",
+            report.applied,
+            report.records,
+            len(report.unknown_ids),
+            len(report.negative_stock),
+        )
+        return report
+
+    def _adjust_stock(self, deltas: Dict[int, int]) -> StockAdjustment:
+        with self.uow:
+            result = self.uow.products.adjust_stock_many(deltas)
+            self.uow.commit()
+            return result
+
     def create_order(self, products_to_order_details: List[tuple[int, int]]) -> Order:
+        return self._with_retry(self._create_order, products_to_order_details)
+
+    def _create_order(self, products_to_order_details: List[tuple[int, int]]) -> Order:
         logger.info(
-            f"SERVICE: Creating order with product details: {products_to_order_details}"
+            "SERVICE: Creating order with %d product lines",
+            len(products_to_order_details),
         )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "SERVICE: Order product details: %s", products_to_order_details
+            )
+        # Per-item INFO lines are sampled down to about item_log_limit lines.
+        log_items = logger.isEnabledFor(logging.INFO)
+        log_step = -(-len(products_to_order_details) // self.item_log_limit)
         with self.uow:
             order = Order(id=None)
 
@@ -49,40 +246,60 @@ class WarehouseService:
                 logger.warning("Attempted to create an order with no products")
                 return order
 
-            for product_id, quantity_to_order in products_to_order_details:
+            product_ids = {
+                product_id
+                for product_id, quantity_to_order in products_to_order_details
+                if quantity_to_order > 0
+            }
+            products_on_stock = self.uow.products.get_many(product_ids)
+            reserved: Dict[int, int] = {}
+
+            for index, (product_id, quantity_to_order) in enumerate(
+                products_to_order_details
+            ):
                 if quantity_to_order <= 0:
                     logger.warning(
-                        f"Invalid quantity {quantity_to_order} for product ID {product_id}. Skipping"
+                        "Invalid quantity %s for product ID %s. Skipping",
+                        quantity_to_order,
+                        product_id,
                     )
                     continue
 
-                product_on_stock = self.uow.products.get(product_id)
+                product_on_stock = products_on_stock.get(product_id)
 
                 if not product_on_stock:
                     logger.error(
-                        f"Product with ID {product_id} not found on stock. Skipping"
+                        "Product with ID %s not found on stock. Skipping", product_id
                     )
                     continue
 
                 if product_on_stock.quantity < quantity_to_order:
                     logger.warning(
-                        f"SERVICE: Not enough stock for {product_on_stock.name} (ID: {product_id}). "
-                        f"Requested: {quantity_to_order}, Available: {product_on_stock.quantity}. Skipping."
+                        "SERVICE: Not enough stock for %s (ID: %s). "
+                        "Requested: %s, Available: %s. Skipping.",
+                        product_on_stock.name,
+                        product_id,
+                        quantity_to_order,
+                        product_on_stock.quantity,
                     )
                     continue
 
                 order.add_item(
                     product=product_on_stock, quantity_to_order=quantity_to_order
                 )
-                logger.info(
-                    f"SERVICE: Added {quantity_to_order} of {product_on_stock.name} to order."
-                )
-
                 product_on_stock.quantity -= quantity_to_order
-                self.uow.products.update(product_on_stock)
-                logger.info(
-                    f"Updated stock for {product_on_stock.name} to {product_on_stock.quantity}"
-                )
+                reserved[product_id] = reserved.get(product_id, 0) + quantity_to_order
+                if log_items and index % log_step == 0:
+                    logger.info(
+                        "SERVICE: Added %s of %s to order.",
+                        quantity_to_order,
+                        product_on_stock.name,
+                    )
+                    logger.info(
+                        "Updated stock for %s to %s",
+                        product_on_stock.name,
+                        product_on_stock.quantity,
+                    )
 
             if not order.items:
                 logger.warning(
@@ -90,9 +307,52 @@ class WarehouseService:
                 )
                 return order
 
+            self.uow.products.reserve_many(reserved)
             self.uow.orders.add(order)
             self.uow.commit()
-            logger.info(
-                f"SERVICE: Order created: id={order.id}, items={[item.product.name + ' q:' + str(item.quantity_ordered) for item in order.items]}"
-            )
+            if log_items:
+                logger.info(
+                    "SERVICE: Order created: id=%s, items=%s",
+                    order.id,
+                    _describe_items(order, self.item_log_limit),
+                )
             return order
+
+
+class ReportingService:
+    def __init__(self, uow: UnitOfWork):
+        self.uow = uow
+
+    def sales_summary(
+        self,
+        after_id: Optional[int] = None,
+        max_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> SalesSummary:
+        with self.uow.read() as uow:
+            return uow.reports.summary(
+                after_id=after_id,
+                max_id=max_id,
+                created_from=created_from,
+                created_to=created_to,
+            )
+
+    def top_products(
+        self,
+        limit: Optional[int] = 10,
+        order_by: str = "revenue",
+        after_id: Optional[int] = None,
+        max_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> List[ProductSales]:
+        with self.uow.read() as uow:
+            return uow.reports.product_sales(
+                after_id=after_id,
+                max_id=max_id,
+                limit=limit,
+                order_by=order_by,
+                created_from=created_from,
+                created_to=created_to,
+            )
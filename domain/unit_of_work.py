@@ -17,3 +17,11 @@ class UnitOfWork(ABC):
     @abstractmethod
     def rollback(self):
         pass
+
+    def read(self) -> "UnitOfWork":
+        """Unit of work for calls that only query.
+
+        Implementations with a cheaper read path override this; by default
+        reads go through the unit of work itself.
+        """
+        return self
@@ -0,0 +1,170 @@
+import json
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from domain.exceptions import WarehouseError
+from domain.services import WarehouseService
+from .unit_of_work import SqlAlchemyUnitOfWork
+
+logger = logging.getLogger(__name__)
+
+COMMANDS = ("create-product", "create-order", "set-stock")
+
+# Marks the end of the input in the line queue.
+_END = object()
+
+
+@dataclass
+class BatchStats:
+    processed: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    groups: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        if self.elapsed <= 0:
+            return float(self.processed)
+        return self.processed / self.elapsed
+
+
+def _create_product(service: WarehouseService, record: dict):
+    return service.create_product(
+        name=str(record["name"]),
+        quantity=int(record["quantity"]),
+        price=float(record["price"]),
+    )
+
+
+def _create_order(service: WarehouseService, record: dict):
+    items = [
+        (int(product_id), int(quantity)) for product_id, quantity in record["items"]
+    ]
+    return service.create_order(items)
+
+
+def _set_stock(service: WarehouseService, record: dict):
+    return service.update_product_stock(
+        int(record["product_id"]), int(record["quantity"])
+    )
+
+
+_HANDLERS: Dict[str, Callable[[WarehouseService, dict], object]] = {
+    "create-product": _create_product,
+    "create-order": _create_order,
+    "set-stock": _set_stock,
+}
+
+
+class BatchRunner:
+    """Runs newline-delimited JSON commands with group commit.
+
+    Commands share one transaction that is committed every ``group_size``
+    commands or once ``group_interval`` seconds have passed since it began,
+    also while waiting for the next line. Input is read on a helper thread,
+    so a slow pipe does not keep the group (and the SQLite write lock) open;
+    all database work stays on the calling thread. Every command runs in its
+    own SAVEPOINT, so a failing command is rolled back without touching the
+    rest of its group.
+    """
+
+    def __init__(
+        self,
+        uow: SqlAlchemyUnitOfWork,
+        group_size: int = 100,
+        group_interval: float = 0.05,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        if group_size <= 0:
+            raise ValueError("Group size must be positive")
+        self.uow = uow
+        self.service = WarehouseService(uow)
+        self.group_size = group_size
+        self.group_interval = group_interval
+        self.clock = clock
+
+    def run(self, lines: Iterable[str]) -> BatchStats:
+        stats = BatchStats()
+        started = self.clock()
+        pending_lines: queue.Queue = queue.Queue(maxsize=self.group_size)
+        read_errors = []
+        threading.Thread(
+            target=_read_lines,
+            args=(lines, pending_lines, read_errors),
+            name="batch-reader",
+            daemon=True,
+        ).start()
+
+        def next_line(timeout=None):
+            item = pending_lines.get(timeout=timeout)
+            if item is _END and read_errors:
+                raise read_errors[0]
+            return item
+
+        while True:
+            # No group is open while waiting for its first command.
+            item = next_line()
+            while item is not _END and not item[1].strip():
+                item = next_line()
+            if item is _END:
+                break
+            with self.uow.group():
+                group_started = self.clock()
+                pending = 0
+                while item is not _END:
+                    line_no, line = item
+                    if line.strip():
+                        stats.processed += 1
+                        pending += 1
+                        if self._execute(line, line_no):
+                            stats.succeeded += 1
+                        else:
+                            stats.failed += 1
+                    remaining = self.group_interval - (self.clock() - group_started)
+                    if pending >= self.group_size or remaining <= 0:
+                        break
+                    try:
+                        item = next_line(timeout=remaining)
+                    except queue.Empty:
+                        logger.debug("BATCH: No input for %.3fs, committing", remaining)
+                        break
+            stats.groups += 1
+            if item is _END:
+                break
+        stats.elapsed = self.clock() - started
+        return stats
+
+    def _execute(self, line: str, line_no: int) -> bool:
+        try:
+            record = json.loads(line)
+            handler = _HANDLERS[record["command"]]
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            logger.warning(
+                "BATCH: Invalid command on line %d: %s. Skipping", line_no, e
+            )
+            return False
+        try:
+            handler(self.service, record)
+        except (KeyError, TypeError, ValueError, WarehouseError, SQLAlchemyError) as e:
+            logger.error(
+                "BATCH: %s on line %d failed: %s", record["command"], line_no, e
+            )
+            return False
+        return True
+
+
+def _read_lines(lines: Iterable[str], pending_lines: queue.Queue, errors: list):
+    try:
+        for item in enumerate(lines, start=1):
+            pending_lines.put(item)
+    except Exception as e:
+        errors.append(e)
+    finally:
+        pending_lines.put(_END)
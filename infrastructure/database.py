@@ -1 +1,156 @@
-DATABASE_URL = "sqlite:///warehouse.db"
+import os
+from dataclasses import dataclass, field, replace
+from typing import Dict, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, Engine, make_url
+
+DATABASE_URL = os.environ.get("WAREHOUSE_DATABASE_URL", "sqlite:///warehouse.db")
+DATABASE_PRESET = os.environ.get("WAREHOUSE_DB_PRESET", "wal")
+
+# Execution option marking connections that only read. Their transactions
+# start with BEGIN DEFERRED whatever the preset, so they never take the
+# SQLite write lock.
+READ_ONLY_OPTION = "warehouse_read_only"
+
+
+@dataclass(frozen=True)
+class EngineSettings:
+    # Applied with PRAGMA on every new DBAPI connection, in insertion order.
+    pragmas: Dict[str, object] = field(default_factory=dict)
+    read_only: bool = False
+    # SQLite BEGIN mode. IMMEDIATE takes the write lock up front so that
+    # concurrent writers wait on busy_timeout instead of failing on upgrade.
+    # None keeps the driver's own transaction handling.
+    begin: Optional[str] = None
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_recycle: int = -1
+
+
+_TUNED_PRAGMAS = {
+    "busy_timeout": 5000,
+    "cache_size": -64000,
+    "mmap_size": 268435456,
+    "temp_store": "MEMORY",
+}
+
+PRESETS: Dict[str, EngineSettings] = {
+    "default": EngineSettings(),
+    "wal": EngineSettings(
+        pragmas={"journal_mode": "WAL", "synchronous": "NORMAL", **_TUNED_PRAGMAS},
+        begin="IMMEDIATE",
+    ),
+    "read_only": EngineSettings(
+        pragmas={"query_only": "ON", **_TUNED_PRAGMAS},
+        read_only=True,
+        begin="DEFERRED",
+    ),
+}
+
+_PRAGMA_ENV = {
+    "busy_timeout": "WAREHOUSE_DB_BUSY_TIMEOUT",
+    "cache_size": "WAREHOUSE_DB_CACHE_SIZE",
+    "mmap_size": "WAREHOUSE_DB_MMAP_SIZE",
+    "synchronous": "WAREHOUSE_DB_SYNCHRONOUS",
+}
+
+_POOL_ENV = {
+    "pool_size": ("WAREHOUSE_DB_POOL_SIZE", int),
+    "max_overflow": ("WAREHOUSE_DB_MAX_OVERFLOW", int),
+    "pool_timeout": ("WAREHOUSE_DB_POOL_TIMEOUT", float),
+    "pool_recycle": ("WAREHOUSE_DB_POOL_RECYCLE", int),
+}
+
+
+def settings_from_env(preset: Optional[str] = None) -> EngineSettings:
+    preset = preset or DATABASE_PRESET
+    if preset not in PRESETS:
+        raise ValueError(
+            f"Unknown database preset '{preset}'. Available: {', '.join(PRESETS)}"
+        )
+    settings = PRESETS[preset]
+
+    pragmas = dict(settings.pragmas)
+    for pragma, env_name in _PRAGMA_ENV.items():
+        if pragma in pragmas and env_name in os.environ:
+            pragmas[pragma] = os.environ[env_name]
+
+    pool = {
+        name: cast(os.environ[env_name])
+        for name, (env_name, cast) in _POOL_ENV.items()
+        if env_name in os.environ
+    }
+    return replace(settings, pragmas=pragmas, **pool)
+
+
+def _is_file_database(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database not in (
+        None,
+        "",
+        ":memory:",
+    )
+
+
+def _read_only_url(url: URL) -> URL:
+    if not _is_file_database(url) or url.database.startswith("file:"):
+        return url
+    return url.set(
+        database=f"file:{url.database}",
+        query={**url.query, "mode": "ro", "uri": "true"},
+    )
+
+
+def _install_sqlite_events(engine: Engine, settings: EngineSettings):
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        if settings.begin is not None:
+            # Let SQLAlchemy emit BEGIN itself (see the "begin" hook below);
+            # this also makes SAVEPOINT work with pysqlite.
+            dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, value in settings.pragmas.items():
+                cursor.execute(f"PRAGMA {pragma}={value}")
+        finally:
+            cursor.close()
+
+    if settings.begin is not None:
+
+        @event.listens_for(engine, "begin")
+        def _on_begin(connection):
+            if connection.get_execution_options().get(READ_ONLY_OPTION):
+                connection.exec_driver_sql("BEGIN DEFERRED")
+            else:
+                connection.exec_driver_sql(f"BEGIN {settings.begin}")
+
+
+def create_warehouse_engine(
+    url: Optional[str] = None,
+    preset: Optional[str] = None,
+    settings: Optional[EngineSettings] = None,
+    **engine_kwargs,
+) -> Engine:
+    url = make_url(url or DATABASE_URL)
+    settings = settings or settings_from_env(preset)
+
+    if url.get_backend_name() != "sqlite":
+        return create_engine(url, **engine_kwargs)
+
+    if settings.read_only:
+        url = _read_only_url(url)
+    if _is_file_database(url):
+        engine_kwargs.setdefault("pool_size", settings.pool_size)
+        engine_kwargs.setdefault("max_overflow", settings.max_overflow)
+        engine_kwargs.setdefault("pool_timeout", settings.pool_timeout)
+        engine_kwargs.setdefault("pool_recycle", settings.pool_recycle)
+
+    engine = create_engine(url, **engine_kwargs)
+    _install_sqlite_events(engine, settings)
+    return engine
+
+
+def read_only_engine(engine: Engine) -> Engine:
+    """``engine`` with the same pool, for connections that only read."""
+    return engine.execution_options(**{READ_ONLY_OPTION: True})
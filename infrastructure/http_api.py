@@ -0,0 +1,216 @@
+import json
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Callable, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from sqlalchemy.exc import NoResultFound
+
+from domain.exceptions import WarehouseError
+from domain.models import Order, Product
+from domain.services import WarehouseService
+
+logger = logging.getLogger(__name__)
+
+
+class ApiError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def product_to_dict(product: Product) -> dict:
+    return {
+        "id": product.id,
+        "name": product.name,
+        "quantity": product.quantity,
+        "price": product.price,
+    }
+
+
+def order_to_dict(order: Order) -> dict:
+    return {
+        "id": order.id,
+        "created_at": order.created_at.isoformat() if order.created_at else None,
+        "total_cost": order.total_order_cost,
+        "items": [
+            {
+                "product_id": item.product.id,
+                "name": item.product.name,
+                "quantity_ordered": item.quantity_ordered,
+                "price_at_purchase": item.price_at_purchase,
+                "total_cost": item.total_cost,
+            }
+            for item in order.items
+        ],
+    }
+
+
+def _query_int(query: dict, name: str) -> Optional[int]:
+    values = query.get(name)
+    if not values:
+        return None
+    try:
+        return int(values[0])
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"'{name}' must be an integer")
+
+
+class WarehouseRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Idle keep-alive connections give their worker back after this long.
+    timeout = 15
+    # Headers and body are written separately; without TCP_NODELAY every
+    # keep-alive response stalls on Nagle + delayed ACK (~40 ms).
+    disable_nagle_algorithm = True
+    server: "WarehouseHTTPServer"
+
+    ROUTES = [
+        ("GET", re.compile(r"^/products$"), "list_products"),
+        ("POST", re.compile(r"^/products$"), "create_product"),
+        ("GET", re.compile(r"^/products/(\d+)$"), "get_product"),
+        ("POST", re.compile(r"^/orders$"), "create_order"),
+        ("GET", re.compile(r"^/orders/(\d+)$"), "get_order"),
+    ]
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method: str):
+        url = urlsplit(self.path)
+        try:
+            for route_method, pattern, name in self.ROUTES:
+                match = pattern.match(url.path)
+                if match and route_method == method:
+                    args = [int(group) for group in match.groups()]
+                    service = self.server.service_factory()
+                    status, body = getattr(self, name)(
+                        service, parse_qs(url.query), *args
+                    )
+                    break
+            else:
+                raise ApiError(
+                    HTTPStatus.NOT_FOUND, f"No route for {method} {url.path}"
+                )
+        except ApiError as e:
+            status, body = e.status, {"error": str(e)}
+        except NoResultFound:
+            status, body = HTTPStatus.NOT_FOUND, {"error": "Not found"}
+        except WarehouseError as e:
+            status, body = HTTPStatus.CONFLICT, {"error": str(e)}
+        except Exception:
+            logger.exception("API: Unhandled error for %s %s", method, self.path)
+            status, body = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal error"}
+        self._send_json(status, body)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as e:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Invalid JSON: {e}")
+        if not isinstance(payload, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Request body must be an object")
+        return payload
+
+    def _send_json(self, status: HTTPStatus, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("API: %s %s", self.address_string(), format % args)
+
+    def list_products(self, service: WarehouseService, query: dict):
+        products = service.list_all_products(
+            limit=_query_int(query, "limit"), after_id=_query_int(query, "after")
+        )
+        return HTTPStatus.OK, [product_to_dict(p) for p in products]
+
+    def create_product(self, service: WarehouseService, query: dict):
+        payload = self._read_json()
+        try:
+            name = str(payload["name"])
+            quantity = int(payload["quantity"])
+            price = float(payload["price"])
+        except (KeyError, TypeError, ValueError) as e:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Invalid product: {e}")
+        product = service.create_product(name=name, quantity=quantity, price=price)
+        return HTTPStatus.CREATED, product_to_dict(product)
+
+    def get_product(self, service: WarehouseService, query: dict, product_id: int):
+        return HTTPStatus.OK, product_to_dict(service.get_product_details(product_id))
+
+    def create_order(self, service: WarehouseService, query: dict):
+        payload = self._read_json()
+        try:
+            items = [(int(pid), int(qty)) for pid, qty in payload["items"]]
+        except (KeyError, TypeError, ValueError) as e:
+            raise ApiError(
+                HTTPStatus.BAD_REQUEST,
+                f"Invalid items, expected [[product_id, quantity], ...]: {e}",
+            )
+        order = service.create_order(items)
+        if not order.items:
+            raise ApiError(
+                HTTPStatus.UNPROCESSABLE_ENTITY,
+                "No items could be ordered (unknown products or not enough stock)",
+            )
+        return HTTPStatus.CREATED, order_to_dict(order)
+
+    def get_order(self, service: WarehouseService, query: dict, order_id: int):
+        order = service.get_order(order_id)
+        if order is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"Order {order_id} not found")
+        return HTTPStatus.OK, order_to_dict(order)
+
+
+class WarehouseHTTPServer(HTTPServer):
+    """HTTP server handling each connection on a bounded thread pool.
+
+    At most ``workers`` connections are served at once and ``backlog`` more
+    wait in the pool queue; beyond that the accept loop blocks and new
+    clients queue in the kernel listen backlog.
+    """
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        service_factory: Callable[[], WarehouseService],
+        workers: int = 8,
+        backlog: int = 64,
+    ):
+        super().__init__(address, WarehouseRequestHandler)
+        self.service_factory = service_factory
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="warehouse-api"
+        )
+        self._slots = threading.BoundedSemaphore(workers + backlog)
+
+    def process_request(self, request, client_address):
+        self._slots.acquire()
+        self._pool.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=True)
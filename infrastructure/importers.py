@@ -0,0 +1,90 @@
+import csv
+import json
+import logging
+from typing import Iterator, Optional, TextIO
+
+from domain.models import Product
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "jsonl")
+
+
+def detect_format(path: str, default: str = "csv") -> str:
+    if path.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    if path.endswith(".csv"):
+        return "csv"
+    return default
+
+
+def _to_product(record: dict, line_no: int) -> Optional[Product]:
+    try:
+        return Product(
+            id=None,
+            name=str(record["name"]),
+            quantity=int(record["quantity"]),
+            price=float(record["price"]),
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        logger.warning(
+            "IMPORT: Invalid product record on line %d: %s. Skipping", line_no, e
+        )
+        return None
+
+
+def _csv_records(stream: TextIO) -> Iterator[tuple[int, dict]]:
+    reader = csv.DictReader(stream)
+    for record in reader:
+        yield reader.line_num, record
+
+
+def _jsonl_records(stream: TextIO) -> Iterator[tuple[int, dict]]:
+    for line_no, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            logger.warning("IMPORT: Invalid JSON on line %d: %s. Skipping", line_no, e)
+            continue
+        if isinstance(record, dict):
+            yield line_no, record
+        else:
+            logger.warning("IMPORT: Line %d is not a JSON object. Skipping", line_no)
+
+
+def read_products(stream: TextIO, fmt: str = "csv") -> Iterator[Product]:
+    if fmt == "csv":
+        records = _csv_records(stream)
+    elif fmt == "jsonl":
+        records = _jsonl_records(stream)
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+    for line_no, record in records:
+        product = _to_product(record, line_no)
+        if product is not None:
+            yield product
+
+
+def read_stock_deltas(stream: TextIO) -> Iterator[tuple[int, int]]:
+    """``product_id,delta`` CSV rows, with or without a header line."""
+    reader = csv.reader(stream)
+    for row in reader:
+        if not row:
+            continue
+        if reader.line_num == 1 and [cell.strip() for cell in row] == [
+            "product_id",
+            "delta",
+        ]:
+            continue
+        try:
+            product_id, delta = row
+            yield int(product_id), int(delta)
+        except ValueError as e:
+            logger.warning(
+                "IMPORT: Invalid stock record on line %d: %s. Skipping",
+                reader.line_num,
+                e,
+            )
@@ -0,0 +1,158 @@
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from typing import Iterator, List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Collectors active in the current thread/task. Queries and mapped rows are
+# reported to every one of them, so a unit of work can be measured inside a
+# wider profiling scope.
+_collectors: ContextVar[tuple] = ContextVar("warehouse_collectors", default=())
+
+
+@dataclass
+class QueryRecord:
+    statement: str
+    duration: float
+    executemany: bool = False
+
+
+@dataclass
+class QueryLog:
+    queries: List[QueryRecord] = field(default_factory=list)
+    rows_mapped: int = 0
+
+    @property
+    def statement_count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def db_time(self) -> float:
+        return sum(query.duration for query in self.queries)
+
+    def record_query(self, statement: str, duration: float, executemany: bool):
+        self.queries.append(QueryRecord(statement, duration, executemany))
+
+    def record_rows(self, count: int):
+        self.rows_mapped += count
+
+
+@dataclass
+class UnitOfWorkMetrics:
+    statements: int = 0
+    db_time: float = 0.0
+    commit_time: float = 0.0
+    rows_mapped: int = 0
+    duration: float = 0.0
+    failed: bool = False
+
+    def record_query(self, statement: str, duration: float, executemany: bool):
+        self.statements += 1
+        self.db_time += duration
+
+    def record_rows(self, count: int):
+        self.rows_mapped += count
+
+
+class MetricsSink(ABC):
+    @abstractmethod
+    def record(self, metrics: UnitOfWorkMetrics):
+        pass
+
+
+class LoggingMetricsSink(MetricsSink):
+    def __init__(self, level: int = logging.INFO):
+        self.level = level
+
+    def record(self, metrics: UnitOfWorkMetrics):
+        # The metrics object travels on the record for structured handlers.
+        logger.log(
+            self.level,
+            "UOW: statements=%d db=%.2fms commit=%.2fms total=%.2fms rows=%d failed=%s",
+            metrics.statements,
+            metrics.db_time * 1000,
+            metrics.commit_time * 1000,
+            metrics.duration * 1000,
+            metrics.rows_mapped,
+            metrics.failed,
+            extra={"uow_metrics": metrics},
+        )
+
+
+class InMemoryMetricsSink(MetricsSink):
+    def __init__(self):
+        self.records: List[UnitOfWorkMetrics] = []
+        self._lock = threading.Lock()
+
+    def record(self, metrics: UnitOfWorkMetrics):
+        with self._lock:
+            self.records.append(metrics)
+
+
+def start_collecting(collector) -> Token:
+    return _collectors.set(_collectors.get() + (collector,))
+
+
+def stop_collecting(token: Token):
+    _collectors.reset(token)
+
+
+@contextmanager
+def collect(collector):
+    token = start_collecting(collector)
+    try:
+        yield collector
+    finally:
+        stop_collecting(token)
+
+
+def record_rows(count: int):
+    for collector in _collectors.get():
+        collector.record_rows(count)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _collectors.get():
+        conn.info.setdefault("warehouse_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    collectors = _collectors.get()
+    if not collectors:
+        return
+    duration = time.perf_counter() - conn.info["warehouse_query_start"].pop()
+    for collector in collectors:
+        collector.record_query(statement, duration, executemany)
+
+
+def instrument_engine(engine: Engine) -> Engine:
+    """Report the statements executed by ``engine`` to active collectors.
+
+    Safe to call more than once. Statements run while no collector is
+    active cost one context variable lookup.
+    """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    return engine
+
+
+@contextmanager
+def assert_max_queries(engine: Engine, limit: int) -> Iterator[QueryLog]:
+    """Fail with the executed statements if the block runs more than ``limit``."""
+    instrument_engine(engine)
+    with collect(QueryLog()) as log:
+        yield log
+    if log.statement_count > limit:
+        statements = "\n".join(f"  {query.statement}" for query in log.queries)
+        raise AssertionError(
+            f"Expected at most {limit} queries, got {log.statement_count}:\n{statements}"
+        )
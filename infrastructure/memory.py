@@ -0,0 +1,478 @@
+import bisect
+import os
+import pickle
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+from heapq import merge
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy.exc import NoResultFound
+
+from domain.exceptions import ConcurrentUpdateError
+from domain.models import (
+    Order,
+    OrderSummary,
+    Product,
+    ProductSales,
+    SalesSummary,
+    StockAdjustment,
+)
+from domain.search import MIN_PREFIX_LENGTH, search_terms
+from domain.repositories import (
+    OrderRepository,
+    ProductRepository,
+    SalesReportRepository,
+)
+from domain.unit_of_work import UnitOfWork
+
+SNAPSHOT_FORMAT = 1
+
+
+def _copy(product: Product) -> Product:
+    return Product(
+        product.id, product.name, product.quantity, product.price, product.version
+    )
+
+
+def _with_ids(ids: List[int], new_ids: List[int]) -> List[int]:
+    if len(new_ids) > 1:
+        new_ids = sorted(new_ids)
+    if not ids or not new_ids or new_ids[0] > ids[-1]:
+        ids.extend(new_ids)
+        return ids
+    # Ids committed out of order: build a new list rather than shifting
+    # elements under readers that iterate the old one by position.
+    return sorted(ids + new_ids)
+
+
+def _ids_after(
+    committed: List[int], pending: List[int], after_id: Optional[int]
+) -> Iterator[int]:
+    start = 0 if after_id is None else bisect.bisect_right(committed, after_id)
+    pending = sorted(i for i in pending if after_id is None or i > after_id)
+    return merge(islice(committed, start, None), pending)
+
+
+class InMemoryStore:
+    """Committed state shared by in-memory units of work.
+
+    Committed products are never modified in place: a commit replaces them
+    with new objects, so readers only ever see whole committed versions.
+    """
+
+    def __init__(self):
+        self.products: Dict[int, Product] = {}
+        self.product_ids: List[int] = []
+        self.orders: Dict[int, Order] = {}
+        self.order_ids: List[int] = []
+        self.next_product_id = 1
+        self.next_order_id = 1
+        self.lock = threading.Lock()
+
+    def allocate_product_ids(self, count: int) -> range:
+        with self.lock:
+            first = self.next_product_id
+            self.next_product_id += count
+        return range(first, first + count)
+
+    def allocate_order_id(self) -> int:
+        with self.lock:
+            order_id = self.next_order_id
+            self.next_order_id += 1
+        return order_id
+
+    def save(self, path: str):
+        """Write the committed state to ``path`` atomically (pickle)."""
+        with self.lock:
+            state = {
+                "format": SNAPSHOT_FORMAT,
+                "products": self.products,
+                "orders": self.orders,
+                "next_product_id": self.next_product_id,
+                "next_order_id": self.next_order_id,
+            }
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as stream:
+                pickle.dump(state, stream, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "InMemoryStore":
+        """Read a snapshot written by ``save``. Only load trusted files: the
+        format is pickle."""
+        with open(path, "rb") as stream:
+            state = pickle.load(stream)
+        if state.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported snapshot format: {state.get('format')}")
+        store = cls()
+        store.products = state["products"]
+        store.product_ids = sorted(store.products)
+        store.orders = state["orders"]
+        store.order_ids = sorted(store.orders)
+        store.next_product_id = state["next_product_id"]
+        store.next_order_id = state["next_order_id"]
+        return store
+
+
+class _Changes:
+    """Writes of one unit of work, applied to the store on commit."""
+
+    __slots__ = (
+        "products",
+        "new_product_ids",
+        "base_versions",
+        "orders",
+        "new_order_ids",
+    )
+
+    def __init__(self):
+        self.products: Dict[int, Product] = {}
+        self.new_product_ids: List[int] = []
+        # Committed version each changed product had when first written.
+        self.base_versions: Dict[int, int] = {}
+        self.orders: Dict[int, Order] = {}
+        self.new_order_ids: List[int] = []
+
+
+class InMemoryProductRepository(ProductRepository):
+    def __init__(self, store: InMemoryStore, changes: _Changes):
+        self.store = store
+        self.changes = changes
+
+    def _current(self, product_id: int) -> Optional[Product]:
+        product = self.changes.products.get(product_id)
+        if product is None:
+            product = self.store.products.get(product_id)
+        return product
+
+    def _write(self, product: Product):
+        if (
+            product.id not in self.changes.products
+            and product.id in self.store.products
+        ):
+            self.changes.base_versions[product.id] = self.store.products[
+                product.id
+            ].version
+        self.changes.products[product.id] = product
+
+    def add(self, product: Product):
+        (product.id,) = self.store.allocate_product_ids(1)
+        self.changes.products[product.id] = _copy(product)
+        self.changes.new_product_ids.append(product.id)
+
+    def add_many(self, products: Iterable[Product]) -> int:
+        products = list(products)
+        for product, product_id in zip(
+            products, self.store.allocate_product_ids(len(products))
+        ):
+            product.id = product_id
+            self.changes.products[product_id] = _copy(product)
+            self.changes.new_product_ids.append(product_id)
+        return len(products)
+
+    def get(self, product_id: int) -> Product:
+        product = self._current(product_id)
+        if product is None:
+            # Same error as the SQL repository, which callers map to not found.
+            raise NoResultFound(f"No product with id {product_id}")
+        return _copy(product)
+
+    def get_many(self, product_ids: Iterable[int]) -> Dict[int, Product]:
+        products = {}
+        for product_id in set(product_ids):
+            product = self._current(product_id)
+            if product is not None:
+                products[product_id] = _copy(product)
+        return products
+
+    def list(self) -> List[Product]:
+        return list(self.iter_products())
+
+    def iter_products(
+        self, batch_size: int = 1000, after_id: Optional[int] = None
+    ) -> Iterator[Product]:
+        if batch_size <= 0:
+            raise ValueError("Batch size must be positive")
+        for product_id in _ids_after(
+            self.store.product_ids, self.changes.new_product_ids, after_id
+        ):
+            yield _copy(self._current(product_id))
+
+    def search_products(self, query: str, limit: int = 20) -> List[Product]:
+        terms = search_terms(query)
+        if not terms:
+            return []
+        ranked = []
+        for product in self.iter_products():
+            words = search_terms(product.name)
+            exact = 0
+            for term in terms:
+                if term in words:
+                    exact += 1
+                elif len(term) < MIN_PREFIX_LENGTH or not any(
+                    word.startswith(term) for word in words
+                ):
+                    break
+            else:
+                # Whole-word hits and shorter names first, like bm25 would.
+                ranked.append((-exact, len(words), product.id, product))
+        ranked.sort(key=lambda entry: entry[:3])
+        return [entry[3] for entry in ranked[:limit]]
+
+    def update(self, product: Product):
+        current = self._current(product.id)
+        if current is None:
+            raise ValueError(f"Product with ID {product.id} not found")
+        if current.version != product.version:
+            raise ConcurrentUpdateError(
+                f"Product {product.id} was modified concurrently"
+            )
+        product.version += 1
+        self._write(_copy(product))
+
+    def reserve_many(self, quantities: Dict[int, int]):
+        current = {product_id: self._current(product_id) for product_id in quantities}
+        short = sorted(
+            product_id
+            for product_id, quantity in quantities.items()
+            if current[product_id] is None or current[product_id].quantity < quantity
+        )
+        if short:
+            raise ConcurrentUpdateError(
+                f"Stock changed concurrently for products {short}"
+            )
+        for product_id, quantity in quantities.items():
+            product = _copy(current[product_id])
+            product.quantity -= quantity
+            product.version += 1
+            self._write(product)
+
+    def adjust_stock_many(self, deltas: Dict[int, int]) -> StockAdjustment:
+        result = StockAdjustment()
+        for product_id, delta in deltas.items():
+            current = self._current(product_id)
+            if current is None:
+                result.unknown_ids.append(product_id)
+            elif current.quantity + delta < 0:
+                result.negative_stock[product_id] = current.quantity + delta
+            else:
+                product = _copy(current)
+                product.quantity += delta
+                product.version += 1
+                self._write(product)
+                result.applied += 1
+        return result
+
+
+def _in_window(
+    order: Order,
+    after_id: Optional[int] = None,
+    max_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+) -> bool:
+    if after_id is not None and order.id <= after_id:
+        return False
+    if max_id is not None and order.id > max_id:
+        return False
+    if created_from is not None and order.created_at < created_from:
+        return False
+    if created_to is not None and order.created_at >= created_to:
+        return False
+    return True
+
+
+class InMemoryOrderRepository(OrderRepository):
+    def __init__(self, store: InMemoryStore, changes: _Changes):
+        self.store = store
+        self.changes = changes
+
+    def _current(self, order_id: int) -> Optional[Order]:
+        order = self.changes.orders.get(order_id)
+        if order is None:
+            order = self.store.orders.get(order_id)
+        return order
+
+    def add(self, order: Order):
+        missing_ids = {
+            item.product.id
+            for item in order.items
+            if item.product.id not in self.changes.products
+            and item.product.id not in self.store.products
+        }
+        if missing_ids:
+            raise ValueError(
+                f"Cannot save order item, Product with ids {sorted(missing_ids)} not found."
+            )
+        order.id = self.store.allocate_order_id()
+        if order.created_at is None:
+            order.created_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        self.changes.orders[order.id] = order
+        self.changes.new_order_ids.append(order.id)
+
+    def get(self, order_id: int) -> Optional[Order]:
+        return self._current(order_id)
+
+    def list(self) -> List[Order]:
+        return list(self.iter_orders())
+
+    def iter_orders(
+        self,
+        batch_size: int = 500,
+        after_id: Optional[int] = None,
+        max_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> Iterator[Order]:
+        if batch_size <= 0:
+            raise ValueError("Batch size must be positive")
+        for order_id in _ids_after(
+            self.store.order_ids, self.changes.new_order_ids, after_id
+        ):
+            if max_id is not None and order_id > max_id:
+                return
+            order = self._current(order_id)
+            if _in_window(order, created_from=created_from, created_to=created_to):
+                yield order
+
+    def list_summaries(
+        self,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> List[OrderSummary]:
+        orders = self.iter_orders(
+            after_id=after_id, created_from=created_from, created_to=created_to
+        )
+        return [
+            OrderSummary(
+                id=order.id,
+                total_cost=order.total_order_cost,
+                item_count=len(order.items),
+                created_at=order.created_at,
+            )
+            for order in islice(orders, limit)
+        ]
+
+
+class InMemorySalesReportRepository(SalesReportRepository):
+    ORDERINGS = ("revenue", "units")
+
+    def __init__(self, orders: InMemoryOrderRepository):
+        self.orders = orders
+
+    def _orders(self, after_id, max_id, created_from, created_to) -> Iterator[Order]:
+        return self.orders.iter_orders(
+            after_id=after_id,
+            max_id=max_id,
+            created_from=created_from,
+            created_to=created_to,
+        )
+
+    def summary(
+        self,
+        after_id: Optional[int] = None,
+        max_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> SalesSummary:
+        order_count = units_sold = 0
+        revenue = 0.0
+        for order in self._orders(after_id, max_id, created_from, created_to):
+            if not order.items:
+                continue
+            order_count += 1
+            for item in order.items:
+                units_sold += item.quantity_ordered
+                revenue += item.total_cost
+        return SalesSummary(
+            order_count=order_count, units_sold=units_sold, revenue=revenue
+        )
+
+    def product_sales(
+        self,
+        after_id: Optional[int] = None,
+        max_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        order_by: str = "revenue",
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> List[ProductSales]:
+        if order_by not in self.ORDERINGS:
+            raise ValueError(f"Unsupported report ordering: {order_by}")
+        units: Dict[int, int] = defaultdict(int)
+        revenue: Dict[int, float] = defaultdict(float)
+        names: Dict[int, str] = {}
+        for order in self._orders(after_id, max_id, created_from, created_to):
+            for item in order.items:
+                product_id = item.product.id
+                units[product_id] += item.quantity_ordered
+                revenue[product_id] += item.total_cost
+                names[product_id] = item.product.name
+        primary = revenue if order_by == "revenue" else units
+        ranked = sorted(
+            units, key=lambda product_id: (-primary[product_id], product_id)
+        )
+        return [
+            ProductSales(
+                product_id=product_id,
+                name=names[product_id],
+                units_sold=units[product_id],
+                revenue=revenue[product_id],
+            )
+            for product_id in ranked[:limit]
+        ]
+
+
+class InMemoryUnitOfWork(UnitOfWork):
+    """Unit of work over an ``InMemoryStore``, with the same commit/rollback
+    behaviour as ``SqlAlchemyUnitOfWork`` but no database.
+
+    Writes stay private to the unit of work until ``commit()``, which fails
+    with ConcurrentUpdateError if another unit of work committed a newer
+    version of a product this one changed.
+    """
+
+    def __init__(self, store: Optional[InMemoryStore] = None):
+        self.store = store if store is not None else InMemoryStore()
+        self._changes = _Changes()
+        self.products = InMemoryProductRepository(self.store, self._changes)
+        self.orders = InMemoryOrderRepository(self.store, self._changes)
+        self.reports = InMemorySalesReportRepository(self.orders)
+
+    def __enter__(self):
+        self._reset()
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        if exception_type:
+            self.rollback()
+        else:
+            self.commit()
+
+    def commit(self):
+        changes = self._changes
+        if not changes.products and not changes.orders:
+            return
+        store = self.store
+        with store.lock:
+            for product_id, version in changes.base_versions.items():
+                if store.products[product_id].version != version:
+                    raise ConcurrentUpdateError(
+                        f"Product {product_id} was modified concurrently"
+                    )
+            store.products.update(changes.products)
+            store.orders.update(changes.orders)
+            store.product_ids = _with_ids(store.product_ids, changes.new_product_ids)
+            store.order_ids = _with_ids(store.order_ids, changes.new_order_ids)
+        self._reset()
+
+    def rollback(self):
+        self._reset()
+
+    def _reset(self):
+        self._changes = _Changes()
+        self.products.changes = self.orders.changes = self._changes
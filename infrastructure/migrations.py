@@ -0,0 +1,175 @@
+import logging
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from sqlalchemy import Connection, Engine
+
+from .database import read_only_engine
+from .orm import PRODUCT_CHANGES_TRIGGER, PRODUCTS_FTS_DDL, PRODUCTS_FTS_TABLE
+
+logger = logging.getLogger(__name__)
+
+VERSION_TABLE = "schema_version"
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+
+# Every migration must be idempotent: a database created by
+# Base.metadata.create_all already has the latest schema but no version rows.
+
+
+def _add_performance_indexes(conn: Connection):
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_order_items_order_id "
+        "ON order_items (order_id, product_id, quantity_ordered, price_at_purchase)"
+    )
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_order_items_product_id "
+        "ON order_items (product_id, quantity_ordered, price_at_purchase)"
+    )
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_products_name ON products (name)"
+    )
+    conn.exec_driver_sql("ANALYZE")
+
+
+def _column_names(conn: Connection, table: str) -> set:
+    return {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+
+
+def _add_product_version(conn: Connection):
+    if "version" not in _column_names(conn, "products"):
+        conn.exec_driver_sql(
+            "ALTER TABLE products ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+        )
+
+
+def _denormalize_order_totals(conn: Connection):
+    columns = _column_names(conn, "orders")
+    for name, ddl in [
+        ("total_cost", "FLOAT"),
+        ("item_count", "INTEGER"),
+        ("created_at", "DATETIME"),
+    ]:
+        if name not in columns:
+            conn.exec_driver_sql(f"ALTER TABLE orders ADD COLUMN {name} {ddl}")
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_orders_created_at ON orders (created_at)"
+    )
+    # Backfill totals of existing orders; their creation time is unknown and
+    # stays NULL.
+    conn.exec_driver_sql(
+        "UPDATE orders SET "
+        "total_cost = (SELECT COALESCE(SUM(quantity_ordered * price_at_purchase), 0) "
+        "FROM order_items WHERE order_items.order_id = orders.id), "
+        "item_count = (SELECT COUNT(*) FROM order_items "
+        "WHERE order_items.order_id = orders.id) "
+        "WHERE total_cost IS NULL OR item_count IS NULL"
+    )
+
+
+def _add_products_fts(conn: Connection):
+    for statement in PRODUCTS_FTS_DDL:
+        conn.exec_driver_sql(statement)
+    # Index the names of existing products.
+    conn.exec_driver_sql(
+        f"INSERT INTO {PRODUCTS_FTS_TABLE} ({PRODUCTS_FTS_TABLE}) VALUES ('rebuild')"
+    )
+
+
+def _add_order_snapshots(conn: Connection):
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS order_snapshots ("
+        "order_id INTEGER NOT NULL PRIMARY KEY REFERENCES orders (id), "
+        "data BLOB NOT NULL)"
+    )
+
+
+def _add_product_changes(conn: Connection):
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS product_changes ("
+        "product_id INTEGER NOT NULL PRIMARY KEY REFERENCES products (id), "
+        "seq INTEGER NOT NULL)"
+    )
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_product_changes_seq ON product_changes (seq)"
+    )
+    conn.exec_driver_sql(PRODUCT_CHANGES_TRIGGER)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        1, "Index order_items foreign keys and products.name", _add_performance_indexes
+    ),
+    Migration(2, "Add products.version for optimistic locking", _add_product_version),
+    Migration(
+        3,
+        "Store total_cost, item_count and created_at on orders",
+        _denormalize_order_totals,
+    ),
+    Migration(
+        4, "Add products_fts full-text index on product names", _add_products_fts
+    ),
+    Migration(5, "Add order_snapshots for the order cache", _add_order_snapshots),
+    Migration(
+        6,
+        "Track product changes for incremental stock snapshots",
+        _add_product_changes,
+    ),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def _ensure_version_table(conn: Connection):
+    conn.exec_driver_sql(
+        f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} ("
+        "version INTEGER PRIMARY KEY, "
+        "description TEXT NOT NULL, "
+        "applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+    )
+
+
+def current_version(conn: Connection) -> int:
+    exists = conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (VERSION_TABLE,),
+    ).first()
+    if not exists:
+        return 0
+    return conn.exec_driver_sql(
+        f"SELECT COALESCE(MAX(version), 0) FROM {VERSION_TABLE}"
+    ).scalar()
+
+
+def schema_is_current(engine: Engine) -> bool:
+    with read_only_engine(engine).connect() as conn:
+        return current_version(conn) >= LATEST_VERSION
+
+
+def migrate(engine: Engine, target: Optional[int] = None) -> List[Migration]:
+    target = LATEST_VERSION if target is None else target
+    applied = []
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+        version = current_version(conn)
+
+    for migration in MIGRATIONS:
+        if migration.version <= version or migration.version > target:
+            continue
+        logger.info(
+            "MIGRATE: Applying %d: %s", migration.version, migration.description
+        )
+        with engine.begin() as conn:
+            migration.apply(conn)
+            conn.exec_driver_sql(
+                f"INSERT INTO {VERSION_TABLE} (version, description) VALUES (?, ?)",
+                (migration.version, migration.description),
+            )
+        applied.append(migration)
+    return applied
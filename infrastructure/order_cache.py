@@ -0,0 +1,215 @@
+import struct
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Set
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from domain.models import Order, OrderItem, OrderSummary, Product
+from domain.repositories import OrderRepository
+from .orm import OrderSnapshotORM
+
+SNAPSHOT_FORMAT = 1
+
+# format, order id, created_at in microseconds since the epoch, item count
+_HEADER = struct.Struct("<BqqI")
+# product id, quantity ordered, price at purchase, product quantity, product
+# price, product version, length of the UTF-8 product name that follows
+_ITEM = struct.Struct("<qqdqdqI")
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_NO_TIME = -(2**63)
+
+
+def encode_order(order: Order) -> bytes:
+    created_at = (
+        _NO_TIME
+        if order.created_at is None
+        else (order.created_at - _EPOCH) // _MICROSECOND
+    )
+    parts = [_HEADER.pack(SNAPSHOT_FORMAT, order.id, created_at, len(order.items))]
+    for item in order.items:
+        product = item.product
+        name = product.name.encode()
+        parts.append(
+            _ITEM.pack(
+                product.id,
+                item.quantity_ordered,
+                item.price_at_purchase,
+                product.quantity,
+                product.price,
+                product.version,
+                len(name),
+            )
+        )
+        parts.append(name)
+    return b"".join(parts)
+
+
+def decode_order(data: bytes) -> Order:
+    snapshot_format, order_id, created_at, count = _HEADER.unpack_from(data)
+    if snapshot_format != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported order snapshot format {snapshot_format}")
+    order = Order(
+        id=order_id,
+        created_at=None
+        if created_at == _NO_TIME
+        else _EPOCH + created_at * _MICROSECOND,
+    )
+    products: Dict[int, Product] = {}
+    offset = _HEADER.size
+    for _ in range(count):
+        (
+            product_id,
+            quantity_ordered,
+            price_at_purchase,
+            quantity,
+            price,
+            version,
+            name_size,
+        ) = _ITEM.unpack_from(data, offset)
+        offset += _ITEM.size
+        # Items of one order share a single Product per product id, as when
+        # the order is loaded from the database.
+        product = products.get(product_id)
+        if product is None:
+            name = data[offset : offset + name_size].decode()
+            product = products[product_id] = Product(
+                product_id, name, quantity, price, version
+            )
+        offset += name_size
+        order.items.append(OrderItem(product, quantity_ordered, price_at_purchase))
+    return order
+
+
+class OrderCache:
+    """Process-wide LRU of serialized orders shared by units of work.
+
+    Orders never change once committed, so entries are only dropped by the
+    size bound. With ``persist`` snapshots of new orders are also stored in
+    the ``order_snapshots`` table and survive restarts.
+
+    A snapshot keeps the product as it was when the snapshot was taken:
+    stock, name and price of the product may have changed since, while the
+    order's own fields (quantities, prices at purchase) are exact.
+    """
+
+    def __init__(self, max_size: int = 1024, persist: bool = False):
+        if max_size <= 0:
+            raise ValueError("Cache size must be positive")
+        self.max_size = max_size
+        self.persist = persist
+        self._entries: "OrderedDict[int, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, order_id: int) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(order_id)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(order_id)
+            self.hits += 1
+            return data
+
+    def put(self, order_id: int, data: bytes):
+        with self._lock:
+            self._entries[order_id] = data
+            self._entries.move_to_end(order_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "bytes": sum(map(len, self._entries.values())),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class CachedOrderRepository(OrderRepository):
+    """Read-through order cache: memory, then ``order_snapshots`` when the
+    cache persists, then the wrapped repository.
+
+    Orders added through this repository bypass the memory tier: the id of
+    a rolled back insert is reused by the next order.
+    """
+
+    def __init__(
+        self, repository: OrderRepository, cache: OrderCache, session: Session
+    ):
+        self.repository = repository
+        self.cache = cache
+        self.session = session
+        self.added: Set[int] = set()
+
+    def add(self, order: Order):
+        self.repository.add(order)
+        self.added.add(order.id)
+        if self.cache.persist:
+            self.session.execute(
+                insert(OrderSnapshotORM).values(
+                    order_id=order.id, data=encode_order(order)
+                )
+            )
+
+    def get(self, order_id: int) -> Optional[Order]:
+        if order_id in self.added:
+            return self.repository.get(order_id)
+        data = self.cache.get(order_id)
+        if data is None and self.cache.persist:
+            data = self.session.scalar(
+                select(OrderSnapshotORM.data).where(
+                    OrderSnapshotORM.order_id == order_id
+                )
+            )
+            if data is not None:
+                self.cache.put(order_id, data)
+        if data is not None:
+            return decode_order(data)
+        order = self.repository.get(order_id)
+        if order is not None:
+            self.cache.put(order_id, encode_order(order))
+        return order
+
+    def list(self) -> List[Order]:
+        return self.repository.list()
+
+    def iter_orders(
+        self,
+        batch_size: int = 500,
+        after_id: Optional[int] = None,
+        max_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> Iterator[Order]:
+        return self.repository.iter_orders(
+            batch_size=batch_size,
+            after_id=after_id,
+            max_id=max_id,
+            created_from=created_from,
+            created_to=created_to,
+        )
+
+    def list_summaries(
+        self,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> List[OrderSummary]:
+        return self.repository.list_summaries(
+            limit=limit,
+            after_id=after_id,
+            created_from=created_from,
+            created_to=created_to,
+        )
@@ -0,0 +1,97 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import sessionmaker
+
+from domain.exceptions import WarehouseError
+from domain.services import RetryPolicy, WarehouseService
+from .database import create_warehouse_engine
+from .order_cache import OrderCache
+from .product_cache import ProductCache
+from .sharding import ShardedUnitOfWork, ShardRouter, create_shard_engines
+from .unit_of_work import SqlAlchemyUnitOfWork
+
+logger = logging.getLogger(__name__)
+
+_service: Optional[WarehouseService] = None
+
+
+@dataclass
+class OrderOutcome:
+    order_id: Optional[int]
+    items: List[tuple[int, int]] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+def _init_worker(
+    database_url: Optional[str],
+    preset: Optional[str],
+    cache_size: int,
+    retry_policy: RetryPolicy,
+    order_snapshots: bool,
+    router: Optional[ShardRouter],
+):
+    global _service
+    if router is not None:
+        engines = create_shard_engines(router.shard_count, database_url, preset)
+        uow = ShardedUnitOfWork(
+            [sessionmaker(bind=engine, autoflush=False) for engine in engines], router
+        )
+    else:
+        engine = create_warehouse_engine(database_url, preset=preset)
+        uow = SqlAlchemyUnitOfWork(
+            sessionmaker(bind=engine, autoflush=False),
+            product_cache=ProductCache(cache_size) if cache_size else None,
+            # Workers never read orders back; the cache only persists snapshots.
+            order_cache=OrderCache(persist=True) if order_snapshots else None,
+        )
+    _service = WarehouseService(uow, retry_policy=retry_policy)
+
+
+def _place_order(order_details: List[tuple[int, int]]) -> OrderOutcome:
+    try:
+        order = _service.create_order(order_details)
+    except (WarehouseError, SQLAlchemyError) as e:
+        logger.error("RUNNER: Order %s failed: %s", order_details, e)
+        return OrderOutcome(order_id=None, error=str(e))
+    return OrderOutcome(
+        order_id=order.id,
+        items=[(item.product.id, item.quantity_ordered) for item in order.items],
+    )
+
+
+def run_orders(
+    orders: Iterable[List[tuple[int, int]]],
+    database_url: Optional[str] = None,
+    preset: Optional[str] = None,
+    workers: Optional[int] = None,
+    cache_size: int = 0,
+    retry_policy: Optional[RetryPolicy] = None,
+    chunksize: int = 16,
+    order_snapshots: bool = False,
+    router: Optional[ShardRouter] = None,
+) -> Iterator[OrderOutcome]:
+    """Place orders from ``orders`` on a pool of worker processes.
+
+    Every worker owns its engine and unit of work; stock consistency relies
+    on the guarded reservation and version checks in the repositories, with
+    conflicts retried according to ``retry_policy``. With ``router`` the
+    workers use the sharded storage next to ``database_url`` (caches are
+    not used there).
+    """
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(
+            database_url,
+            preset,
+            cache_size,
+            retry_policy or RetryPolicy(),
+            order_snapshots,
+            router,
+        ),
+    ) as pool:
+        yield from pool.map(_place_order, orders, chunksize=chunksize)
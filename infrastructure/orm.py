@@ -1,4 +1,15 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import (
+    DDL,
+    Column,
+    DateTime,
+    Integer,
+    String,
+    Float,
+    ForeignKey,
+    Index,
+    LargeBinary,
+    event,
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -7,20 +18,95 @@ Base = declarative_base()
 
 class ProductORM(Base):
     __tablename__ = "products"
+    __table_args__ = (Index("ix_products_name", "name"),)
     id = Column(Integer, primary_key=True)
     name = Column(String)
     quantity = Column(Integer)
     price = Column(Float)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+# Full-text index over product names. External content: the FTS table keeps
+# only the index and reads names from products, kept in sync by triggers.
+# The update trigger fires on name changes only, so stock updates skip it.
+PRODUCTS_FTS_TABLE = "products_fts"
+PRODUCTS_FTS_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {PRODUCTS_FTS_TABLE} USING fts5("
+    "name, content='products', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products "
+    f"BEGIN INSERT INTO {PRODUCTS_FTS_TABLE} (rowid, name) "
+    "VALUES (new.id, new.name); END",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products "
+    f"BEGIN INSERT INTO {PRODUCTS_FTS_TABLE} ({PRODUCTS_FTS_TABLE}, rowid, name) "
+    "VALUES ('delete', old.id, old.name); END",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name "
+    "ON products WHEN old.name IS NOT new.name "
+    f"BEGIN INSERT INTO {PRODUCTS_FTS_TABLE} ({PRODUCTS_FTS_TABLE}, rowid, name) "
+    "VALUES ('delete', old.id, old.name); "
+    f"INSERT INTO {PRODUCTS_FTS_TABLE} (rowid, name) VALUES (new.id, new.name); END",
+]
+for statement in PRODUCTS_FTS_DDL:
+    event.listen(
+        ProductORM.__table__,
+        "after_create",
+        DDL(statement).execute_if(dialect="sqlite"),
+    )
+
+
+class ProductChangeORM(Base):
+    __tablename__ = "product_changes"
+    # Latest change of each product's name, stock or price, numbered by a
+    # database-wide counter so that stock snapshots can fetch only the rows
+    # changed since they were written. Filled by the trigger below.
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    seq = Column(Integer, nullable=False, index=True)
+
+
+PRODUCT_CHANGES_TRIGGER = (
+    "CREATE TRIGGER IF NOT EXISTS products_changes_update "
+    "AFTER UPDATE OF name, quantity, price ON products "
+    "WHEN old.name IS NOT new.name OR old.quantity IS NOT new.quantity "
+    "OR old.price IS NOT new.price "
+    "BEGIN INSERT INTO product_changes (product_id, seq) VALUES (new.id, "
+    "(SELECT COALESCE(MAX(seq), 0) + 1 FROM product_changes)) "
+    "ON CONFLICT (product_id) DO UPDATE SET seq = excluded.seq; END"
+)
+event.listen(
+    ProductChangeORM.__table__,
+    "after_create",
+    DDL(PRODUCT_CHANGES_TRIGGER).execute_if(dialect="sqlite"),
+)
 
 
 class OrderORM(Base):
     __tablename__ = "orders"
     id = Column(Integer, primary_key=True)
+    # Written once on insert so summaries never need to touch order_items.
+    total_cost = Column(Float)
+    item_count = Column(Integer)
+    created_at = Column(DateTime, index=True)
     items = relationship("OrderItemORM", cascade="all, delete-orphan")
 
 
 class OrderItemORM(Base):
     __tablename__ = "order_items"
+    # Covering indexes for order lookups and per-product sales reporting.
+    __table_args__ = (
+        Index(
+            "ix_order_items_order_id",
+            "order_id",
+            "product_id",
+            "quantity_ordered",
+            "price_at_purchase",
+        ),
+        Index(
+            "ix_order_items_product_id",
+            "product_id",
+            "quantity_ordered",
+            "price_at_purchase",
+        ),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
@@ -28,3 +114,11 @@ class OrderItemORM(Base):
     price_at_purchase = Column(Float, nullable=False)
 
     product = relationship("ProductORM")
+
+
+class OrderSnapshotORM(Base):
+    __tablename__ = "order_snapshots"
+    # Serialized orders (see infrastructure.order_cache), written in the
+    # transaction that creates the order when the on-disk tier is enabled.
+    order_id = Column(Integer, ForeignKey("orders.id"), primary_key=True)
+    data = Column(LargeBinary, nullable=False)
@@ -0,0 +1,190 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+from domain.exceptions import ConcurrentUpdateError
+from domain.models import Product, StockAdjustment
+from domain.repositories import ProductRepository
+
+
+class ProductCache:
+    """Process-wide LRU of products shared by units of work.
+
+    Entries are dropped when a unit of work commits a write to them. Writes
+    made by other processes are only picked up once ``ttl`` expires, so set
+    a TTL whenever several processes write to the same database.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_size <= 0:
+            raise ValueError("Cache size must be positive")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[int, tuple[Product, float]]" = OrderedDict()
+        # Bumped on every invalidation so that a reader which fetched a row
+        # before a concurrent commit cannot put the stale row back.
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, product_id: int) -> Optional[Product]:
+        with self._lock:
+            entry = self._entries.get(product_id)
+            if entry is not None and self.ttl is not None:
+                if self._clock() - entry[1] > self.ttl:
+                    del self._entries[product_id]
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(product_id)
+            self.hits += 1
+            return copy.copy(entry[0])
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def put(self, product: Product, generation: int):
+        with self._lock:
+            if self._generation != generation:
+                return
+            self._entries[product.id] = (copy.copy(product), self._clock())
+            self._entries.move_to_end(product.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, product_ids: Iterable[int]):
+        with self._lock:
+            self._generation += 1
+            for product_id in product_ids:
+                if self._entries.pop(product_id, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+class CachedProductRepository(ProductRepository):
+    """Read-through cache in front of another product repository.
+
+    Products written inside the current unit of work bypass the cache until
+    the unit of work commits; see ``before_commit``/``after_commit``.
+    """
+
+    def __init__(
+        self,
+        repository: ProductRepository,
+        cache: ProductCache,
+        written: Optional[Set[int]] = None,
+    ):
+        self.repository = repository
+        self.cache = cache
+        self.written: Set[int] = set() if written is None else written
+
+    def add(self, product: Product):
+        self.repository.add(product)
+        self.written.add(product.id)
+
+    def add_many(self, products: Iterable[Product]) -> int:
+        return self.repository.add_many(products)
+
+    def get(self, product_id: int) -> Product:
+        if product_id in self.written:
+            return self.repository.get(product_id)
+        product = self.cache.get(product_id)
+        if product is None:
+            generation = self.cache.generation
+            product = self.repository.get(product_id)
+            self.cache.put(product, generation)
+        return product
+
+    def get_many(self, product_ids: Iterable[int]) -> Dict[int, Product]:
+        found: Dict[int, Product] = {}
+        missing: List[int] = []
+        for product_id in set(product_ids):
+            product = None
+            if product_id not in self.written:
+                product = self.cache.get(product_id)
+            if product is None:
+                missing.append(product_id)
+            else:
+                found[product_id] = product
+        if missing:
+            generation = self.cache.generation
+            loaded = self.repository.get_many(missing)
+            for product_id, product in loaded.items():
+                if product_id not in self.written:
+                    self.cache.put(product, generation)
+            found.update(loaded)
+        return found
+
+    def list(self) -> List[Product]:
+        return self.repository.list()
+
+    def iter_products(
+        self, batch_size: int = 1000, after_id: Optional[int] = None
+    ) -> Iterator[Product]:
+        return self.repository.iter_products(batch_size=batch_size, after_id=after_id)
+
+    def search_products(self, query: str, limit: int = 20) -> List[Product]:
+        return self.repository.search_products(query, limit)
+
+    def update(self, product: Product):
+        self.written.add(product.id)
+        try:
+            self.repository.update(product)
+        except ConcurrentUpdateError:
+            # Another process changed the row; whatever we cached is stale.
+            self.cache.invalidate([product.id])
+            raise
+
+    def reserve_many(self, quantities: Dict[int, int]):
+        self.written.update(quantities)
+        try:
+            self.repository.reserve_many(quantities)
+        except ConcurrentUpdateError:
+            self.cache.invalidate(quantities)
+            raise
+
+    def adjust_stock_many(self, deltas: Dict[int, int]) -> StockAdjustment:
+        self.written.update(deltas)
+        try:
+            return self.repository.adjust_stock_many(deltas)
+        except ConcurrentUpdateError:
+            self.cache.invalidate(deltas)
+            raise
+
+    def before_commit(self):
+        self.cache.invalidate(self.written)
+
+    def after_commit(self):
+        self.cache.invalidate(self.written)
+        self.written.clear()
+
+    def after_rollback(self):
+        self.written.clear()
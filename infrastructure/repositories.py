@@ -1,51 +1,273 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session, joinedload
-from domain.models import Order, Product, OrderItem
-from domain.repositories import ProductRepository, OrderRepository
-from .orm import ProductORM, OrderORM, OrderItemORM
+from datetime import datetime, timezone
+from itertools import starmap
+from typing import Dict, Iterable, Iterator, List, Optional
+from sqlalchemy import bindparam, func, insert, literal_column, select, table, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+from domain.exceptions import ConcurrentUpdateError
+from domain.models import (
+    Order,
+    Product,
+    OrderItem,
+    OrderSummary,
+    ProductSales,
+    SalesSummary,
+    StockAdjustment,
+)
+from domain.search import MIN_PREFIX_LENGTH, search_terms
+from domain.repositories import (
+    ProductRepository,
+    OrderRepository,
+    SalesReportRepository,
+)
+from .instrumentation import record_rows
+from .orm import PRODUCTS_FTS_TABLE, ProductORM, OrderORM, OrderItemORM
 import logging
 
 
+def _order_window(
+    stmt,
+    after_id: Optional[int] = None,
+    max_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+):
+    if after_id is not None:
+        stmt = stmt.where(OrderORM.id > after_id)
+    if max_id is not None:
+        stmt = stmt.where(OrderORM.id <= max_id)
+    if created_from is not None:
+        stmt = stmt.where(OrderORM.created_at >= created_from)
+    if created_to is not None:
+        stmt = stmt.where(OrderORM.created_at < created_to)
+    return stmt
+
+
+# Column order matches the Product fields so rows map with Product(*row).
+_PRODUCT_COLUMNS = (
+    ProductORM.id,
+    ProductORM.name,
+    ProductORM.quantity,
+    ProductORM.price,
+    ProductORM.version,
+)
+
+
 class SqlAlchemyProductRepository(ProductRepository):
     def __init__(self, session: Session):
         self.session = session
 
     def add(self, product: Product):
-        product_orm = ProductORM(
-            name=product.name,
-            quantity=product.quantity,
-            price=product.price,
+        # A preset id is kept (sharded storage allocates its own ids); None
+        # lets SQLite assign the next rowid.
+        result = self.session.execute(
+            insert(ProductORM).values(
+                id=product.id,
+                name=product.name,
+                quantity=product.quantity,
+                price=product.price,
+                version=product.version,
+            )
         )
-        self.session.add(product_orm)
-        self.session.flush()
-        product.id = product_orm.id
+        product.id = result.inserted_primary_key[0]
+
+    def add_many(self, products: Iterable[Product]) -> int:
+        rows = [
+            {"id": p.id, "name": p.name, "quantity": p.quantity, "price": p.price}
+            for p in products
+        ]
+        if rows:
+            self.session.execute(insert(ProductORM), rows)
+        return len(rows)
 
     def get(self, product_id: int) -> Product:
-        product_orm = self.session.query(ProductORM).filter_by(id=product_id).one()
-        return Product(
-            id=product_orm.id,
-            name=product_orm.name,
-            quantity=product_orm.quantity,
-            price=product_orm.price,
+        row = self.session.execute(
+            select(*_PRODUCT_COLUMNS).where(ProductORM.id == product_id)
+        ).one()
+        record_rows(1)
+        return Product(*row)
+
+    def get_many(self, product_ids: Iterable[int]) -> Dict[int, Product]:
+        ids = set(product_ids)
+        if not ids:
+            return {}
+        rows = self.session.execute(
+            select(*_PRODUCT_COLUMNS).where(ProductORM.id.in_(ids))
         )
+        products = {row[0]: Product(*row) for row in rows}
+        record_rows(len(products))
+        return products
 
     def list(self) -> List[Product]:
-        products_orm = self.session.query(ProductORM).all()
-        return [
-            Product(id=p.id, name=p.name, quantity=p.quantity, price=p.price)
-            for p in products_orm
-        ]
+        rows = self.session.execute(select(*_PRODUCT_COLUMNS).order_by(ProductORM.id))
+        products = list(starmap(Product, rows))
+        record_rows(len(products))
+        return products
+
+    def iter_products(
+        self, batch_size: int = 1000, after_id: Optional[int] = None
+    ) -> Iterator[Product]:
+        if batch_size <= 0:
+            raise ValueError("Batch size must be positive")
+        stmt = select(*_PRODUCT_COLUMNS).order_by(ProductORM.id).limit(batch_size)
+        last_id = after_id
+        while True:
+            page = stmt if last_id is None else stmt.where(ProductORM.id > last_id)
+            rows = self.session.execute(page).all()
+            record_rows(len(rows))
+            yield from starmap(Product, rows)
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][0]
+
+    def search_products(self, query: str, limit: int = 20) -> List[Product]:
+        terms = search_terms(query)
+        if not terms:
+            return []
+        # Every term as a quoted prefix query; FTS5 ANDs them and ranks
+        # matches by bm25. One-letter prefixes would match and rank a large
+        # share of the catalog, so such terms must match a whole word.
+        match = " ".join(
+            f'"{term}"*' if len(term) >= MIN_PREFIX_LENGTH else f'"{term}"'
+            for term in terms
+        )
+        fts = table(PRODUCTS_FTS_TABLE)
+        rows = self.session.execute(
+            select(*_PRODUCT_COLUMNS)
+            .join_from(
+                fts,
+                ProductORM,
+                ProductORM.id == literal_column(f"{PRODUCTS_FTS_TABLE}.rowid"),
+            )
+            .where(literal_column(PRODUCTS_FTS_TABLE).op("MATCH")(match))
+            .order_by(literal_column(f"{PRODUCTS_FTS_TABLE}.rank"), ProductORM.id)
+            .limit(limit)
+        )
+        products = list(starmap(Product, rows))
+        record_rows(len(products))
+        return products
 
     def update(self, product: Product):
-        product_orm = (
-            self.session.query(ProductORM).filter_by(id=product.id).one_or_none()
+        # Compare-and-swap on version: the write only lands if nobody else
+        # changed the product since it was read.
+        self.session.flush()
+        products = ProductORM.__table__
+        result = self.session.execute(
+            update(products)
+            .where(
+                products.c.id == product.id,
+                products.c.version == product.version,
+            )
+            .values(
+                name=product.name,
+                quantity=product.quantity,
+                price=product.price,
+                version=products.c.version + 1,
+            )
         )
-        if product_orm:
-            product_orm.name = product.name
-            product_orm.quantity = product.quantity
-            product_orm.price = product.price
-        else:
-            raise ValueError(f"Product with id {product.id} not found for update")
+        if result.rowcount == 0:
+            exists = self.session.execute(
+                select(ProductORM.id).where(ProductORM.id == product.id)
+            ).first()
+            if not exists:
+                raise ValueError(f"Product with id {product.id} not found for update")
+            raise ConcurrentUpdateError(
+                f"Product with id {product.id} was modified concurrently "
+                f"(expected version {product.version})"
+            )
+        product.version += 1
+        self._expire_loaded([product.id])
+
+    def reserve_many(self, quantities: Dict[int, int]):
+        if not quantities:
+            return
+        # Pending ORM changes must reach the DB before the guarded UPDATE runs.
+        self.session.flush()
+        products = ProductORM.__table__
+        stmt = (
+            update(products)
+            .where(
+                products.c.id == bindparam("b_id"),
+                products.c.quantity >= bindparam("b_quantity"),
+            )
+            .values(
+                quantity=products.c.quantity - bindparam("b_quantity"),
+                version=products.c.version + 1,
+            )
+        )
+        result = self.session.execute(
+            stmt,
+            [
+                {"b_id": product_id, "b_quantity": quantity}
+                for product_id, quantity in quantities.items()
+            ],
+        )
+        if result.rowcount != len(quantities):
+            raise ConcurrentUpdateError(
+                f"Stock changed while reserving products {sorted(quantities)}"
+            )
+        self._expire_loaded(quantities)
+
+    def adjust_stock_many(self, deltas: Dict[int, int]) -> StockAdjustment:
+        result = StockAdjustment()
+        if not deltas:
+            return result
+        self.session.flush()
+        # One lookup classifies the whole batch; the UPDATE keeps the same
+        # guard in case stock moved in between.
+        current = dict(
+            self.session.execute(
+                select(ProductORM.id, ProductORM.quantity).where(
+                    ProductORM.id.in_(deltas)
+                )
+            ).all()
+        )
+        valid = {}
+        for product_id, delta in deltas.items():
+            quantity = current.get(product_id)
+            if quantity is None:
+                result.unknown_ids.append(product_id)
+            elif quantity + delta < 0:
+                result.negative_stock[product_id] = quantity + delta
+            else:
+                valid[product_id] = delta
+        if valid:
+            products = ProductORM.__table__
+            stmt = (
+                update(products)
+                .where(
+                    products.c.id == bindparam("b_id"),
+                    products.c.quantity + bindparam("b_delta") >= 0,
+                )
+                .values(
+                    quantity=products.c.quantity + bindparam("b_delta"),
+                    version=products.c.version + 1,
+                )
+            )
+            updated = self.session.execute(
+                stmt,
+                [
+                    {"b_id": product_id, "b_delta": delta}
+                    for product_id, delta in valid.items()
+                ],
+            )
+            if updated.rowcount != len(valid):
+                raise ConcurrentUpdateError(
+                    f"Stock changed while adjusting products {sorted(valid)}"
+                )
+            self._expire_loaded(valid)
+        result.applied = len(valid)
+        return result
+
+    def _expire_loaded(self, product_ids: Iterable[int]):
+        identity_map = self.session.identity_map
+        if not identity_map:
+            # Reads here go through Core, so the map is usually empty.
+            return
+        for product_id in product_ids:
+            product_orm = identity_map.get(identity_key(ProductORM, product_id))
+            if product_orm is not None:
+                self.session.expire(product_orm)
 
 
 class SqlAlchemyOrderRepository(OrderRepository):
@@ -54,101 +276,267 @@ class SqlAlchemyOrderRepository(OrderRepository):
         self.logger = logging.getLogger(__name__)
 
     def add(self, order: Order):
-        order_orm = OrderORM()
-
-        for domain_item in order.items:
-            product_orm_ref = (
-                self.session.query(ProductORM)
-                .filter_by(id=domain_item.product.id)
-                .one_or_none()
+        product_ids = {item.product.id for item in order.items}
+        found_ids = set(
+            self.session.scalars(
+                select(ProductORM.id).where(ProductORM.id.in_(product_ids))
+            )
+        )
+        missing_ids = product_ids - found_ids
+        if missing_ids:
+            self.logger.error(
+                "REPO: ProductORM with ids %s not found for OrderItems.",
+                sorted(missing_ids),
+            )
+            raise ValueError(
+                f"Products (IDs: {sorted(missing_ids)}) referenced in order items not found in DB."
             )
-            if not product_orm_ref:
-                self.logger.error(
-                    f"REPO: ProductORM with id {domain_item.product.id} not found for OrderItem."
-                )
-                raise ValueError(
-                    f"Product (ID: {domain_item.product.id}) referenced in order item not found in DB."
-                )
 
-            item_orm = OrderItemORM(
-                product_id=domain_item.product.id,
-                quantity_ordered=domain_item.quantity_ordered,
-                price_at_purchase=domain_item.price_at_purchase,
+        if order.created_at is None:
+            order.created_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        result = self.session.execute(
+            insert(OrderORM).values(
+                id=order.id,
+                total_cost=order.total_order_cost,
+                item_count=len(order.items),
+                created_at=order.created_at,
             )
-            order_orm.items.append(item_orm)
+        )
+        order.id = result.inserted_primary_key[0]
 
-        self.session.add(order_orm)
-        self.session.flush()
-        order.id = order_orm.id
+        if order.items:
+            self.session.execute(
+                insert(OrderItemORM),
+                [
+                    {
+                        "order_id": order.id,
+                        "product_id": domain_item.product.id,
+                        "quantity_ordered": domain_item.quantity_ordered,
+                        "price_at_purchase": domain_item.price_at_purchase,
+                    }
+                    for domain_item in order.items
+                ],
+            )
 
         self.logger.info(
-            f"REPO: Assigned order.id={order.id}. OrderORM has {len(order_orm.items)} items linked."
+            "REPO: Assigned order.id=%s. Inserted %d order items.",
+            order.id,
+            len(order.items),
         )
 
     def get(self, order_id: int) -> Optional[Order]:
-        self.logger.debug(f"REPO: Getting order with id {order_id}")
-
-        order_orm = (
-            self.session.query(OrderORM)
-            .options(joinedload(OrderORM.items).joinedload(OrderItemORM.product))
-            .filter_by(id=order_id)
-            .one_or_none()
-        )
-
-        if order_orm:
-            domain_items = []
-            for item_orm in order_orm.items:
-                if not item_orm.product:
-                    self.logger.error(
-                        f"ProductORM not loaded for orderItemORM id {item_orm.id}"
-                    )
-                    continue
-
-                domain_product = Product(
-                    id=item_orm.product.id,
-                    name=item_orm.product.name,
-                    quantity=item_orm.product.quantity,
-                    price=item_orm.product.price,
-                )
-                domain_item = OrderItem(
-                    product=domain_product,
-                    quantity_ordered=item_orm.quantity_ordered,
-                    price_at_purchase=item_orm.price_at_purchase,
-                )
-                domain_items.append(domain_item)
-
-            return Order(id=order_orm.id, items=domain_items)
-        return None
+        self.logger.debug("REPO: Getting order with id %s", order_id)
+        order_rows = self.session.execute(
+            select(OrderORM.id, OrderORM.created_at).where(OrderORM.id == order_id)
+        ).all()
+        if not order_rows:
+            return None
+        return self._load_orders(order_rows)[0]
 
     def list(self) -> List[Order]:
         self.logger.debug("REPO: Listing all orders")
-        orders_orm = (
-            self.session.query(OrderORM)
-            .options(joinedload(OrderORM.items).joinedload(OrderItemORM.product))
-            .all()
-        )
-
-        domain_orders = []
-        for order_orm in orders_orm:
-            domain_items = []
-            for item_orm in order_orm.items:
-                if not item_orm.product:
-                    self.logger.error(
-                        f"REPO: ProductORM not loaded for OrderItemORM id {item_orm.id} in order id {order_orm.id}"
-                    )
-                    continue
-
-                domain_product = Product(
-                    id=item_orm.product.id,
-                    name=item_orm.product.name,
-                    quantity=item_orm.product.quantity,
-                    price=item_orm.product.price,
+        return list(self.iter_orders())
+
+    def iter_orders(
+        self,
+        batch_size: int = 500,
+        after_id: Optional[int] = None,
+        max_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> Iterator[Order]:
+        if batch_size <= 0:
+            raise ValueError("Batch size must be positive")
+        stmt = _order_window(
+            select(OrderORM.id, OrderORM.created_at),
+            max_id=max_id,
+            created_from=created_from,
+            created_to=created_to,
+        )
+        stmt = stmt.order_by(OrderORM.id).limit(batch_size)
+        last_id = after_id
+        while True:
+            page = stmt if last_id is None else stmt.where(OrderORM.id > last_id)
+            order_rows = self.session.execute(page).all()
+            if order_rows:
+                yield from self._load_orders(order_rows)
+            if len(order_rows) < batch_size:
+                return
+            last_id = order_rows[-1].id
+
+    def list_summaries(
+        self,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> List[OrderSummary]:
+        stmt = _order_window(
+            select(
+                OrderORM.id,
+                OrderORM.total_cost,
+                OrderORM.item_count,
+                OrderORM.created_at,
+            ),
+            after_id=after_id,
+            created_from=created_from,
+            created_to=created_to,
+        )
+        rows = self.session.execute(stmt.order_by(OrderORM.id).limit(limit))
+        summaries = [
+            OrderSummary(
+                id=row.id,
+                total_cost=row.total_cost,
+                item_count=row.item_count,
+                created_at=row.created_at,
+            )
+            for row in rows
+        ]
+        record_rows(len(summaries))
+        return summaries
+
+    def _load_orders(self, order_rows) -> List[Order]:
+        orders = {
+            row.id: Order(id=row.id, created_at=row.created_at) for row in order_rows
+        }
+        order_ids = list(orders)
+        products: Dict[int, Product] = {}
+        rows = self.session.execute(
+            select(
+                OrderItemORM.id,
+                OrderItemORM.order_id,
+                OrderItemORM.quantity_ordered,
+                OrderItemORM.price_at_purchase,
+                ProductORM.id.label("product_id"),
+                ProductORM.name,
+                ProductORM.quantity,
+                ProductORM.price,
+                ProductORM.version,
+            )
+            .outerjoin(ProductORM, OrderItemORM.product_id == ProductORM.id)
+            .where(OrderItemORM.order_id.in_(order_ids))
+            .order_by(OrderItemORM.order_id, OrderItemORM.id)
+        )
+        item_count = 0
+        for item_count, row in enumerate(rows, start=1):
+            if row.product_id is None:
+                self.logger.error(
+                    "REPO: ProductORM not loaded for OrderItemORM id %s in order id %s",
+                    row.id,
+                    row.order_id,
+                )
+                continue
+            # Items of one batch share a single Product per product id.
+            product = products.get(row.product_id)
+            if product is None:
+                product = products[row.product_id] = Product(
+                    row.product_id, row.name, row.quantity, row.price, row.version
                 )
-                domain_item = OrderItem(
-                    product=domain_product,
-                    quantity_ordered=item_orm.quantity_ordered,
-                    price_at_purchase=item_orm.price_at_purchase,
+            orders[row.order_id].items.append(
+                OrderItem(
+                    product=product,
+                    quantity_ordered=row.quantity_ordered,
+                    price_at_purchase=row.price_at_purchase,
                 )
-                domain_items.append(domain_item)
-            domain_orders.append(Order(id=order_orm.id, items=domain_items))
-        return domain_orders
+            )
+        record_rows(len(orders) + item_count)
+        return list(orders.values())
+
+
+class SqlAlchemySalesReportRepository(SalesReportRepository):
+    ORDERINGS = ("revenue", "units")
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    @staticmethod
+    def _in_window(
+        stmt,
+        after_id: Optional[int],
+        max_id: Optional[int],
+        created_from: Optional[datetime],
+        created_to: Optional[datetime],
+    ):
+        if after_id is not None:
+            stmt = stmt.where(OrderItemORM.order_id > after_id)
+        if max_id is not None:
+            stmt = stmt.where(OrderItemORM.order_id <= max_id)
+        if created_from is not None or created_to is not None:
+            stmt = _order_window(
+                stmt.join(OrderORM, OrderORM.id == OrderItemORM.order_id),
+                created_from=created_from,
+                created_to=created_to,
+            )
+        return stmt
+
+    def _counted_order_id(self):
+        """Order id counted by ``summary``; NULLs are not counted."""
+        return OrderItemORM.order_id
+
+    def summary(
+        self,
+        after_id: Optional[int] = None,
+        max_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> SalesSummary:
+        stmt = select(
+            func.count(func.distinct(self._counted_order_id())),
+            func.coalesce(func.sum(OrderItemORM.quantity_ordered), 0),
+            func.coalesce(
+                func.sum(
+                    OrderItemORM.quantity_ordered * OrderItemORM.price_at_purchase
+                ),
+                0.0,
+            ),
+        )
+        order_count, units_sold, revenue = self.session.execute(
+            self._in_window(stmt, after_id, max_id, created_from, created_to)
+        ).one()
+        return SalesSummary(
+            order_count=order_count, units_sold=units_sold, revenue=revenue
+        )
+
+    def product_sales(
+        self,
+        after_id: Optional[int] = None,
+        max_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        order_by: str = "revenue",
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> List[ProductSales]:
+        if order_by not in self.ORDERINGS:
+            raise ValueError(f"Unsupported report ordering: {order_by}")
+        units_sold = func.sum(OrderItemORM.quantity_ordered).label("units_sold")
+        revenue = func.sum(
+            OrderItemORM.quantity_ordered * OrderItemORM.price_at_purchase
+        ).label("revenue")
+        sales = self._in_window(
+            select(OrderItemORM.product_id, units_sold, revenue).group_by(
+                OrderItemORM.product_id
+            ),
+            after_id,
+            max_id,
+            created_from,
+            created_to,
+        ).subquery()
+
+        primary = sales.c.revenue if order_by == "revenue" else sales.c.units_sold
+        stmt = (
+            select(sales, ProductORM.name)
+            .join(ProductORM, ProductORM.id == sales.c.product_id)
+            .order_by(primary.desc(), sales.c.product_id)
+            .limit(limit)
+        )
+        sales_rows = [
+            ProductSales(
+                product_id=row.product_id,
+                name=row.name,
+                units_sold=row.units_sold,
+                revenue=row.revenue,
+            )
+            for row in self.session.execute(stmt)
+        ]
+        record_rows(len(sales_rows))
+        return sales_rows
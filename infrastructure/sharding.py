@@ -0,0 +1,663 @@
+"""Partitioned storage: products split across several SQLite files.
+
+Each shard is a complete warehouse database. A product lives on the shard
+its id routes to (see ``HashRouter`` and ``RangeRouter``); the shard
+allocates the ids it owns. An order is stored as one part per shard it
+touches: the ``orders`` row (with the part's total and item count) and the
+items of that shard's products, all under the same order id. Order ids are
+allocated by the shard of the first item and always route by hash, so the
+"home" shard of an order is ``order_id % shard_count``.
+
+Commit protocol of ``ShardedUnitOfWork``: SQLite cannot prepare a commit,
+so a unit of work touching several shards commits them one by one in
+ascending shard order. The repositories record an undo step for every
+write; if a shard fails to commit, the shards after it are rolled back and
+the ones already committed run their undo steps in a new transaction
+(stock returned, order parts and new products deleted). A failed undo is
+logged for manual repair. Repositories also touch shards in ascending order
+so concurrent units of work take the shard write locks in the same order.
+
+Limits: the undo steps live only in memory. If the process crashes or is
+killed between two shard commits, the shards already committed keep their
+writes (reserved stock, order parts, new products); nothing records this
+and nothing repairs it later. Until the last shard commits, other units of
+work can also read the committed part: ``get`` returns an order with only
+some of its items, and reports and summaries count the committed parts.
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session
+
+from domain.models import (
+    Order,
+    OrderSummary,
+    Product,
+    ProductSales,
+    SalesSummary,
+    StockAdjustment,
+)
+from domain.repositories import (
+    OrderRepository,
+    ProductRepository,
+    SalesReportRepository,
+)
+from .database import DATABASE_URL, create_warehouse_engine
+from .instrumentation import MetricsSink
+from .orm import OrderItemORM, OrderORM, ProductChangeORM, ProductORM
+from .repositories import (
+    SqlAlchemyOrderRepository,
+    SqlAlchemyProductRepository,
+    SqlAlchemySalesReportRepository,
+)
+from .unit_of_work import _MeasuredUnitOfWork, _read_only_sessions
+
+logger = logging.getLogger(__name__)
+
+ROUTINGS = ("hash", "range")
+
+
+class ShardRouter(ABC):
+    def __init__(self, shard_count: int):
+        if shard_count <= 0:
+            raise ValueError("Shard count must be positive")
+        self.shard_count = shard_count
+
+    @abstractmethod
+    def shard_for(self, record_id: int) -> int:
+        pass
+
+    @abstractmethod
+    def next_id(self, shard: int, last_id: Optional[int]) -> int:
+        """Smallest id owned by ``shard`` above ``last_id`` (None when the
+        shard has no ids yet)."""
+        pass
+
+
+class HashRouter(ShardRouter):
+    """Id ``n`` lives on shard ``n % shard_count``: new products spread
+    evenly, neighbouring ids land on different shards."""
+
+    def shard_for(self, record_id: int) -> int:
+        return record_id % self.shard_count
+
+    def next_id(self, shard: int, last_id: Optional[int]) -> int:
+        last_id = last_id or 0
+        return last_id + (shard - last_id - 1) % self.shard_count + 1
+
+
+class RangeRouter(ShardRouter):
+    """Shard ``k`` owns ids ``k * range_size + 1`` to ``(k + 1) * range_size``.
+    Ids outside all ranges route to the nearest shard, which has no such
+    product."""
+
+    def __init__(self, shard_count: int, range_size: int):
+        super().__init__(shard_count)
+        if range_size <= 0:
+            raise ValueError("Shard range size must be positive")
+        self.range_size = range_size
+
+    def shard_for(self, record_id: int) -> int:
+        return min(max((record_id - 1) // self.range_size, 0), self.shard_count - 1)
+
+    def next_id(self, shard: int, last_id: Optional[int]) -> int:
+        next_id = shard * self.range_size + 1 if last_id is None else last_id + 1
+        if next_id > (shard + 1) * self.range_size:
+            raise ValueError(f"Shard {shard} has no free product ids left")
+        return next_id
+
+
+def router_from_env() -> Optional[ShardRouter]:
+    """Router configured by WAREHOUSE_SHARDS, or None for a single database."""
+    shard_count = int(os.environ.get("WAREHOUSE_SHARDS", "1"))
+    if shard_count <= 1:
+        return None
+    routing = os.environ.get("WAREHOUSE_SHARD_ROUTING", "hash")
+    if routing == "hash":
+        return HashRouter(shard_count)
+    if routing == "range":
+        range_size = int(os.environ.get("WAREHOUSE_SHARD_RANGE_SIZE", "1000000"))
+        return RangeRouter(shard_count, range_size)
+    raise ValueError(
+        f"Unknown shard routing '{routing}'. Available: {', '.join(ROUTINGS)}"
+    )
+
+
+def shard_urls(url: Optional[str], shard_count: int) -> List[str]:
+    """``warehouse.db`` becomes ``warehouse.shard0.db``, ``warehouse.shard1.db``..."""
+    url = make_url(url or DATABASE_URL)
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        raise ValueError("Sharded storage needs a file SQLite database URL")
+    root, extension = os.path.splitext(url.database)
+    return [
+        url.set(database=f"{root}.shard{shard}{extension}").render_as_string(
+            hide_password=False
+        )
+        for shard in range(shard_count)
+    ]
+
+
+def create_shard_engines(
+    shard_count: int, url: Optional[str] = None, preset: Optional[str] = None
+) -> List[Engine]:
+    return [
+        create_warehouse_engine(shard_url, preset=preset)
+        for shard_url in shard_urls(url, shard_count)
+    ]
+
+
+class _ShardSessions:
+    """Sessions and repositories of one unit of work, opened on first use
+    of each shard, and the undo steps recorded for its writes."""
+
+    def __init__(self, session_factories: Sequence, **session_options):
+        self.session_factories = session_factories
+        self.session_options = session_options
+        self.open: Dict[int, Session] = {}
+        self.undo: Dict[int, List[Callable[[Session], None]]] = {}
+        self._repositories: Dict[tuple, object] = {}
+
+    def session(self, shard: int) -> Session:
+        session = self.open.get(shard)
+        if session is None:
+            factory = self.session_factories[shard]
+            session = self.open[shard] = factory(**self.session_options)
+        return session
+
+    def locked_session(self, shard: int) -> Session:
+        """The shard's session holding the SQLite write lock, so ids read
+        from it stay free until this unit of work commits."""
+        session = self.session(shard)
+        connection = session.connection()
+        if not connection.connection.dbapi_connection.in_transaction:
+            # Presets without a BEGIN mode let pysqlite begin on the first
+            # write, after the MAX(id) read.
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+        return session
+
+    def _repository(self, kind, shard: int):
+        repository = self._repositories.get((kind, shard))
+        if repository is None:
+            repository = self._repositories[kind, shard] = kind(self.session(shard))
+        return repository
+
+    def products(self, shard: int) -> SqlAlchemyProductRepository:
+        return self._repository(SqlAlchemyProductRepository, shard)
+
+    def orders(self, shard: int) -> SqlAlchemyOrderRepository:
+        return self._repository(SqlAlchemyOrderRepository, shard)
+
+    def record_undo(self, shard: int, step: Callable[[Session], None]):
+        self.undo.setdefault(shard, []).append(step)
+
+    def close(self):
+        for session in self.open.values():
+            session.close()
+
+
+def _group_by_shard(router: ShardRouter, ids: Iterable[int]) -> Dict[int, List[int]]:
+    groups: Dict[int, List[int]] = {}
+    for record_id in ids:
+        groups.setdefault(router.shard_for(record_id), []).append(record_id)
+    return dict(sorted(groups.items()))
+
+
+def _undo_stock(deltas: Dict[int, int]) -> Callable[[Session], None]:
+    def undo(session: Session):
+        result = SqlAlchemyProductRepository(session).adjust_stock_many(deltas)
+        if result.unknown_ids or result.negative_stock:
+            logger.error(
+                "SHARDS: Could not return stock of products %s",
+                sorted([*result.unknown_ids, *result.negative_stock]),
+            )
+
+    return undo
+
+
+def _undo_new_products(product_ids: List[int]) -> Callable[[Session], None]:
+    def undo(session: Session):
+        session.execute(
+            delete(ProductChangeORM).where(ProductChangeORM.product_id.in_(product_ids))
+        )
+        session.execute(delete(ProductORM).where(ProductORM.id.in_(product_ids)))
+
+    return undo
+
+
+def _undo_update(previous: Product) -> Callable[[Session], None]:
+    def undo(session: Session):
+        session.execute(
+            update(ProductORM)
+            .where(ProductORM.id == previous.id)
+            .values(
+                name=previous.name,
+                quantity=previous.quantity,
+                price=previous.price,
+                version=ProductORM.version + 1,
+            )
+        )
+
+    return undo
+
+
+def _undo_order_part(order_id: int) -> Callable[[Session], None]:
+    def undo(session: Session):
+        session.execute(delete(OrderItemORM).where(OrderItemORM.order_id == order_id))
+        session.execute(delete(OrderORM).where(OrderORM.id == order_id))
+
+    return undo
+
+
+class ShardedProductRepository(ProductRepository):
+    def __init__(
+        self, shards: _ShardSessions, router: ShardRouter, placement: Iterator[int]
+    ):
+        self.shards = shards
+        self.router = router
+        # Round-robin over shards for new products.
+        self.placement = placement
+
+    def _allocate(self, shard: int, count: int) -> List[int]:
+        last_id = self.shards.locked_session(shard).scalar(
+            select(func.max(ProductORM.id))
+        )
+        ids = []
+        for _ in range(count):
+            last_id = self.router.next_id(shard, last_id)
+            ids.append(last_id)
+        return ids
+
+    def add(self, product: Product):
+        shard = next(self.placement) % self.router.shard_count
+        product.id = self._allocate(shard, 1)[0]
+        self.shards.products(shard).add(product)
+        self.shards.record_undo(shard, _undo_new_products([product.id]))
+
+    def add_many(self, products: Iterable[Product]) -> int:
+        batches: Dict[int, List[Product]] = {}
+        for product in products:
+            shard = next(self.placement) % self.router.shard_count
+            batches.setdefault(shard, []).append(product)
+        for shard in sorted(batches):
+            batch = batches[shard]
+            for product, product_id in zip(batch, self._allocate(shard, len(batch))):
+                product.id = product_id
+            self.shards.products(shard).add_many(batch)
+            self.shards.record_undo(
+                shard, _undo_new_products([product.id for product in batch])
+            )
+        return sum(map(len, batches.values()))
+
+    def get(self, product_id: int) -> Product:
+        return self.shards.products(self.router.shard_for(product_id)).get(product_id)
+
+    def get_many(self, product_ids: Iterable[int]) -> Dict[int, Product]:
+        products: Dict[int, Product] = {}
+        for shard, ids in _group_by_shard(self.router, set(product_ids)).items():
+            products.update(self.shards.products(shard).get_many(ids))
+        return products
+
+    def list(self) -> List[Product]:
+        return list(self.iter_products())
+
+    def iter_products(
+        self, batch_size: int = 1000, after_id: Optional[int] = None
+    ) -> Iterator[Product]:
+        return heapq.merge(
+            *(
+                self.shards.products(shard).iter_products(batch_size, after_id)
+                for shard in range(self.router.shard_count)
+            ),
+            key=lambda product: product.id,
+        )
+
+    def search_products(self, query: str, limit: int = 20) -> List[Product]:
+        # bm25 scores are relative to each shard's index, so results are
+        # interleaved by their rank within the shard instead.
+        results = [
+            self.shards.products(shard).search_products(query, limit)
+            for shard in range(self.router.shard_count)
+        ]
+        merged = [
+            product
+            for rank in itertools.zip_longest(*results)
+            for product in sorted(filter(None, rank), key=lambda p: p.id)
+        ]
+        return merged[:limit]
+
+    def update(self, product: Product):
+        shard = self.router.shard_for(product.id)
+        products = self.shards.products(shard)
+        previous = products.get_many([product.id]).get(product.id)
+        products.update(product)
+        self.shards.record_undo(shard, _undo_update(previous))
+
+    def reserve_many(self, quantities: Dict[int, int]):
+        for shard, ids in _group_by_shard(self.router, quantities).items():
+            reserved = {product_id: quantities[product_id] for product_id in ids}
+            self.shards.products(shard).reserve_many(reserved)
+            self.shards.record_undo(shard, _undo_stock(reserved))
+
+    def adjust_stock_many(self, deltas: Dict[int, int]) -> StockAdjustment:
+        result = StockAdjustment()
+        for shard, ids in _group_by_shard(self.router, deltas).items():
+            part = self.shards.products(shard).adjust_stock_many(
+                {product_id: deltas[product_id] for product_id in ids}
+            )
+            result.applied += part.applied
+            result.unknown_ids.extend(part.unknown_ids)
+            result.negative_stock.update(part.negative_stock)
+            skipped = {*part.unknown_ids, *part.negative_stock}
+            self.shards.record_undo(
+                shard,
+                _undo_stock({pid: -deltas[pid] for pid in ids if pid not in skipped}),
+            )
+        return result
+
+
+def _merge_parts(parts: List[Order]) -> Order:
+    order = Order(id=parts[0].id, created_at=parts[0].created_at)
+    for part in parts:
+        order.items.extend(part.items)
+    return order
+
+
+class ShardedOrderRepository(OrderRepository):
+    """Orders split into one part per shard; reads merge the parts. Items
+    of a merged order are grouped by shard."""
+
+    def __init__(self, shards: _ShardSessions, router: ShardRouter):
+        self.shards = shards
+        self.router = router
+        self.order_ids = HashRouter(router.shard_count)
+
+    def add(self, order: Order):
+        parts: Dict[int, Order] = {}
+        for item in order.items:
+            shard = self.router.shard_for(item.product.id)
+            parts.setdefault(shard, Order(id=None)).items.append(item)
+        home = self.router.shard_for(order.items[0].product.id) if order.items else 0
+        last_id = self.shards.locked_session(home).scalar(select(func.max(OrderORM.id)))
+        order.id = self.order_ids.next_id(home, last_id)
+        if order.created_at is None:
+            order.created_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        for shard, part in sorted(parts.items()) or [(home, Order(id=None))]:
+            part.id, part.created_at = order.id, order.created_at
+            self.shards.orders(shard).add(part)
+            self.shards.record_undo(shard, _undo_order_part(order.id))
+
+    def get(self, order_id: int) -> Optional[Order]:
+        parts = [
+            part
+            for shard in range(self.router.shard_count)
+            if (part := self.shards.orders(shard).get(order_id)) is not None
+        ]
+        return _merge_parts(parts) if parts else None
+
+    def list(self) -> List[Order]:
+        return list(self.iter_orders())
+
+    def iter_orders(
+        self,
+        batch_size: int = 500,
+        after_id: Optional[int] = None,
+        max_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> Iterator[Order]:
+        merged = heapq.merge(
+            *(
+                self.shards.orders(shard).iter_orders(
+                    batch_size=batch_size,
+                    after_id=after_id,
+                    max_id=max_id,
+                    created_from=created_from,
+                    created_to=created_to,
+                )
+                for shard in range(self.router.shard_count)
+            ),
+            key=lambda order: order.id,
+        )
+        for _, parts in itertools.groupby(merged, key=lambda order: order.id):
+            yield _merge_parts(list(parts))
+
+    def list_summaries(
+        self,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> List[OrderSummary]:
+        # Every shard returns its first ``limit`` parts, which include all
+        # parts of the first ``limit`` orders overall.
+        summaries: Dict[int, OrderSummary] = {}
+        for shard in range(self.router.shard_count):
+            for part in self.shards.orders(shard).list_summaries(
+                limit=limit,
+                after_id=after_id,
+                created_from=created_from,
+                created_to=created_to,
+            ):
+                summary = summaries.get(part.id)
+                if summary is None:
+                    summaries[part.id] = part
+                else:
+                    summary.total_cost += part.total_cost
+                    summary.item_count += part.item_count
+        return [summaries[order_id] for order_id in sorted(summaries)[:limit]]
+
+
+class _ShardSalesReportRepository(SqlAlchemySalesReportRepository):
+    """Counts only orders whose home is this shard, so counts add up."""
+
+    def __init__(self, session: Session, shard: int, shard_count: int):
+        super().__init__(session)
+        self.shard = shard
+        self.shard_count = shard_count
+
+    def _counted_order_id(self):
+        order_id = OrderItemORM.order_id
+        return case((order_id % self.shard_count == self.shard, order_id))
+
+
+class ShardedSalesReportRepository(SalesReportRepository):
+    """Per-shard aggregates merged in Python. A product's order items live
+    on the product's shard, so per-product figures are complete per shard."""
+
+    def __init__(self, shards: _ShardSessions, router: ShardRouter):
+        self.shards = shards
+        self.router = router
+
+    def _reports(self) -> Iterator[_ShardSalesReportRepository]:
+        for shard in range(self.router.shard_count):
+            yield _ShardSalesReportRepository(
+                self.shards.session(shard), shard, self.router.shard_count
+            )
+
+    def summary(
+        self,
+        after_id: Optional[int] = None,
+        max_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> SalesSummary:
+        total = SalesSummary(order_count=0, units_sold=0, revenue=0.0)
+        for reports in self._reports():
+            part = reports.summary(after_id, max_id, created_from, created_to)
+            total.order_count += part.order_count
+            total.units_sold += part.units_sold
+            total.revenue += part.revenue
+        return total
+
+    def product_sales(
+        self,
+        after_id: Optional[int] = None,
+        max_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        order_by: str = "revenue",
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> List[ProductSales]:
+        sales = [
+            row
+            for reports in self._reports()
+            for row in reports.product_sales(
+                after_id=after_id,
+                max_id=max_id,
+                limit=limit,
+                order_by=order_by,
+                created_from=created_from,
+                created_to=created_to,
+            )
+        ]
+        sales.sort(
+            key=lambda row: (
+                -(row.revenue if order_by == "revenue" else row.units_sold),
+                row.product_id,
+            )
+        )
+        return sales[:limit]
+
+
+class ShardedUnitOfWork(_MeasuredUnitOfWork):
+    """Unit of work over one session per shard, opened when the shard is
+    first used. See the module docstring for the commit protocol.
+
+    Product and order caches and ``group()`` are not supported.
+    """
+
+    def __init__(
+        self,
+        session_factories: Sequence,
+        router: ShardRouter,
+        metrics_sink: Optional[MetricsSink] = None,
+        read_session_factories: Optional[Sequence] = None,
+    ):
+        if len(session_factories) != router.shard_count:
+            raise ValueError(
+                f"Expected {router.shard_count} shard session factories, "
+                f"got {len(session_factories)}"
+            )
+        self.session_factories = session_factories
+        self.read_session_factories = read_session_factories or [
+            _read_only_sessions(factory) for factory in session_factories
+        ]
+        self.router = router
+        self.metrics_sink = metrics_sink
+        self._placement = itertools.count()
+
+    def _open(self, **session_options):
+        self._start_metrics()
+        self.shards = _ShardSessions(self.session_factories, **session_options)
+        self.products = ShardedProductRepository(
+            self.shards, self.router, self._placement
+        )
+        self.orders = ShardedOrderRepository(self.shards, self.router)
+        self.reports = ShardedSalesReportRepository(self.shards, self.router)
+        return self
+
+    def __enter__(self):
+        return self._open()
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        failed = exception_type is not None
+        try:
+            if exception_type:
+                self.rollback()
+            else:
+                self.commit()
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.shards.close()
+            self._finish_metrics(failed)
+
+    def read(self) -> "ShardedReadUnitOfWork":
+        return ShardedReadUnitOfWork(
+            self.read_session_factories, self.router, self.metrics_sink
+        )
+
+    def commit(self):
+        if self._metrics is None:
+            self._commit()
+            return
+        started = time.perf_counter()
+        try:
+            self._commit()
+        finally:
+            self._metrics.commit_time += time.perf_counter() - started
+
+    def _commit(self):
+        committed: List[int] = []
+        try:
+            for shard, session in sorted(self.shards.open.items()):
+                session.commit()
+                committed.append(shard)
+        except BaseException:
+            for shard, session in self.shards.open.items():
+                if shard not in committed:
+                    session.rollback()
+            self._compensate(committed)
+            raise
+        finally:
+            self.shards.undo.clear()
+
+    def _compensate(self, committed: List[int]):
+        for shard in committed:
+            steps = self.shards.undo.get(shard)
+            if not steps:
+                continue
+            logger.warning("SHARDS: Undoing %d writes on shard %s", len(steps), shard)
+            session = self.shards.session(shard)
+            try:
+                for step in reversed(steps):
+                    step(session)
+                session.commit()
+            except Exception:
+                session.rollback()
+                logger.exception(
+                    "SHARDS: Undo failed on shard %s, data needs manual repair", shard
+                )
+
+    def rollback(self):
+        for session in self.shards.open.values():
+            session.rollback()
+        self.shards.undo.clear()
+
+
+class ShardedReadUnitOfWork(ShardedUnitOfWork):
+    """Query-only counterpart of ``ShardedUnitOfWork``: read-only sessions,
+    never committed."""
+
+    def __init__(
+        self,
+        session_factories: Sequence,
+        router: ShardRouter,
+        metrics_sink: Optional[MetricsSink] = None,
+    ):
+        super().__init__(session_factories, router, metrics_sink, session_factories)
+
+    def __enter__(self):
+        return self._open(autoflush=False, expire_on_commit=False)
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        try:
+            self.shards.close()
+        finally:
+            self._finish_metrics(exception_type is not None)
+
+    def read(self) -> "ShardedReadUnitOfWork":
+        return self
+
+    def commit(self):
+        raise RuntimeError("Read-only unit of work cannot commit")
@@ -0,0 +1,154 @@
+import logging
+import os
+from array import array
+from dataclasses import dataclass
+from typing import List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Connection, Engine
+
+from .database import read_only_engine
+from .orm import ProductChangeORM, ProductORM
+from .stock_snapshot import StockSnapshot, pack_names, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = (ProductORM.id, ProductORM.name, ProductORM.quantity, ProductORM.price)
+
+
+@dataclass(slots=True)
+class SnapshotExport:
+    products: int = 0
+    added: int = 0
+    changed: int = 0
+    incremental: bool = False
+
+
+def export_snapshot(engine: Engine, path: str, full: bool = False) -> SnapshotExport:
+    """Write a stock snapshot of all products to ``path``.
+
+    An existing snapshot is refreshed in place of a full export: products
+    with an id above its max id are appended and rows listed in
+    ``product_changes`` after its change seq are patched. Products are never
+    deleted, so nothing else can differ.
+    """
+    with read_only_engine(engine).connect() as conn:
+        # Only the wal and read_only presets read in one transaction, so the
+        # queries below are bounded by the change seq and max id read here.
+        change_seq = conn.scalar(
+            select(func.coalesce(func.max(ProductChangeORM.seq), 0))
+        )
+        max_id = conn.scalar(select(func.coalesce(func.max(ProductORM.id), 0)))
+        previous = None if full else _open_previous(path, max_id, change_seq)
+        if previous is None:
+            return _export_full(conn, path, max_id, change_seq)
+        with previous:
+            return _export_incremental(conn, path, previous, max_id, change_seq)
+
+
+def _open_previous(path: str, max_id: int, change_seq: int) -> Optional[StockSnapshot]:
+    if not os.path.exists(path):
+        return None
+    try:
+        previous = StockSnapshot(path)
+    except ValueError as error:
+        logger.warning("Rewriting stock snapshot %s: %s", path, error)
+        return None
+    if previous.max_id > max_id or previous.change_seq > change_seq:
+        # Written from another (or a recreated) database.
+        logger.warning("Rewriting stock snapshot %s: database does not match", path)
+        previous.close()
+        return None
+    return previous
+
+
+def _export_full(
+    conn: Connection, path: str, max_id: int, change_seq: int
+) -> SnapshotExport:
+    ids, quantities, prices = array("q"), array("q"), array("d")
+    names: List[bytes] = []
+    for product_id, name, quantity, price in conn.execute(
+        select(*_COLUMNS).where(ProductORM.id <= max_id).order_by(ProductORM.id)
+    ):
+        ids.append(product_id)
+        quantities.append(quantity)
+        prices.append(price)
+        names.append(name.encode())
+    write_snapshot(
+        path, ids, quantities, prices, *pack_names(names), max_id, change_seq
+    )
+    return SnapshotExport(products=len(ids), added=len(ids))
+
+
+def _export_incremental(
+    conn: Connection,
+    path: str,
+    previous: StockSnapshot,
+    max_id: int,
+    change_seq: int,
+) -> SnapshotExport:
+    changed = conn.execute(
+        select(*_COLUMNS)
+        .join(ProductChangeORM, ProductChangeORM.product_id == ProductORM.id)
+        .where(
+            ProductChangeORM.seq > previous.change_seq,
+            ProductChangeORM.seq <= change_seq,
+            ProductORM.id <= previous.max_id,
+        )
+    ).all()
+    added = conn.execute(
+        select(*_COLUMNS)
+        .where(ProductORM.id > previous.max_id, ProductORM.id <= max_id)
+        .order_by(ProductORM.id)
+    ).all()
+    if not changed and not added and change_seq == previous.change_seq:
+        return SnapshotExport(products=len(previous), incremental=True)
+
+    ids, quantities, prices = array("q"), array("q"), array("d")
+    ids.frombytes(previous.ids.tobytes())
+    quantities.frombytes(previous.quantities.tobytes())
+    prices.frombytes(previous.prices.tobytes())
+    renamed = {}
+    for product_id, name, quantity, price in changed:
+        index = previous.index(product_id)
+        if index is None:
+            logger.warning(
+                "Rewriting stock snapshot %s: product %s is missing", path, product_id
+            )
+            previous.close()
+            return _export_full(conn, path, max_id, change_seq)
+        quantities[index] = quantity
+        prices[index] = price
+        if name != previous.name(index):
+            renamed[index] = name.encode()
+
+    if renamed:
+        names, name_ends = pack_names(
+            renamed.get(index) or previous.names[start:end].tobytes()
+            for index, (start, end) in enumerate(
+                zip((0, *previous.name_ends), previous.name_ends)
+            )
+        )
+    else:
+        # Stock and price changes leave the names section as it is.
+        names, name_ends = previous.names.tobytes(), array("q")
+        name_ends.frombytes(previous.name_ends.tobytes())
+    order = array("q")
+    order.frombytes(previous.by_quantity.tobytes())
+
+    added_names, added_ends = pack_names(name.encode() for _, name, _, _ in added)
+    for product_id, _, quantity, price in added:
+        order.append(len(ids))
+        ids.append(product_id)
+        quantities.append(quantity)
+        prices.append(price)
+    name_ends.extend(len(names) + end for end in added_ends)
+    names += added_names
+
+    previous.close()
+    write_snapshot(
+        path, ids, quantities, prices, names, name_ends, max_id, change_seq, order
+    )
+    return SnapshotExport(
+        products=len(ids), added=len(added), changed=len(changed), incremental=True
+    )
@@ -0,0 +1,195 @@
+"""Columnar stock snapshot file, read through mmap without the database.
+
+Layout (little-endian, sections aligned to 8 bytes)::
+
+    header      magic, format, count, max product id, change seq, names size
+    ids         int64[count], ascending
+    quantities  int64[count]
+    prices      float64[count]
+    name_ends   int64[count], end offset of each name in the names section
+    by_quantity int64[count], row indexes ordered by quantity
+    names       UTF-8 names, concatenated
+
+The snapshot is written by ``infrastructure.snapshot_export``; this module
+only depends on the standard library so that consumers can read it without
+SQLAlchemy.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from itertools import accumulate
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+SNAPSHOT_FORMAT = 1
+
+_MAGIC = b"WHSTOCK\x00"
+# magic, format, product count, max product id, change seq, names size
+_HEADER = struct.Struct("<8sIqqqq")
+_HEADER_SIZE = 48
+_COLUMNS = ("ids", "quantities", "prices", "name_ends", "by_quantity")
+_TYPECODES = {"prices": "d"}
+
+if sys.byteorder != "little":
+    raise ImportError("Stock snapshots are only supported on little-endian hosts")
+
+
+@dataclass(slots=True)
+class StockRecord:
+    id: int
+    name: str
+    quantity: int
+    price: float
+
+
+def pack_names(names: Iterable[bytes]) -> Tuple[bytes, array]:
+    """Concatenated names and the end offset of each, as stored on disk."""
+    names = list(names)
+    return b"".join(names), array("q", accumulate(map(len, names)))
+
+
+def write_snapshot(
+    path: str,
+    ids: Sequence[int],
+    quantities: Sequence[int],
+    prices: Sequence[float],
+    names: bytes,
+    name_ends: Sequence[int],
+    max_id: int,
+    change_seq: int,
+    order: Optional[Iterable[int]] = None,
+):
+    """Write columns of products ordered by id to ``path`` atomically.
+
+    ``order`` lists all rows in roughly ascending quantity, e.g. the order of
+    the previous snapshot: sorting an almost sorted index is much faster.
+    """
+    count = len(ids)
+    if not (len(quantities) == len(prices) == len(name_ends) == count):
+        raise ValueError("Snapshot columns must have the same length")
+    by_quantity = array(
+        "q",
+        sorted(range(count) if order is None else order, key=quantities.__getitem__),
+    )
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as stream:
+        header = _HEADER.pack(
+            _MAGIC, SNAPSHOT_FORMAT, count, max_id, change_seq, len(names)
+        )
+        stream.write(header.ljust(_HEADER_SIZE, b"\x00"))
+        for values, typecode in (
+            (ids, "q"),
+            (quantities, "q"),
+            (prices, "d"),
+            (name_ends, "q"),
+        ):
+            if not isinstance(values, array) or values.typecode != typecode:
+                values = array(typecode, values)
+            values.tofile(stream)
+        by_quantity.tofile(stream)
+        stream.write(names)
+    os.replace(tmp_path, path)
+
+
+class StockSnapshot:
+    """Read-only view of a snapshot file.
+
+    Columns are memoryviews over the mapped file: ``get`` is O(1) when
+    product ids are contiguous and a binary search otherwise, ``low_stock``
+    is a binary search over the quantity index. Close the snapshot (or use
+    it as a context manager) before replacing the file on Windows.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as stream:
+            self._mmap = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._load()
+        except Exception:
+            self._mmap.close()
+            raise
+
+    def _load(self):
+        if len(self._mmap) < _HEADER_SIZE:
+            raise ValueError("Not a stock snapshot: file is too short")
+        magic, snapshot_format, count, max_id, change_seq, names_size = (
+            _HEADER.unpack_from(self._mmap)
+        )
+        if magic != _MAGIC:
+            raise ValueError("Not a stock snapshot: bad magic")
+        if snapshot_format != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported stock snapshot format {snapshot_format}")
+        names_offset = _HEADER_SIZE + 8 * count * len(_COLUMNS)
+        if len(self._mmap) != names_offset + names_size:
+            raise ValueError("Stock snapshot is truncated")
+
+        self.max_id = max_id
+        self.change_seq = change_seq
+        self._count = count
+        self._view = memoryview(self._mmap)
+        offset = _HEADER_SIZE
+        for column in _COLUMNS:
+            section = self._view[offset : offset + 8 * count]
+            setattr(self, column, section.cast(_TYPECODES.get(column, "q")))
+            offset += 8 * count
+        self.names = self._view[names_offset:]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if self._mmap.closed:
+            return
+        # The mmap refuses to close while views of it are alive.
+        for column in (*_COLUMNS, "names"):
+            getattr(self, column).release()
+        self._view.release()
+        self._mmap.close()
+
+    def index(self, product_id: int) -> Optional[int]:
+        """Row of ``product_id``, or None if the snapshot does not have it."""
+        if not self._count:
+            return None
+        guess = product_id - self.ids[0]
+        if 0 <= guess < self._count and self.ids[guess] == product_id:
+            return guess
+        index = bisect_left(self.ids, product_id)
+        if index < self._count and self.ids[index] == product_id:
+            return index
+        return None
+
+    def name(self, index: int) -> str:
+        start = self.name_ends[index - 1] if index else 0
+        return str(self.names[start : self.name_ends[index]], "utf-8")
+
+    def record(self, index: int) -> StockRecord:
+        return StockRecord(
+            self.ids[index],
+            self.name(index),
+            self.quantities[index],
+            self.prices[index],
+        )
+
+    def get(self, product_id: int) -> Optional[StockRecord]:
+        index = self.index(product_id)
+        return None if index is None else self.record(index)
+
+    def low_stock(self, threshold: int) -> List[int]:
+        """Ids of products with quantity below ``threshold``, lowest first."""
+        end = bisect_left(self.by_quantity, threshold, key=self.quantities.__getitem__)
+        ids = self.ids
+        return [ids[index] for index in self.by_quantity[:end]]
+
+    def __iter__(self) -> Iterator[StockRecord]:
+        return map(self.record, range(self._count))
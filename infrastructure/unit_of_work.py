@@ -1,27 +1,237 @@
+import time
+from contextlib import contextmanager
+from typing import Optional, Set
+
 from domain.unit_of_work import UnitOfWork
-from sqlalchemy.orm import Session
-from .repositories import SqlAlchemyOrderRepository, SqlAlchemyProductRepository
+from sqlalchemy.orm import Session, SessionTransaction, sessionmaker
+from .database import read_only_engine
+from .instrumentation import (
+    MetricsSink,
+    UnitOfWorkMetrics,
+    start_collecting,
+    stop_collecting,
+)
+from .order_cache import CachedOrderRepository, OrderCache
+from .product_cache import CachedProductRepository, ProductCache
+from .repositories import (
+    SqlAlchemyOrderRepository,
+    SqlAlchemyProductRepository,
+    SqlAlchemySalesReportRepository,
+)
+
+
+def _read_only_sessions(session_factory):
+    """Sessions on the engine of ``session_factory`` for read units of work."""
+    bind = getattr(session_factory, "kw", {}).get("bind")
+    if bind is None:
+        return session_factory
+    return sessionmaker(
+        class_=session_factory.class_,
+        **{**session_factory.kw, "bind": read_only_engine(bind)},
+    )
+
+
+class _MeasuredUnitOfWork(UnitOfWork):
+    metrics_sink: Optional[MetricsSink] = None
+    _metrics: Optional[UnitOfWorkMetrics] = None
 
+    def _start_metrics(self):
+        if self.metrics_sink is not None:
+            self._metrics = UnitOfWorkMetrics()
+            self._metrics_token = start_collecting(self._metrics)
+            self._entered_at = time.perf_counter()
 
-class SqlAlchemyUnitOfWork(UnitOfWork):
-    def __init__(self, session_factory):
+    def _finish_metrics(self, failed: bool):
+        if self._metrics is None:
+            return
+        metrics, self._metrics = self._metrics, None
+        stop_collecting(self._metrics_token)
+        metrics.duration = time.perf_counter() - self._entered_at
+        metrics.failed = failed
+        self.metrics_sink.record(metrics)
+
+
+class SqlAlchemyUnitOfWork(_MeasuredUnitOfWork):
+    def __init__(
+        self,
+        session_factory,
+        product_cache: Optional[ProductCache] = None,
+        metrics_sink: Optional[MetricsSink] = None,
+        read_session_factory=None,
+        order_cache: Optional[OrderCache] = None,
+    ):
         self.session_factory = session_factory
+        self.read_session_factory = read_session_factory or _read_only_sessions(
+            session_factory
+        )
+        self.product_cache = product_cache
+        self.metrics_sink = metrics_sink
+        self.order_cache = order_cache
+        self._group_session: Optional[Session] = None
+        self._group_written: Set[int] = set()
+        self._savepoint: Optional[SessionTransaction] = None
 
     def __enter__(self):
-        self.session: Session = self.session_factory()
+        self._start_metrics()
+        if self._group_session is not None:
+            # Inside group(): run on the shared session under a SAVEPOINT so
+            # a failure only discards this unit of work.
+            self.session = self._group_session
+            self._savepoint = self.session.begin_nested()
+        else:
+            self.session: Session = self.session_factory()
         self.products = SqlAlchemyProductRepository(self.session)
+        self._cached_products: Optional[CachedProductRepository] = None
+        if self.product_cache is not None:
+            self.products = self._cached_products = CachedProductRepository(
+                self.products,
+                self.product_cache,
+                written=self._group_written if self._savepoint else None,
+            )
         self.orders = SqlAlchemyOrderRepository(self.session)
+        if self.order_cache is not None:
+            self.orders = CachedOrderRepository(
+                self.orders, self.order_cache, self.session
+            )
+        self.reports = SqlAlchemySalesReportRepository(self.session)
         return self
 
     def __exit__(self, exception_type, exception_value, traceback):
-        if exception_type:
-            self.session.rollback()
-        else:
-            self.session.commit()
-        self.session.close()
+        failed = exception_type is not None
+        try:
+            if exception_type:
+                self.rollback()
+            else:
+                self.commit()
+            if self._savepoint is None:
+                self.session.close()
+            self._savepoint = None
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self._finish_metrics(failed)
+
+    def read(self) -> "SqlAlchemyReadUnitOfWork":
+        """A fresh read-only unit of work sharing this one's cache and sink.
+
+        It does not see uncommitted work of an open ``group()``.
+        """
+        return SqlAlchemyReadUnitOfWork(
+            self.read_session_factory,
+            self.product_cache,
+            self.metrics_sink,
+            self.order_cache,
+        )
 
     def commit(self):
+        if self._metrics is None:
+            self._commit()
+            return
+        started = time.perf_counter()
+        try:
+            self._commit()
+        finally:
+            self._metrics.commit_time += time.perf_counter() - started
+
+    def _commit(self):
+        if self._savepoint is not None:
+            if self._savepoint.is_active:
+                self._savepoint.commit()
+            return
+        if self._cached_products is None:
+            self.session.commit()
+            return
+        self._cached_products.before_commit()
         self.session.commit()
+        self._cached_products.after_commit()
+
+    def rollback(self):
+        if self._savepoint is not None:
+            if self._savepoint.is_active:
+                self._savepoint.rollback()
+            return
+        self.session.rollback()
+        if self._cached_products is not None:
+            self._cached_products.after_rollback()
+
+    @contextmanager
+    def group(self):
+        """Share one transaction between the units of work entered inside.
+
+        Each ``with uow:`` becomes a SAVEPOINT and ``commit()`` only releases
+        it; the work becomes durable on ``commit_group()`` or when the block
+        exits. Requires an engine preset that controls BEGIN (see
+        infrastructure.database), otherwise pysqlite breaks SAVEPOINTs.
+        """
+        if self._group_session is not None:
+            raise RuntimeError("Unit of work group is already open")
+        self._group_session = self.session_factory()
+        try:
+            yield self
+            self.commit_group()
+        except BaseException:
+            self._group_session.rollback()
+            self._group_written.clear()
+            raise
+        finally:
+            self._group_session.close()
+            self._group_session = None
+
+    def commit_group(self):
+        if self.product_cache is not None:
+            self.product_cache.invalidate(self._group_written)
+        self._group_session.commit()
+        if self.product_cache is not None:
+            self.product_cache.invalidate(self._group_written)
+        self._group_written.clear()
+
+
+class SqlAlchemyReadUnitOfWork(_MeasuredUnitOfWork):
+    """Unit of work for calls that only query.
+
+    Sessions are opened without autoflush and expiry and are never
+    committed; leaving the block just ends the read transaction. Pass a
+    session factory bound to a ``read_only`` engine to move reads off the
+    writer's connection pool.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        product_cache: Optional[ProductCache] = None,
+        metrics_sink: Optional[MetricsSink] = None,
+        order_cache: Optional[OrderCache] = None,
+    ):
+        self.session_factory = session_factory
+        self.product_cache = product_cache
+        self.metrics_sink = metrics_sink
+        self.order_cache = order_cache
+
+    def __enter__(self):
+        self._start_metrics()
+        self.session: Session = self.session_factory(
+            autoflush=False, expire_on_commit=False
+        )
+        self.products = SqlAlchemyProductRepository(self.session)
+        if self.product_cache is not None:
+            self.products = CachedProductRepository(self.products, self.product_cache)
+        self.orders = SqlAlchemyOrderRepository(self.session)
+        if self.order_cache is not None:
+            self.orders = CachedOrderRepository(
+                self.orders, self.order_cache, self.session
+            )
+        self.reports = SqlAlchemySalesReportRepository(self.session)
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        try:
+            self.session.close()
+        finally:
+            self._finish_metrics(exception_type is not None)
+
+    def commit(self):
+        raise RuntimeError("Read-only unit of work cannot commit")
 
     def rollback(self):
         self.session.rollback()
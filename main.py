@@ -1,24 +1,209 @@
 import argparse
+import functools
 import logging
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Iterator, List, TextIO
 
-from domain.services import WarehouseService
-from infrastructure.orm import Base
-from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
-from infrastructure.database import DATABASE_URL
+from domain.services import ReportingService, WarehouseService
+from infrastructure.importers import (
+    FORMATS,
+    detect_format,
+    read_products,
+    read_stock_deltas,
+)
+
+# SQLAlchemy and the infrastructure modules built on it are imported inside
+# the functions below, so that parsing arguments and --help stay fast.
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-engine = create_engine(DATABASE_URL)
-SessionFactory = sessionmaker(bind=engine, autoflush=False)
-Base.metadata.create_all(engine)
+# Set by --profile; units of work created afterwards report to it.
+metrics_sink = None
+
+
+def configure_logging():
+    """Hand log records to a queue so the stream handler writes them on a
+    background thread instead of blocking the command."""
+    import atexit
+    import queue
+    from logging.handlers import QueueHandler, QueueListener
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    queue_handler = QueueHandler(log_queue)
+
+    root = logging.getLogger()
+    root.setLevel(os.environ.get("WAREHOUSE_LOG_LEVEL", "INFO").upper())
+    root.addHandler(queue_handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+    def log_directly_in_child():
+        # Forked workers (run-orders) inherit the queue but not the listener.
+        root.removeHandler(queue_handler)
+        root.addHandler(handler)
+
+    os.register_at_fork(after_in_child=log_directly_in_child)
+
+
+@functools.lru_cache(maxsize=None)
+def get_engine():
+    from infrastructure.database import create_warehouse_engine
+
+    return create_warehouse_engine()
+
+
+@functools.lru_cache(maxsize=None)
+def get_session_factory():
+    from sqlalchemy.orm import sessionmaker
+
+    from infrastructure.migrations import schema_is_current
+
+    engine = get_engine()
+    if not schema_is_current(engine):
+        logger.error(
+            "Database schema is missing or outdated. "
+            "Run 'python3 main.py setup-db' (or 'make setup-db') first."
+        )
+        raise SystemExit(1)
+    return sessionmaker(bind=engine, autoflush=False)
+
+
+@functools.lru_cache(maxsize=None)
+def get_read_session_factory():
+    """Sessions on WAREHOUSE_READ_DATABASE_URL, if set, for query-only calls.
+
+    Without it reads share the main engine (see SqlAlchemyUnitOfWork.read).
+    """
+    url = os.environ.get("WAREHOUSE_READ_DATABASE_URL")
+    if not url:
+        return None
+    from sqlalchemy.orm import sessionmaker
+
+    from infrastructure.database import create_warehouse_engine
+
+    return sessionmaker(bind=create_warehouse_engine(url, preset="read_only"))
+
+
+@functools.lru_cache(maxsize=None)
+def get_product_cache():
+    from infrastructure.product_cache import ProductCache
+
+    cache_ttl = os.environ.get("WAREHOUSE_PRODUCT_CACHE_TTL")
+    return ProductCache(
+        max_size=int(os.environ.get("WAREHOUSE_PRODUCT_CACHE_SIZE", "1024")),
+        ttl=float(cache_ttl) if cache_ttl else None,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_order_cache():
+    from infrastructure.order_cache import OrderCache
+
+    return OrderCache(
+        max_size=int(os.environ.get("WAREHOUSE_ORDER_CACHE_SIZE", "1024")),
+        persist=os.environ.get("WAREHOUSE_ORDER_SNAPSHOTS") == "1",
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_shard_router():
+    """Router of the WAREHOUSE_SHARDS partitioned storage, None for a single
+    database."""
+    from infrastructure.sharding import router_from_env
+
+    return router_from_env()
+
+
+@functools.lru_cache(maxsize=None)
+def get_shard_engines():
+    from infrastructure.sharding import create_shard_engines
+
+    return create_shard_engines(get_shard_router().shard_count)
+
+
+@functools.lru_cache(maxsize=None)
+def get_shard_session_factories():
+    from sqlalchemy.orm import sessionmaker
+
+    from infrastructure.migrations import schema_is_current
+
+    engines = get_shard_engines()
+    if not all(map(schema_is_current, engines)):
+        logger.error(
+            "Schema of a shard is missing or outdated. "
+            "Run 'python3 main.py setup-db' (or 'make setup-db') first."
+        )
+        raise SystemExit(1)
+    return [sessionmaker(bind=engine, autoflush=False) for engine in engines]
+
+
+def get_engines():
+    """Engines of every database file: the shards or the single database."""
+    return get_shard_engines() if get_shard_router() else [get_engine()]
+
+
+def check_schema():
+    """Exit before doing any work if setup-db or migrate is needed."""
+    if get_shard_router() is not None:
+        get_shard_session_factories()
+    else:
+        get_session_factory()
+
+
+def require_single_database(command: str):
+    if get_shard_router() is not None:
+        logger.error(
+            "'%s' does not support sharded storage (WAREHOUSE_SHARDS).", command
+        )
+        raise SystemExit(1)
+
+
+def setup_sharded_uow():
+    from infrastructure.sharding import ShardedUnitOfWork
+
+    # Product and order caches are not shared between shards.
+    return ShardedUnitOfWork(
+        get_shard_session_factories(), get_shard_router(), metrics_sink=metrics_sink
+    )
 
 
 def setup_service():
-    uow_instance = SqlAlchemyUnitOfWork(SessionFactory)
-    return WarehouseService(uow=uow_instance)
+    from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+
+    if get_shard_router() is not None:
+        uow_instance = setup_sharded_uow()
+    else:
+        uow_instance = SqlAlchemyUnitOfWork(
+            get_session_factory(),
+            product_cache=get_product_cache(),
+            metrics_sink=metrics_sink,
+            read_session_factory=get_read_session_factory(),
+            order_cache=get_order_cache(),
+        )
+    return WarehouseService(
+        uow=uow_instance,
+        item_log_limit=int(os.environ.get("WAREHOUSE_LOG_ITEM_LIMIT", "20")),
+    )
+
+
+def setup_reporting_service():
+    from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+
+    if get_shard_router() is not None:
+        return ReportingService(uow=setup_sharded_uow())
+    return ReportingService(
+        uow=SqlAlchemyUnitOfWork(
+            get_session_factory(),
+            metrics_sink=metrics_sink,
+            read_session_factory=get_read_session_factory(),
+        )
+    )
 
 
 def handle_create_product(args):
@@ -28,20 +213,29 @@ def handle_create_product(args):
     )
     if product and product.id:
         logger.info(
-            f"Successfully created product: ID={product.id}, Name={product.name}, Qty={product.quantity}, Price={product.price}"
+            "Successfully created product: ID=%s, Name=%s, Qty=%s, Price=%s",
+            product.id,
+            product.name,
+            product.quantity,
+            product.price,
         )
     else:
         logger.error("Failed to create product.")
 
 
+def parse_order_items(items: str) -> List[tuple[int, int]]:
+    order_details = []
+    for item_str in items.split(";"):
+        pid_str, qty_str = item_str.split(",")
+        order_details.append((int(pid_str), int(qty_str)))
+    return order_details
+
+
 def handle_create_order(args):
     service = setup_service()
 
-    order_details = []
     try:
-        for item_str in args.items.split(";"):
-            pid_str, qty_str = item_str.split(",")
-            order_details.append((int(pid_str), int(qty_str)))
+        order_details = parse_order_items(args.items)
     except ValueError:
         logger.error(
             "Invalid format for --items. Use 'product_id,quantity;product_id,quantity;...'. Example: '1,2;3,1'"
@@ -52,41 +246,435 @@ def handle_create_order(args):
         logger.warning("No items provided for the order.")
         return
 
-    logger.info(f"Attempting to create order with details: {order_details}")
+    logger.info("Attempting to create order with %d item lines", len(order_details))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Order details: %s", order_details)
     new_order = service.create_order(products_to_order_details=order_details)
 
     if new_order and new_order.items:
-        logger.info(f"Successfully created order: ID={new_order.id}")
-        for item in new_order.items:
+        logger.info(
+            "Successfully created order: ID=%s, %d items",
+            new_order.id,
+            len(new_order.items),
+        )
+        # Sampled down to about WAREHOUSE_LOG_ITEM_LIMIT lines, like the service.
+        log_step = -(-len(new_order.items) // service.item_log_limit)
+        for item in new_order.items[::log_step]:
             logger.info(
-                f"  Item: {item.product.name}, Qty: {item.quantity_ordered}, Price: {item.price_at_purchase}, ItemTotal: {item.total_cost}"
+                "  Item: %s, Qty: %s, Price: %s, ItemTotal: %s",
+                item.product.name,
+                item.quantity_ordered,
+                item.price_at_purchase,
+                item.total_cost,
             )
-        logger.info(f"  Order Total: {new_order.total_order_cost}")
+        logger.info("  Order Total: %s", new_order.total_order_cost)
     elif new_order and not new_order.items:
         logger.warning(
-            f"Order (ID potential: {new_order.id}) created but contains no items (e.g. out of stock, invalid items)."
+            "Order (ID potential: %s) created but contains no items (e.g. out of stock, invalid items).",
+            new_order.id,
         )
     else:
         logger.error(
-            f"Failed to create order or order is empty. Service returned: {new_order}"
+            "Failed to create order or order is empty. Service returned: %s", new_order
         )
 
 
-def handle_list_products(args):
+def handle_import_products(args):
     service = setup_service()
-    products = service.list_all_products()
-    if products:
-        logger.info("Available products:")
-        for p in products:
-            logger.info(
-                f"  ID: {p.id}, Name: {p.name}, Quantity: {p.quantity}, Price: {p.price}"
+    fmt = args.format or detect_format(args.file)
+
+    started = time.perf_counter()
+    if args.file == "-":
+        created = service.create_products_bulk(
+            read_products(sys.stdin, fmt), batch_size=args.batch_size
+        )
+    else:
+        with open(args.file, newline="", encoding="utf-8") as stream:
+            created = service.create_products_bulk(
+                read_products(stream, fmt), batch_size=args.batch_size
             )
+    elapsed = time.perf_counter() - started
+
+    rate = created / elapsed if elapsed > 0 else float(created)
+    logger.info("Imported %d products in %.2fs (%.0f rows/sec)", created, elapsed, rate)
+
+
+def _preview(values: list, limit: int = 20) -> str:
+    shown = ", ".join(map(str, values[:limit]))
+    if len(values) > limit:
+        shown += f", ... ({len(values) - limit} more)"
+    return shown
+
+
+def handle_adjust_stock(args):
+    service = setup_service()
+
+    started = time.perf_counter()
+    if args.file == "-":
+        report = service.adjust_stock_bulk(
+            read_stock_deltas(sys.stdin), batch_size=args.batch_size
+        )
     else:
+        with open(args.file, newline="", encoding="utf-8") as stream:
+            report = service.adjust_stock_bulk(
+                read_stock_deltas(stream), batch_size=args.batch_size
+            )
+    elapsed = time.perf_counter() - started
+
+    rate = report.records / elapsed if elapsed > 0 else float(report.records)
+    logger.info(
+        "Adjusted stock of %d products from %d records in %.2fs (%.0f records/sec)",
+        report.applied,
+        report.records,
+        elapsed,
+        rate,
+    )
+    if report.unknown_ids:
+        logger.warning(
+            "Unknown product IDs (%d): %s",
+            len(report.unknown_ids),
+            _preview(report.unknown_ids),
+        )
+    if report.negative_stock:
+        logger.warning(
+            "Rejected, stock would become negative (%d): %s",
+            len(report.negative_stock),
+            _preview(
+                [
+                    f"{product_id} -> {quantity}"
+                    for product_id, quantity in report.negative_stock.items()
+                ]
+            ),
+        )
+
+
+def handle_list_products(args):
+    service = setup_service()
+    if args.stream:
+        products = service.iter_all_products(limit=args.limit, after_id=args.after)
+    else:
+        products = service.list_all_products(limit=args.limit, after_id=args.after)
+
+    last_id = None
+    for p in products:
+        if last_id is None:
+            logger.info("Available products:")
+        logger.info(
+            "  ID: %s, Name: %s, Quantity: %s, Price: %s",
+            p.id,
+            p.name,
+            p.quantity,
+            p.price,
+        )
+        last_id = p.id
+
+    if last_id is None:
         logger.info("No products found in the warehouse.")
+    elif args.limit is not None:
+        logger.info("Next page: --after %s", last_id)
+
+
+def handle_search_products(args):
+    service = setup_service()
+    products = service.search_products(args.query, limit=args.limit)
+    if not products:
+        logger.info("No products match '%s'.", args.query)
+        return
+    logger.info("Products matching '%s':", args.query)
+    for p in products:
+        logger.info(
+            "  ID: %s, Name: %s, Quantity: %s, Price: %s",
+            p.id,
+            p.name,
+            p.quantity,
+            p.price,
+        )
+
+
+def _read_order_lines(stream: TextIO) -> Iterator[List[tuple[int, int]]]:
+    for line_no, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield parse_order_items(line)
+        except ValueError:
+            logger.warning("Invalid order on line %d: '%s'. Skipping", line_no, line)
+
+
+def handle_run_orders(args):
+    from infrastructure.order_runner import run_orders
+
+    # Fail fast on a missing schema before any worker process starts.
+    check_schema()
+    stream = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+    placed = failed = empty = 0
+    started = time.perf_counter()
+    try:
+        for outcome in run_orders(
+            _read_order_lines(stream),
+            workers=args.workers,
+            cache_size=args.cache_size,
+            order_snapshots=get_order_cache().persist,
+            router=get_shard_router(),
+        ):
+            if outcome.error:
+                failed += 1
+            elif outcome.items:
+                placed += 1
+            else:
+                empty += 1
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    elapsed = time.perf_counter() - started
+
+    total = placed + failed + empty
+    rate = total / elapsed if elapsed > 0 else float(total)
+    logger.info(
+        "Processed %d orders in %.2fs (%.0f orders/sec): "
+        "placed=%d, empty=%d, failed=%d",
+        total,
+        elapsed,
+        rate,
+        placed,
+        empty,
+        failed,
+    )
+
+
+def handle_batch(args):
+    from infrastructure.batch import BatchRunner
+    from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+
+    require_single_database("batch")
+    runner = BatchRunner(
+        SqlAlchemyUnitOfWork(
+            get_session_factory(),
+            product_cache=get_product_cache(),
+            metrics_sink=metrics_sink,
+            order_cache=get_order_cache(),
+        ),
+        group_size=args.group_size,
+        group_interval=args.group_ms / 1000,
+    )
+    stream = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+    try:
+        stats = runner.run(stream)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    logger.info(
+        "Processed %d commands in %.2fs (%.0f commands/sec, %d commits): "
+        "succeeded=%d, failed=%d",
+        stats.processed,
+        stats.elapsed,
+        stats.rate,
+        stats.groups,
+        stats.succeeded,
+        stats.failed,
+    )
+
+
+def handle_list_orders(args):
+    service = setup_service()
+    summaries = service.list_order_summaries(
+        limit=args.limit,
+        after_id=args.after,
+        created_from=args.since,
+        created_to=args.until,
+    )
+    if not summaries:
+        logger.info("No orders found.")
+        return
+    logger.info("Orders:")
+    for summary in summaries:
+        created = summary.created_at.isoformat() if summary.created_at else "unknown"
+        logger.info(
+            "  ID: %s, Items: %s, Total: %.2f, Created: %s",
+            summary.id,
+            summary.item_count,
+            summary.total_cost,
+            created,
+        )
+    if args.limit is not None and len(summaries) == args.limit:
+        logger.info("Next page: --after %s", summaries[-1].id)
+
+
+def handle_get_order(args):
+    service = setup_service()
+    order = service.get_order(args.order_id)
+    if order is None:
+        logger.error("Order %s not found.", args.order_id)
+        sys.exit(1)
+    created = order.created_at.isoformat() if order.created_at else "unknown"
+    logger.info(
+        "Order ID: %s, Items: %s, Total: %.2f, Created: %s",
+        order.id,
+        len(order.items),
+        order.total_order_cost,
+        created,
+    )
+    for item in order.items:
+        logger.info(
+            "  Product ID: %s, Name: %s, Quantity: %s, Price: %.2f, Total: %.2f",
+            item.product.id,
+            item.product.name,
+            item.quantity_ordered,
+            item.price_at_purchase,
+            item.total_cost,
+        )
+
+
+def handle_export_snapshot(args):
+    from infrastructure.snapshot_export import export_snapshot
+
+    require_single_database("export-snapshot")
+    get_session_factory()  # exits if the schema is outdated
+    started = time.perf_counter()
+    result = export_snapshot(get_engine(), args.output, full=args.full)
+    elapsed = time.perf_counter() - started
+
+    logger.info(
+        "%s stock snapshot %s with %d products (%d added, %d changed) in %.2fs",
+        "Refreshed" if result.incremental else "Wrote",
+        args.output,
+        result.products,
+        result.added,
+        result.changed,
+        elapsed,
+    )
+
+
+def handle_report(args):
+    service = setup_reporting_service()
+    window = {
+        "after_id": args.after,
+        "max_id": args.max_id,
+        "created_from": args.since,
+        "created_to": args.until,
+    }
+    summary = service.sales_summary(**window)
+    logger.info(
+        "Orders: %d, Units sold: %d, Revenue: %.2f, Average order value: %.2f",
+        summary.order_count,
+        summary.units_sold,
+        summary.revenue,
+        summary.average_order_value,
+    )
+
+    top = service.top_products(limit=args.top, order_by=args.by, **window)
+    if top:
+        logger.info("Top %d products by %s:", len(top), args.by)
+    for rank, sales in enumerate(top, start=1):
+        logger.info(
+            "  %d. ID: %s, Name: %s, Units: %s, Revenue: %.2f",
+            rank,
+            sales.product_id,
+            sales.name,
+            sales.units_sold,
+            sales.revenue,
+        )
+
+
+def handle_serve(args):
+    from infrastructure.http_api import WarehouseHTTPServer
+
+    check_schema()
+    server = WarehouseHTTPServer(
+        (args.host, args.port),
+        service_factory=setup_service,
+        workers=args.workers,
+        backlog=args.backlog,
+    )
+    host, port = server.server_address[:2]
+    logger.info(
+        "Serving warehouse API on http://%s:%s (%d workers)", host, port, args.workers
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down.")
+    finally:
+        server.server_close()
+
+
+def run_profiled(args):
+    """Run a command under cProfile and print its SQL statements, per unit
+    of work metrics and the hottest functions to stderr."""
+    import cProfile
+    import pstats
+
+    from infrastructure.instrumentation import (
+        InMemoryMetricsSink,
+        QueryLog,
+        collect,
+        instrument_engine,
+    )
+
+    global metrics_sink
+    metrics_sink = InMemoryMetricsSink()
+    for engine in get_engines():
+        instrument_engine(engine)
+    read_sessions = get_read_session_factory()
+    if read_sessions is not None:
+        instrument_engine(read_sessions.kw["bind"])
+    profiler = cProfile.Profile()
+    with collect(QueryLog()) as log:
+        profiler.runcall(args.func, args)
+
+    out = sys.stderr
+    print(
+        f"\n{log.statement_count} SQL statements, {log.db_time * 1000:.2f}ms:", file=out
+    )
+    for query in log.queries:
+        statement = " ".join(query.statement.split())
+        suffix = " [executemany]" if query.executemany else ""
+        print(f"  {query.duration * 1000:8.3f}ms  {statement}{suffix}", file=out)
+    print(f"\nUnits of work: {len(metrics_sink.records)}", file=out)
+    for metrics in metrics_sink.records:
+        print(
+            f"  statements={metrics.statements} db={metrics.db_time * 1000:.2f}ms "
+            f"commit={metrics.commit_time * 1000:.2f}ms "
+            f"total={metrics.duration * 1000:.2f}ms rows={metrics.rows_mapped}"
+            f"{' FAILED' if metrics.failed else ''}",
+            file=out,
+        )
+    print(file=out)
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(20)
+
+
+def handle_setup_db(args):
+    from infrastructure.migrations import LATEST_VERSION, migrate
+    from infrastructure.orm import Base
+
+    for engine in get_engines():
+        Base.metadata.create_all(engine)
+        migrate(engine)
+    logger.info("Database schema is ready (version %d).", LATEST_VERSION)
+
+
+def handle_migrate(args):
+    from infrastructure.migrations import migrate
+
+    applied = []
+    for engine in get_engines():
+        applied = migrate(engine, target=args.target) or applied
+    for migration in applied:
+        logger.info(
+            "Applied migration %d: %s", migration.version, migration.description
+        )
+    if not applied:
+        logger.info("Database schema is up to date.")
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Warehouse Management CLI")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print the SQL statements, unit of work metrics and a cProfile summary",
+    )
     subparsers = parser.add_subparsers(
         dest="command", help="Available commands", required=True
     )
@@ -116,10 +704,237 @@ if __name__ == "__main__":
     )
     parser_create_order.set_defaults(func=handle_create_order)
 
+    parser_import_products = subparsers.add_parser(
+        "import-products", help="Bulk import products from a CSV or JSONL file"
+    )
+    parser_import_products.add_argument(
+        "--file",
+        type=str,
+        default="-",
+        help="Path to the file with products, '-' reads from stdin (default)",
+    )
+    parser_import_products.add_argument(
+        "--format",
+        type=str,
+        choices=FORMATS,
+        help="Input format, detected from the file extension by default (csv for stdin)",
+    )
+    parser_import_products.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="Number of products inserted per transaction",
+    )
+    parser_import_products.set_defaults(func=handle_import_products)
+
+    parser_adjust_stock = subparsers.add_parser(
+        "adjust-stock",
+        help="Add 'product_id,delta' CSV records to product stock (e.g. goods received)",
+    )
+    parser_adjust_stock.add_argument(
+        "--file",
+        type=str,
+        default="-",
+        help="Path to the CSV file with records, '-' reads from stdin (default)",
+    )
+    parser_adjust_stock.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="Number of records applied per transaction",
+    )
+    parser_adjust_stock.set_defaults(func=handle_adjust_stock)
+
     parser_list_products = subparsers.add_parser(
         "list-products", help="List all available products"
     )
+    parser_list_products.add_argument(
+        "--limit", type=int, help="Maximum number of products to list"
+    )
+    parser_list_products.add_argument(
+        "--after",
+        type=int,
+        help="List only products with ID greater than this one (for paging)",
+    )
+    parser_list_products.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print products as they are read instead of loading them all first",
+    )
     parser_list_products.set_defaults(func=handle_list_products)
 
+    parser_search_products = subparsers.add_parser(
+        "search-products", help="Find products by words or word prefixes of the name"
+    )
+    parser_search_products.add_argument(
+        "query", type=str, help="Words to search for, e.g. 'bol m8'"
+    )
+    parser_search_products.add_argument(
+        "--limit", type=int, default=20, help="Maximum number of products to show"
+    )
+    parser_search_products.set_defaults(func=handle_search_products)
+
+    parser_run_orders = subparsers.add_parser(
+        "run-orders",
+        help="Place many orders in parallel worker processes, one order per line",
+    )
+    parser_run_orders.add_argument(
+        "--file",
+        type=str,
+        default="-",
+        help="File with orders in --items format, one per line; '-' reads stdin",
+    )
+    parser_run_orders.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: number of CPUs)",
+    )
+    parser_run_orders.add_argument(
+        "--cache-size",
+        type=int,
+        default=1024,
+        help="Per-worker product cache size, 0 disables the cache",
+    )
+    parser_run_orders.set_defaults(func=handle_run_orders)
+
+    parser_batch = subparsers.add_parser(
+        "batch",
+        help="Run JSON commands (create-product, create-order, set-stock), one per line",
+    )
+    parser_batch.add_argument(
+        "--file",
+        type=str,
+        default="-",
+        help="File with one JSON command per line; '-' reads stdin (default)",
+    )
+    parser_batch.add_argument(
+        "--group-size",
+        type=int,
+        default=100,
+        help="Commit after this many commands",
+    )
+    parser_batch.add_argument(
+        "--group-ms",
+        type=float,
+        default=50,
+        help="Commit once the open group is older than this many milliseconds",
+    )
+    parser_batch.set_defaults(func=handle_batch)
+
+    parser_report = subparsers.add_parser(
+        "report", help="Show sales totals and top-selling products"
+    )
+    parser_report.add_argument(
+        "--top", type=int, default=10, help="Number of top products to show"
+    )
+    parser_report.add_argument(
+        "--by",
+        type=str,
+        choices=("revenue", "units"),
+        default="revenue",
+        help="Rank top products by revenue or by units sold",
+    )
+    parser_report.add_argument(
+        "--after", type=int, help="Only include orders with ID greater than this one"
+    )
+    parser_report.add_argument(
+        "--max-id", type=int, help="Only include orders with ID up to this one"
+    )
+    parser_report.add_argument(
+        "--since",
+        type=datetime.fromisoformat,
+        help="Only include orders created at or after this ISO timestamp (UTC)",
+    )
+    parser_report.add_argument(
+        "--until",
+        type=datetime.fromisoformat,
+        help="Only include orders created before this ISO timestamp (UTC)",
+    )
+    parser_report.set_defaults(func=handle_report)
+
+    parser_list_orders = subparsers.add_parser(
+        "list-orders", help="List order summaries (totals without loading items)"
+    )
+    parser_list_orders.add_argument(
+        "--limit", type=int, help="Maximum number of orders to list"
+    )
+    parser_list_orders.add_argument(
+        "--after", type=int, help="List only orders with ID greater than this one"
+    )
+    parser_list_orders.add_argument(
+        "--since",
+        type=datetime.fromisoformat,
+        help="Only orders created at or after this ISO timestamp (UTC)",
+    )
+    parser_list_orders.add_argument(
+        "--until",
+        type=datetime.fromisoformat,
+        help="Only orders created before this ISO timestamp (UTC)",
+    )
+    parser_list_orders.set_defaults(func=handle_list_orders)
+
+    parser_get_order = subparsers.add_parser(
+        "get-order", help="Show an order with its items"
+    )
+    parser_get_order.add_argument("order_id", type=int, help="ID of the order")
+    parser_get_order.set_defaults(func=handle_get_order)
+
+    parser_export_snapshot = subparsers.add_parser(
+        "export-snapshot",
+        help="Write product stock to a columnar file for readers without database access",
+    )
+    parser_export_snapshot.add_argument(
+        "--output",
+        type=str,
+        default="stock.snapshot",
+        help="Path to the snapshot file, refreshed incrementally if it exists",
+    )
+    parser_export_snapshot.add_argument(
+        "--full",
+        action="store_true",
+        help="Rewrite the snapshot from scratch instead of refreshing it",
+    )
+    parser_export_snapshot.set_defaults(func=handle_export_snapshot)
+
+    parser_serve = subparsers.add_parser(
+        "serve", help="Run the warehouse JSON HTTP API in a long-running process"
+    )
+    parser_serve.add_argument("--host", type=str, default="127.0.0.1")
+    parser_serve.add_argument("--port", type=int, default=8000)
+    parser_serve.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Number of worker threads serving connections",
+    )
+    parser_serve.add_argument(
+        "--backlog",
+        type=int,
+        default=64,
+        help="Connections allowed to wait for a free worker",
+    )
+    parser_serve.set_defaults(func=handle_serve)
+
+    parser_setup_db = subparsers.add_parser(
+        "setup-db", help="Create the database schema and apply all migrations"
+    )
+    parser_setup_db.set_defaults(func=handle_setup_db)
+
+    parser_migrate = subparsers.add_parser(
+        "migrate", help="Apply pending schema migrations to the database"
+    )
+    parser_migrate.add_argument(
+        "--target",
+        type=int,
+        default=None,
+        help="Schema version to migrate to (default: latest)",
+    )
+    parser_migrate.set_defaults(func=handle_migrate)
+
     args = parser.parse_args()
-    args.func(args)
+    configure_logging()
+    if args.profile:
+        run_profiled(args)
+    else:
+        args.func(args)
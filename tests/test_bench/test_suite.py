@@ -0,0 +1,53 @@
+import json
+
+from bench.suite import compare, main
+
+
+def metrics(ops_per_sec, peak_mib):
+    return {"ops_per_sec": ops_per_sec, "peak_mib": peak_mib}
+
+
+def test_compare_reports_slowdowns_and_memory_growth_over_threshold():
+    baseline = {
+        "product_list": metrics(1000, 10),
+        "product_get": metrics(1000, 10),
+        "order_history": metrics(1000, 10),
+    }
+    results = {
+        "product_list": metrics(850, 11),
+        "product_get": metrics(700, 10),
+        "order_history": metrics(1000, 13),
+        "order_placement": metrics(1, 100),
+    }
+
+    regressions = compare(results, baseline, threshold=0.2)
+
+    assert len(regressions) == 2
+    assert regressions[0].startswith("product_get: 700 ops/sec")
+    assert regressions[1].startswith("order_history: peak 13.0 MiB")
+
+
+def test_main_writes_results_and_checks_them_against_baseline(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    output = tmp_path / "results.json"
+    args = [
+        "--products=50",
+        "--orders=40",
+        "--gets=5",
+        "--placements=5",
+        "--repeat=1",
+        f"--baseline={baseline}",
+    ]
+
+    assert main(args + ["--update-baseline"]) == 0
+    assert main(args + [f"--output={output}", "--threshold=1000"]) == 0
+
+    report = json.loads(output.read_text())
+    assert report["shape"]["products"] == 50
+    assert set(report["benchmarks"]) == {
+        "product_list",
+        "product_get",
+        "order_placement",
+        "order_history",
+    }
+    assert report["benchmarks"]["order_history"]["ops"] == 40
@@ -0,0 +1,42 @@
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+# Generous enough for slow CI machines, far below the ~500 ms that importing
+# sqlalchemy.orm alone costs.
+IMPORT_BUDGET_US = int(os.environ.get("WAREHOUSE_IMPORT_BUDGET_MS", "250")) * 1000
+HEAVY_MODULES = ("sqlalchemy", "infrastructure.database", "infrastructure.orm")
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_importing_cli_does_not_load_database_stack():
+    result = run_python(
+        "-c",
+        f"import sys, main; print([m for m in {HEAVY_MODULES!r} if m in sys.modules])",
+    )
+
+    assert result.stdout.strip() == "[]"
+
+
+def test_cli_import_time_within_budget():
+    run_python("-c", "import main")  # warm up bytecode caches
+    result = run_python("-X", "importtime", "-c", "import main")
+
+    cumulative = [
+        int(match.group(1))
+        for match in re.finditer(r"\|\s+(\d+) \| main$", result.stderr, re.MULTILINE)
+    ]
+    assert cumulative, result.stderr
+    assert cumulative[0] < IMPORT_BUDGET_US
@@ -81,3 +81,11 @@ def test_order_total_cost(
         order.add_item(product_to_add, quantity)
 
     assert order.total_order_cost == expected_total_cost
+
+
+def test_domain_models_have_no_instance_dict(sample_product: Product):
+    order = Order(id=1)
+    order.add_item(sample_product, 1)
+
+    for obj in (sample_product, order, order.items[0]):
+        assert not hasattr(obj, "__dict__")
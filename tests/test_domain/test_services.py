@@ -1,8 +1,13 @@
 import pytest
-from domain.models import Product, Order, OrderItem
-from domain.services import WarehouseService
+from domain.models import Product, Order, OrderItem, StockAdjustment
+from domain.exceptions import ConcurrentUpdateError
+from domain.services import ReportingService, RetryPolicy, WarehouseService
 from domain.unit_of_work import UnitOfWork
-from domain.repositories import ProductRepository, OrderRepository
+from domain.repositories import (
+    ProductRepository,
+    OrderRepository,
+    SalesReportRepository,
+)
 
 
 @pytest.fixture
@@ -10,6 +15,10 @@ def mock_uow(mocker):
     uow = mocker.MagicMock(spec=UnitOfWork)
     uow.products = mocker.MagicMock(spec=ProductRepository)
     uow.orders = mocker.MagicMock(spec=OrderRepository)
+    uow.reports = mocker.MagicMock(spec=SalesReportRepository)
+    # Reads go through the same mock, as with the default UnitOfWork.read().
+    uow.read.return_value = uow
+    uow.__enter__.return_value = uow
     return uow
 
 
@@ -50,6 +59,7 @@ def test_get_product_details_product_found(mock_uow, mocker):
 
     mock_uow.products.get.assert_called_once_with(expected_product_id)
     assert retrieved_product is expected_product
+    mock_uow.read.assert_called_once_with()
     mock_uow.__enter__.assert_called_once()
     mock_uow.__exit__.assert_called_once()
 
@@ -70,11 +80,11 @@ def test_create_order_success_one_item(mocker, mock_uow):
         price=product_price,
     )
 
-    mock_uow.products.get.return_value = product_on_stock
+    mock_uow.products.get_many.return_value = {test_product_id: product_on_stock}
 
     created_order = service.create_order(products_to_order_details)
 
-    mock_uow.products.get.assert_called_once_with(test_product_id)
+    mock_uow.products.get_many.assert_called_once_with({test_product_id})
     assert isinstance(created_order, Order)
     assert len(created_order.items) == 1
     order_item = created_order.items[0]
@@ -85,9 +95,159 @@ def test_create_order_success_one_item(mocker, mock_uow):
 
     expected_stock_after_order = initial_stock_quantity - test_quantity_to_order
     assert product_on_stock.quantity == expected_stock_after_order
-    mock_uow.products.update.assert_called_once_with(product_on_stock)
+    mock_uow.products.reserve_many.assert_called_once_with(
+        {test_product_id: test_quantity_to_order}
+    )
     mock_uow.orders.add.assert_called_once_with(created_order)
     mock_uow.commit.assert_called_once()
 
     mock_uow.__enter__.assert_called_once()
     mock_uow.__exit__.assert_called_once_with(None, None, None)
+
+
+def test_create_order_skips_unavailable_items(mock_uow):
+    service = WarehouseService(uow=mock_uow)
+    in_stock = Product(id=1, name="In Stock", quantity=3, price=5.0)
+    scarce = Product(id=2, name="Scarce", quantity=1, price=7.0)
+    mock_uow.products.get_many.return_value = {1: in_stock, 2: scarce}
+
+    created_order = service.create_order([(1, 2), (2, 5), (3, 1), (1, 0)])
+
+    mock_uow.products.get_many.assert_called_once_with({1, 2, 3})
+    assert [item.product for item in created_order.items] == [in_stock]
+    assert in_stock.quantity == 1
+    assert scarce.quantity == 1
+    mock_uow.products.reserve_many.assert_called_once_with({1: 2})
+    mock_uow.orders.add.assert_called_once_with(created_order)
+
+
+def test_create_order_merges_repeated_products(mock_uow):
+    service = WarehouseService(uow=mock_uow)
+    product = Product(id=1, name="Widget", quantity=5, price=2.0)
+    mock_uow.products.get_many.return_value = {1: product}
+
+    created_order = service.create_order([(1, 2), (1, 2), (1, 2)])
+
+    assert len(created_order.items) == 2
+    assert product.quantity == 1
+    mock_uow.products.reserve_many.assert_called_once_with({1: 4})
+
+
+def test_create_order_without_available_items_does_not_reserve(mock_uow):
+    service = WarehouseService(uow=mock_uow)
+    mock_uow.products.get_many.return_value = {}
+
+    created_order = service.create_order([(1, 1)])
+
+    assert created_order.items == []
+    mock_uow.products.reserve_many.assert_not_called()
+    mock_uow.orders.add.assert_not_called()
+    mock_uow.commit.assert_not_called()
+
+
+def test_create_products_bulk_commits_once_per_batch(mock_uow):
+    service = WarehouseService(uow=mock_uow)
+    mock_uow.products.add_many.side_effect = lambda batch: len(batch)
+    products = (
+        Product(id=None, name=f"Product {i}", quantity=i, price=1.0) for i in range(5)
+    )
+
+    created = service.create_products_bulk(products, batch_size=2)
+
+    assert created == 5
+    batch_sizes = [len(c.args[0]) for c in mock_uow.products.add_many.call_args_list]
+    assert batch_sizes == [2, 2, 1]
+    assert mock_uow.commit.call_count == 3
+    assert mock_uow.__enter__.call_count == 3
+
+
+def test_list_all_products_applies_limit_and_cursor(mock_uow):
+    service = WarehouseService(uow=mock_uow)
+    stored = [Product(id=i, name=f"P{i}", quantity=1, price=1.0) for i in (4, 5, 6)]
+    mock_uow.products.iter_products.return_value = iter(stored)
+
+    products = service.list_all_products(limit=2, after_id=3)
+
+    assert products == stored[:2]
+    mock_uow.products.iter_products.assert_called_once_with(batch_size=2, after_id=3)
+    mock_uow.__exit__.assert_called_once()
+    mock_uow.commit.assert_not_called()
+
+
+def test_create_order_retries_concurrent_update(mock_uow):
+    service = WarehouseService(
+        uow=mock_uow, retry_policy=RetryPolicy(attempts=3, base_delay=0)
+    )
+    mock_uow.products.get_many.side_effect = lambda ids: {
+        1: Product(id=1, name="Widget", quantity=5, price=2.0)
+    }
+    mock_uow.products.reserve_many.side_effect = [ConcurrentUpdateError("race"), None]
+
+    created_order = service.create_order([(1, 2)])
+
+    assert len(created_order.items) == 1
+    assert mock_uow.products.reserve_many.call_count == 2
+    mock_uow.orders.add.assert_called_once_with(created_order)
+
+
+def test_create_order_gives_up_after_retry_budget(mock_uow):
+    service = WarehouseService(
+        uow=mock_uow, retry_policy=RetryPolicy(attempts=2, base_delay=0)
+    )
+    mock_uow.products.get_many.side_effect = lambda ids: {
+        1: Product(id=1, name="Widget", quantity=5, price=2.0)
+    }
+    mock_uow.products.reserve_many.side_effect = ConcurrentUpdateError("race")
+
+    with pytest.raises(ConcurrentUpdateError):
+        service.create_order([(1, 2)])
+    assert mock_uow.products.reserve_many.call_count == 2
+
+
+def test_reporting_service_delegates_to_report_repository(mock_uow):
+    service = ReportingService(uow=mock_uow)
+    mock_uow.reports.product_sales.return_value = []
+
+    top = service.top_products(limit=3, order_by="units", after_id=10)
+
+    assert top == []
+    mock_uow.reports.product_sales.assert_called_once_with(
+        after_id=10,
+        max_id=None,
+        limit=3,
+        order_by="units",
+        created_from=None,
+        created_to=None,
+    )
+    mock_uow.commit.assert_not_called()
+
+
+def test_create_order_samples_item_logs_for_large_orders(mock_uow, caplog):
+    product = Product(id=1, name="Bolt", quantity=1000, price=1.0)
+    mock_uow.products.get_many.return_value = {1: product}
+    service = WarehouseService(uow=mock_uow, item_log_limit=10)
+
+    with caplog.at_level("INFO", logger="domain.services"):
+        order = service.create_order([(1, 1)] * 100)
+
+    added = [r for r in caplog.records if r.getMessage().startswith("SERVICE: Added")]
+    assert len(order.items) == 100
+    assert len(added) == 10
+    assert "(1, 1), (1, 1)" not in caplog.text
+    assert caplog.records[-1].getMessage().endswith("... 90 more")
+
+
+def test_adjust_stock_bulk_merges_deltas_per_batch(mock_uow):
+    service = WarehouseService(uow=mock_uow)
+    mock_uow.products.adjust_stock_many.side_effect = lambda deltas: StockAdjustment(
+        applied=len(deltas), unknown_ids=[3] if 3 in deltas else []
+    )
+
+    report = service.adjust_stock_bulk([(1, 5), (2, 1), (1, -2), (3, 4)], batch_size=3)
+
+    assert [c.args[0] for c in mock_uow.products.adjust_stock_many.call_args_list] == [
+        {1: 3, 2: 1},
+        {3: 4},
+    ]
+    assert (report.records, report.applied, report.unknown_ids) == (4, 3, [3])
+    assert mock_uow.commit.call_count == 2
@@ -0,0 +1,41 @@
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from domain.models import Product
+from domain.services import WarehouseService
+from infrastructure.database import create_warehouse_engine
+from infrastructure.orm import Base
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_warehouse_engine(
+        f"sqlite:///{tmp_path / 'warehouse.db'}", preset="wal"
+    )
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(bind=engine, autoflush=False)
+
+
+@pytest.fixture
+def session(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def service(session_factory):
+    """A service over ``session_factory`` with products 1-3 in stock."""
+    service = WarehouseService(SqlAlchemyUnitOfWork(session_factory))
+    service.create_products_bulk(
+        Product(None, name, 100, price)
+        for name, price in [("Bolt", 1.5), ("Nut", 0.5), ("Washer", 0.25)]
+    )
+    return service
@@ -0,0 +1,108 @@
+import json
+import time
+
+import pytest
+from sqlalchemy import func, select
+
+from domain.models import Product
+from domain.services import WarehouseService
+from infrastructure.batch import BatchRunner
+from infrastructure.orm import ProductORM
+from infrastructure.product_cache import ProductCache
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+
+
+def command(command_name, **fields):
+    return json.dumps({"command": command_name, **fields})
+
+
+def test_group_rolls_back_failed_unit_of_work_only(session_factory):
+    uow = SqlAlchemyUnitOfWork(session_factory, product_cache=ProductCache())
+    with uow.group():
+        with uow:
+            uow.products.add(Product(id=None, name="Kept", quantity=1, price=1.0))
+            uow.commit()
+        with pytest.raises(RuntimeError):
+            with uow:
+                uow.products.add(Product(id=None, name="Lost", quantity=1, price=1.0))
+                raise RuntimeError("boom")
+
+    service = WarehouseService(SqlAlchemyUnitOfWork(session_factory))
+    assert [p.name for p in service.list_all_products()] == ["Kept"]
+
+
+def test_failed_command_rolls_back_only_itself(session_factory):
+    uow = SqlAlchemyUnitOfWork(session_factory, product_cache=ProductCache())
+    lines = [
+        command("create-product", name="Bolt", quantity=10, price=1.5),
+        command("create-order", items=[[1, 4]]),
+        command("create-order", items=[[1, 1], [99, 1]]),
+        "not json",
+        "",
+        command("set-stock", product_id=42, quantity=1),
+        command("set-stock", product_id=1, quantity=20),
+        command("create-order", items=[[1, 5]]),
+    ]
+
+    stats = BatchRunner(uow, group_size=100, group_interval=60).run(lines)
+
+    assert (stats.processed, stats.succeeded, stats.failed) == (7, 5, 2)
+    assert stats.groups == 1
+    service = WarehouseService(SqlAlchemyUnitOfWork(session_factory))
+    assert service.get_product_details(1).quantity == 15
+    assert [len(order.items) for order in service.iter_orders()] == [1, 1, 1]
+
+
+def test_commits_every_group_size_commands(session_factory):
+    uow = SqlAlchemyUnitOfWork(session_factory)
+    lines = [
+        command("create-product", name=f"P{i}", quantity=i, price=1.0) for i in range(5)
+    ]
+
+    stats = BatchRunner(uow, group_size=2, group_interval=60).run(iter(lines))
+
+    assert stats.groups == 3
+    assert stats.succeeded == 5
+    products = WarehouseService(
+        SqlAlchemyUnitOfWork(session_factory)
+    ).list_all_products()
+    assert [p.name for p in products] == [f"P{i}" for i in range(5)]
+
+
+def test_commits_when_group_interval_elapses(session_factory):
+    now = [0.0]
+
+    def clock():
+        now[0] += 1.0
+        return now[0]
+
+    uow = SqlAlchemyUnitOfWork(session_factory)
+    lines = [
+        command("create-product", name=f"P{i}", quantity=1, price=1.0) for i in range(3)
+    ]
+
+    stats = BatchRunner(uow, group_size=100, group_interval=1.5, clock=clock).run(lines)
+
+    assert stats.groups == 2
+
+
+def test_stalled_input_commits_group_and_releases_lock(engine, session_factory):
+    def product_count():
+        with engine.connect() as conn:
+            return conn.scalar(select(func.count()).select_from(ProductORM))
+
+    def stalled_lines():
+        yield command("create-product", name="Bolt", quantity=1, price=1.0)
+        deadline = time.monotonic() + 2
+        while product_count() == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # Another writer gets the lock (the wal preset begins IMMEDIATE).
+        with engine.begin() as conn:
+            conn.execute(ProductORM.__table__.insert().values(name="Other"))
+        yield command("create-product", name="Nut", quantity=1, price=1.0)
+
+    uow = SqlAlchemyUnitOfWork(session_factory)
+    stats = BatchRunner(uow, group_size=100, group_interval=0.05).run(stalled_lines())
+
+    assert (stats.succeeded, stats.groups) == (2, 2)
+    assert product_count() == 3
@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from infrastructure.database import create_warehouse_engine, settings_from_env
+from infrastructure.orm import ProductORM
+
+
+def pragma(engine, name):
+    with engine.connect() as conn:
+        return conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+def test_wal_preset_applies_pragmas(engine):
+    assert pragma(engine, "journal_mode") == "wal"
+    assert pragma(engine, "synchronous") == 1
+    assert pragma(engine, "busy_timeout") == 5000
+    assert pragma(engine, "temp_store") == 2
+
+
+def test_savepoints_roll_back_independently(session_factory):
+    session = session_factory()
+    session.add(ProductORM(name="Kept", quantity=1, price=1.0))
+    nested = session.begin_nested()
+    session.add(ProductORM(name="Discarded", quantity=1, price=1.0))
+    session.flush()
+    nested.rollback()
+    session.commit()
+
+    assert session.query(ProductORM.name).all() == [("Kept",)]
+    session.close()
+
+
+def test_read_only_preset_rejects_writes(engine, tmp_path):
+    reader = create_warehouse_engine(
+        f"sqlite:///{tmp_path / 'warehouse.db'}", preset="read_only"
+    )
+    session = sessionmaker(bind=reader)()
+    try:
+        assert session.query(ProductORM).count() == 0
+        with pytest.raises(OperationalError):
+            session.execute(text("INSERT INTO products (name) VALUES ('x')"))
+    finally:
+        session.close()
+        reader.dispose()
+
+
+def test_settings_from_env_overrides(monkeypatch):
+    monkeypatch.setenv("WAREHOUSE_DB_BUSY_TIMEOUT", "100")
+    monkeypatch.setenv("WAREHOUSE_DB_POOL_SIZE", "2")
+
+    settings = settings_from_env("wal")
+
+    assert settings.pragmas["busy_timeout"] == "100"
+    assert settings.pool_size == 2
+    with pytest.raises(ValueError):
+        settings_from_env("turbo")
@@ -0,0 +1,75 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from domain.services import WarehouseService
+from infrastructure.http_api import WarehouseHTTPServer
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+
+
+@pytest.fixture
+def api(session_factory):
+    server = WarehouseHTTPServer(
+        ("127.0.0.1", 0),
+        service_factory=lambda: WarehouseService(SqlAlchemyUnitOfWork(session_factory)),
+        workers=2,
+    )
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    )
+    thread.start()
+    host, port = server.server_address[:2]
+
+    def call(method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(
+            f"http://{host}:{port}{path}", data=data, method=method
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    yield call
+    server.shutdown()
+    server.server_close()
+
+
+def test_product_and_order_round_trip(api):
+    status, product = api(
+        "POST", "/products", {"name": "Bolt", "quantity": 5, "price": 2}
+    )
+    assert status == 201
+    assert product == {"id": 1, "name": "Bolt", "quantity": 5, "price": 2.0}
+
+    status, order = api("POST", "/orders", {"items": [[1, 2]]})
+    assert status == 201
+    assert order["total_cost"] == 4.0
+    assert order["items"][0]["quantity_ordered"] == 2
+
+    assert api("GET", "/products/1") == (200, {**product, "quantity": 3})
+    assert api("GET", "/products?limit=10")[1] == [{**product, "quantity": 3}]
+    assert api("GET", f"/orders/{order['id']}") == (200, order)
+
+
+@pytest.mark.parametrize(
+    "method, path, body, expected_status",
+    [
+        ("GET", "/products/42", None, 404),
+        ("GET", "/orders/42", None, 404),
+        ("GET", "/nowhere", None, 404),
+        ("POST", "/products", {"name": "Bolt"}, 400),
+        ("POST", "/orders", {"items": "1,2"}, 400),
+        ("POST", "/orders", {"items": [[42, 1]]}, 422),
+        ("GET", "/products?limit=ten", None, 400),
+    ],
+)
+def test_errors_are_reported_as_json(api, method, path, body, expected_status):
+    status, payload = api(method, path, body)
+
+    assert status == expected_status
+    assert "error" in payload
@@ -0,0 +1,53 @@
+import io
+
+import pytest
+from infrastructure.importers import detect_format, read_products, read_stock_deltas
+
+
+def test_read_products_from_csv_skips_invalid_rows():
+    stream = io.StringIO("name,quantity,price\nBolt,10,1.5\nNut,many,2\nWasher,3,0.1\n")
+
+    products = list(read_products(stream, "csv"))
+
+    assert [(p.name, p.quantity, p.price) for p in products] == [
+        ("Bolt", 10, 1.5),
+        ("Washer", 3, 0.1),
+    ]
+    assert all(p.id is None for p in products)
+
+
+def test_read_products_from_jsonl_is_lazy():
+    lines = iter(
+        [
+            '{"name": "Bolt", "quantity": 10, "price": 1.5}\n',
+            "\n",
+            "not json\n",
+            '{"name": "Nut", "quantity": 2, "price": 0.5}\n',
+        ]
+    )
+
+    products = read_products(lines, "jsonl")
+
+    assert next(products).name == "Bolt"
+    assert next(products).name == "Nut"
+    with pytest.raises(StopIteration):
+        next(products)
+
+
+def test_read_stock_deltas_skips_header_and_invalid_rows():
+    stream = io.StringIO("product_id,delta\n1,10\n\n2,-3\n3\nx,1\n4,+2\n")
+
+    assert list(read_stock_deltas(stream)) == [(1, 10), (2, -3), (4, 2)]
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        ("items.csv", "csv"),
+        ("items.jsonl", "jsonl"),
+        ("items.ndjson", "jsonl"),
+        ("-", "csv"),
+    ],
+)
+def test_detect_format(path, expected):
+    assert detect_format(path) == expected
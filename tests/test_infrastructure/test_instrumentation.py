@@ -0,0 +1,57 @@
+import pytest
+
+from infrastructure.instrumentation import (
+    InMemoryMetricsSink,
+    assert_max_queries,
+    instrument_engine,
+)
+
+
+@pytest.fixture
+def sink(engine):
+    instrument_engine(engine)
+    return InMemoryMetricsSink()
+
+
+@pytest.fixture
+def service(service, sink):
+    service.uow.metrics_sink = sink
+    return service
+
+
+def test_create_order_statement_budget(engine, service):
+    # BEGIN, product lookup, stock update, product check, order and items inserts.
+    with assert_max_queries(engine, 6):
+        order = service.create_order([(1, 1), (2, 2), (3, 1), (1, 1)])
+
+    assert len(order.items) == 4
+
+
+def test_order_history_queries_do_not_grow_with_orders(engine, service):
+    for _ in range(20):
+        service.create_order([(1, 1), (2, 1)])
+
+    with assert_max_queries(engine, 4):
+        orders = list(service.iter_orders())
+
+    assert len(orders) == 20
+
+
+def test_assert_max_queries_lists_statements_when_exceeded(engine, service):
+    with pytest.raises(AssertionError, match="at most 1 queries, got 2"):
+        with assert_max_queries(engine, 1):
+            service.get_product_details(1)
+
+
+def test_unit_of_work_reports_metrics_to_sink(service, sink):
+    service.get_product_details(1)
+    with pytest.raises(TypeError):
+        service.create_order([(1, 1), (2, "x")])
+
+    read, failed = sink.records
+    assert read.statements == 2
+    assert read.rows_mapped == 1
+    assert read.db_time > 0
+    assert read.duration >= read.db_time + read.commit_time
+    assert not read.failed
+    assert failed.failed
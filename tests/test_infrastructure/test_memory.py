@@ -0,0 +1,152 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.exc import NoResultFound
+
+from domain.exceptions import ConcurrentUpdateError
+from domain.models import Order, Product
+from domain.services import ReportingService, RetryPolicy, WarehouseService
+from infrastructure.memory import InMemoryStore, InMemoryUnitOfWork
+
+
+@pytest.fixture
+def store():
+    store = InMemoryStore()
+    WarehouseService(InMemoryUnitOfWork(store)).create_products_bulk(
+        Product(id=None, name=f"P{i}", quantity=10, price=float(i + 1))
+        for i in range(3)
+    )
+    return store
+
+
+def test_service_runs_orders_against_memory_store(store):
+    service = WarehouseService(InMemoryUnitOfWork(store))
+
+    order = service.create_order([(1, 2), (2, 1), (1, 1), (99, 1)])
+
+    assert order.id == 1
+    assert [(i.product.id, i.quantity_ordered) for i in order.items] == [
+        (1, 2),
+        (2, 1),
+        (1, 1),
+    ]
+    assert service.get_product_details(1).quantity == 7
+    assert service.get_product_details(1).version == 1
+    assert service.get_order(1) is not None
+    with pytest.raises(NoResultFound):
+        service.get_product_details(99)
+    summary = ReportingService(InMemoryUnitOfWork(store)).sales_summary()
+    assert (summary.order_count, summary.units_sold, summary.revenue) == (1, 4, 5.0)
+
+
+def test_rollback_discards_uncommitted_writes(store):
+    uow = InMemoryUnitOfWork(store)
+    with pytest.raises(RuntimeError):
+        with uow:
+            uow.products.add(Product(id=None, name="Lost", quantity=1, price=1.0))
+            uow.products.reserve_many({1: 5})
+            assert uow.products.get(1).quantity == 5
+            raise RuntimeError("boom")
+
+    with uow:
+        assert [p.name for p in uow.products.list()] == ["P0", "P1", "P2"]
+        assert uow.products.get(1).quantity == 10
+
+
+def test_commit_rejects_stale_writes(store):
+    first, second = InMemoryUnitOfWork(store), InMemoryUnitOfWork(store)
+    with first, second:
+        first.products.reserve_many({1: 4})
+        second.products.reserve_many({1: 4})
+        first.commit()
+        with pytest.raises(ConcurrentUpdateError):
+            second.commit()
+        second.rollback()
+
+    with first:
+        assert first.products.get(1).quantity == 6
+
+
+def test_retry_succeeds_after_concurrent_update(store):
+    service = WarehouseService(
+        InMemoryUnitOfWork(store), retry_policy=RetryPolicy(base_delay=0)
+    )
+    product = service.get_product_details(2)
+    with InMemoryUnitOfWork(store) as uow:
+        uow.products.reserve_many({2: 1})
+
+    product.quantity = 50
+    with pytest.raises(ConcurrentUpdateError):
+        with InMemoryUnitOfWork(store) as uow:
+            uow.products.update(product)
+    assert service.update_product_stock(2, 50).version == 2
+
+
+def test_iterators_page_and_filter_like_sql(store):
+    service = WarehouseService(InMemoryUnitOfWork(store))
+    for _ in range(5):
+        service.create_order([(3, 1)])
+
+    assert [p.id for p in service.list_all_products(limit=2, after_id=1)] == [2, 3]
+    assert [o.id for o in service.iter_orders(after_id=1, max_id=4)] == [2, 3, 4]
+    future = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(days=1)
+    assert list(service.iter_orders(created_from=future)) == []
+    summaries = service.list_order_summaries(limit=2, after_id=3)
+    assert [(s.id, s.total_cost, s.item_count) for s in summaries] == [
+        (4, 3.0, 1),
+        (5, 3.0, 1),
+    ]
+
+
+def test_orders_keep_given_creation_time(store):
+    uow = InMemoryUnitOfWork(store)
+    created_at = datetime(2024, 5, 1, 12, 0)
+    order = Order(id=None, created_at=created_at)
+    with uow:
+        order.add_item(uow.products.get(1), 1)
+        uow.orders.add(order)
+        uow.commit()
+
+    assert WarehouseService(uow).get_order(order.id).created_at == created_at
+
+
+def test_save_and_load_round_trip(store, tmp_path):
+    service = WarehouseService(InMemoryUnitOfWork(store))
+    service.create_order([(1, 3)])
+    path = tmp_path / "warehouse.snapshot"
+
+    store.save(str(path))
+    loaded = InMemoryStore.load(str(path))
+
+    service = WarehouseService(InMemoryUnitOfWork(loaded))
+    assert service.get_product_details(1).quantity == 7
+    assert service.get_order(1).items[0].quantity_ordered == 3
+    assert service.create_product("New", 1, 1.0).id == 4
+
+
+def test_search_products_matches_word_prefixes(store):
+    service = WarehouseService(InMemoryUnitOfWork(store))
+    for name in ["Bolt M8", "Red bolt", "Bolt", "Nut M8", "Café", "foo_bar"]:
+        service.create_product(name, 1, 1.0)
+
+    assert [p.name for p in service.search_products("bol")] == [
+        "Bolt",
+        "Bolt M8",
+        "Red bolt",
+    ]
+    assert [p.name for p in service.search_products("m8 bolt")] == ["Bolt M8"]
+    assert [p.name for p in service.search_products("cafe")] == ["Café"]
+    assert [p.name for p in service.search_products("bar")] == ["foo_bar"]
+    assert service.search_products("b") == []
+
+
+def test_adjust_stock_bulk_matches_sqlite_semantics(store):
+    service = WarehouseService(InMemoryUnitOfWork(store))
+
+    report = service.adjust_stock_bulk([(1, 5), (2, -11), (1, -3), (9, 1)])
+
+    assert (report.records, report.applied) == (4, 1)
+    assert report.unknown_ids == [9]
+    assert report.negative_stock == {2: -1}
+    assert service.get_product_details(1).quantity == 12
+    assert service.get_product_details(2).quantity == 10
@@ -0,0 +1,84 @@
+from sqlalchemy import inspect
+
+from infrastructure.database import create_warehouse_engine
+from infrastructure.migrations import (
+    LATEST_VERSION,
+    current_version,
+    migrate,
+    schema_is_current,
+)
+
+LEGACY_SCHEMA = [
+    "CREATE TABLE products (id INTEGER PRIMARY KEY, name VARCHAR, "
+    "quantity INTEGER, price FLOAT)",
+    "CREATE TABLE orders (id INTEGER PRIMARY KEY)",
+    "CREATE TABLE order_items (id INTEGER PRIMARY KEY, "
+    "order_id INTEGER NOT NULL REFERENCES orders (id), "
+    "product_id INTEGER NOT NULL REFERENCES products (id), "
+    "quantity_ordered INTEGER NOT NULL, price_at_purchase FLOAT NOT NULL)",
+    "INSERT INTO products (name, quantity, price) VALUES ('Bolt', 5, 1.5)",
+    "INSERT INTO orders (id) VALUES (1)",
+    "INSERT INTO order_items (order_id, product_id, quantity_ordered, "
+    "price_at_purchase) VALUES (1, 1, 2, 1.5), (1, 1, 1, 2.0)",
+]
+
+
+def index_names(engine, table):
+    return {index["name"] for index in inspect(engine).get_indexes(table)}
+
+
+def test_migrate_upgrades_legacy_database_in_place(tmp_path):
+    engine = create_warehouse_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.exec_driver_sql(statement)
+
+    applied = migrate(engine)
+
+    assert [m.version for m in applied] == list(range(1, LATEST_VERSION + 1))
+    assert {"ix_order_items_order_id", "ix_order_items_product_id"} <= index_names(
+        engine, "order_items"
+    )
+    assert "ix_products_name" in index_names(engine, "products")
+    with engine.connect() as conn:
+        assert current_version(conn) == LATEST_VERSION
+        assert conn.exec_driver_sql("SELECT name FROM products").scalar() == "Bolt"
+        assert conn.exec_driver_sql(
+            "SELECT rowid FROM products_fts WHERE products_fts MATCH 'bol*'"
+        ).all() == [(1,)]
+        assert (
+            conn.exec_driver_sql("SELECT COUNT(*) FROM order_snapshots").scalar() == 0
+        )
+    with engine.begin() as conn:
+        conn.exec_driver_sql("UPDATE products SET quantity = 4")
+        assert conn.exec_driver_sql("SELECT * FROM product_changes").all() == [(1, 1)]
+    engine.dispose()
+
+
+def test_migrate_is_idempotent_on_fresh_schema(engine):
+    assert migrate(engine)
+    assert migrate(engine) == []
+    with engine.connect() as conn:
+        assert current_version(conn) == LATEST_VERSION
+
+
+def test_migrate_backfills_order_totals(tmp_path):
+    engine = create_warehouse_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.exec_driver_sql(statement)
+
+    migrate(engine)
+
+    with engine.connect() as conn:
+        row = conn.exec_driver_sql(
+            "SELECT total_cost, item_count, created_at FROM orders WHERE id = 1"
+        ).one()
+    assert tuple(row) == (5.0, 2, None)
+    engine.dispose()
+
+
+def test_schema_is_current_only_after_migrations(engine):
+    assert not schema_is_current(engine)
+    migrate(engine)
+    assert schema_is_current(engine)
@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select
+
+from domain.models import Order, OrderItem, Product
+from domain.services import WarehouseService
+from infrastructure.instrumentation import assert_max_queries
+from infrastructure.order_cache import OrderCache, decode_order, encode_order
+from infrastructure.orm import OrderSnapshotORM
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+
+
+@pytest.mark.parametrize("created_at", [datetime(2025, 3, 1, 12, 30, 0, 123456), None])
+def test_snapshot_round_trip(created_at):
+    bolt = Product(1, "Болт М8", 7, 1.25, 3)
+    order = Order(
+        id=42,
+        created_at=created_at,
+        items=[OrderItem(bolt, 2, 1.2), OrderItem(Product(2, "", 0, 0.5), 1, 0.5)],
+    )
+    order.items.append(OrderItem(bolt, 1, 1.25))
+
+    decoded = decode_order(encode_order(order))
+
+    assert decoded == order
+    assert decoded.items[0].product is decoded.items[2].product
+
+
+def test_repeated_lookups_skip_the_database(engine, session_factory, service):
+    order_id = service.create_order([(1, 2), (2, 1)]).id
+    cache = OrderCache()
+    cached = WarehouseService(SqlAlchemyUnitOfWork(session_factory, order_cache=cache))
+    first = cached.get_order(order_id)
+
+    with assert_max_queries(engine, 0):
+        again = cached.get_order(order_id)
+
+    assert again == first
+    assert again is not first
+    assert cached.get_order(999) is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_persisted_snapshots_survive_restart(engine, session_factory, service):
+    writer = WarehouseService(
+        SqlAlchemyUnitOfWork(session_factory, order_cache=OrderCache(persist=True))
+    )
+    order = writer.create_order([(1, 3)])
+    with pytest.raises(RuntimeError):
+        with writer.uow:
+            writer.uow.orders.add(
+                Order(id=None, items=[OrderItem(order.items[0].product, 1, 1.5)])
+            )
+            raise RuntimeError("abort")
+
+    restarted = OrderCache(persist=True)
+    reader = WarehouseService(
+        SqlAlchemyUnitOfWork(session_factory, order_cache=restarted)
+    )
+    with assert_max_queries(engine, 2) as log:
+        loaded = reader.get_order(order.id)
+
+    assert "order_items" not in " ".join(q.statement for q in log.queries)
+    assert [(i.product.name, i.quantity_ordered) for i in loaded.items] == [("Bolt", 3)]
+    with engine.connect() as conn:
+        assert conn.scalar(select(func.count()).select_from(OrderSnapshotORM)) == 1
@@ -0,0 +1,57 @@
+import random
+
+from sqlalchemy import func, select
+
+from domain.models import Product
+from domain.services import RetryPolicy
+from infrastructure.order_runner import run_orders
+from infrastructure.orm import OrderItemORM, ProductORM
+from infrastructure.repositories import SqlAlchemyProductRepository
+
+INITIAL_STOCK = 40
+
+
+def test_parallel_workers_never_oversell(engine, session):
+    repo = SqlAlchemyProductRepository(session)
+    repo.add_many(
+        Product(id=None, name=f"Hot {i}", quantity=INITIAL_STOCK, price=1.0)
+        for i in range(3)
+    )
+    session.commit()
+    rng = random.Random(7)
+    orders = [
+        [(rng.randint(1, 3), rng.randint(1, 3)) for _ in range(rng.randint(1, 3))]
+        for _ in range(150)
+    ]
+
+    outcomes = list(
+        run_orders(
+            orders,
+            database_url=str(engine.url),
+            preset="wal",
+            workers=4,
+            cache_size=16,
+            retry_policy=RetryPolicy(attempts=20, base_delay=0.001),
+            chunksize=4,
+        )
+    )
+
+    assert [o.error for o in outcomes if o.error] == []
+    placed = {}
+    for outcome in outcomes:
+        for product_id, quantity in outcome.items:
+            placed[product_id] = placed.get(product_id, 0) + quantity
+    ordered = dict(
+        session.execute(
+            select(
+                OrderItemORM.product_id, func.sum(OrderItemORM.quantity_ordered)
+            ).group_by(OrderItemORM.product_id)
+        ).all()
+    )
+    stock = dict(session.execute(select(ProductORM.id, ProductORM.quantity)).all())
+
+    assert ordered == placed
+    for product_id, quantity in stock.items():
+        assert quantity >= 0
+        assert quantity == INITIAL_STOCK - placed.get(product_id, 0)
+    assert sum(placed.values()) == 3 * INITIAL_STOCK - sum(stock.values())
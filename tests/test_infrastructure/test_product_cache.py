@@ -0,0 +1,116 @@
+import pytest
+
+from domain.models import Product
+from domain.services import RetryPolicy, WarehouseService
+from infrastructure.product_cache import ProductCache
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+
+
+def product(product_id, quantity=1):
+    return Product(id=product_id, name=f"P{product_id}", quantity=quantity, price=1.0)
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ProductCache(max_size=2)
+    for product_id in (1, 2):
+        cache.put(product(product_id), cache.generation)
+    cache.get(1)
+    cache.put(product(3), cache.generation)
+
+    assert cache.get(2) is None
+    assert cache.get(1).id == 1
+    assert cache.stats() == {
+        "size": 2,
+        "hits": 2,
+        "misses": 1,
+        "evictions": 1,
+        "invalidations": 0,
+    }
+
+
+def test_cache_entries_expire_after_ttl():
+    now = [0.0]
+    cache = ProductCache(ttl=5, clock=lambda: now[0])
+    cache.put(product(1), cache.generation)
+
+    now[0] = 4.0
+    assert cache.get(1) is not None
+    now[0] = 10.0
+    assert cache.get(1) is None
+
+
+def test_cache_returns_copies():
+    cache = ProductCache()
+    cache.put(product(1, quantity=5), cache.generation)
+
+    cache.get(1).quantity = 0
+
+    assert cache.get(1).quantity == 5
+
+
+def test_cache_rejects_rows_read_before_invalidation():
+    cache = ProductCache()
+    generation = cache.generation
+    cache.invalidate([1])
+
+    cache.put(product(1), generation)
+
+    assert cache.get(1) is None
+
+
+@pytest.fixture
+def cached_service(session_factory):
+    cache = ProductCache()
+    service = WarehouseService(SqlAlchemyUnitOfWork(session_factory, cache))
+    return service, cache
+
+
+def test_committed_writes_invalidate_cached_stock(cached_service):
+    service, cache = cached_service
+    created = service.create_product(name="Bolt", quantity=10, price=1.0)
+    assert service.get_product_details(created.id).quantity == 10
+    assert service.get_product_details(created.id).quantity == 10
+
+    service.create_order([(created.id, 3)])
+    assert service.get_product_details(created.id).quantity == 7
+
+    service.update_product_stock(created.id, 42)
+    assert service.get_product_details(created.id).quantity == 42
+
+    service.adjust_stock_bulk([(created.id, 8)])
+    assert service.get_product_details(created.id).quantity == 50
+    assert cache.hits == 3
+    assert cache.invalidations == 3
+
+
+def test_rolled_back_writes_keep_cache(cached_service, session_factory):
+    service, cache = cached_service
+    created = service.create_product(name="Bolt", quantity=10, price=1.0)
+    service.get_product_details(created.id)
+
+    uow = SqlAlchemyUnitOfWork(session_factory, cache)
+    with pytest.raises(RuntimeError):
+        with uow:
+            uow.products.reserve_many({created.id: 4})
+            assert uow.products.get(created.id).quantity == 6
+            raise RuntimeError("abort")
+
+    assert service.get_product_details(created.id).quantity == 10
+    assert cache.invalidations == 0
+
+
+def test_conflicts_evict_stale_entries(session_factory):
+    cache = ProductCache()
+    service = WarehouseService(
+        SqlAlchemyUnitOfWork(session_factory, cache),
+        retry_policy=RetryPolicy(attempts=2, base_delay=0),
+    )
+    other_process = WarehouseService(SqlAlchemyUnitOfWork(session_factory))
+    created = service.create_product(name="Bolt", quantity=5, price=1.0)
+    service.get_product_details(created.id)
+
+    other_process.create_order([(created.id, 4)])
+    order = service.create_order([(created.id, 3)])
+
+    assert order.items == []
+    assert service.get_product_details(created.id).quantity == 1
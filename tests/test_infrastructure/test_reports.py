@@ -0,0 +1,81 @@
+from datetime import datetime
+
+import pytest
+
+from domain.models import Order, Product
+from infrastructure.orm import OrderORM
+from infrastructure.repositories import (
+    SqlAlchemyOrderRepository,
+    SqlAlchemyProductRepository,
+    SqlAlchemySalesReportRepository,
+)
+
+
+@pytest.fixture
+def reports(session):
+    products = SqlAlchemyProductRepository(session)
+    orders = SqlAlchemyOrderRepository(session)
+    products.add_many(
+        [
+            Product(id=None, name="Bolt", quantity=100, price=1.0),
+            Product(id=None, name="Nut", quantity=100, price=5.0),
+            Product(id=None, name="Unsold", quantity=100, price=9.0),
+        ]
+    )
+    bolt, nut = products.get(1), products.get(2)
+    for lines in [[(bolt, 10)], [(bolt, 2), (nut, 1)], [(nut, 3)]]:
+        order = Order(id=None)
+        for product, quantity in lines:
+            order.add_item(product, quantity)
+        orders.add(order)
+    session.commit()
+    return SqlAlchemySalesReportRepository(session)
+
+
+def test_summary_aggregates_all_orders(reports):
+    summary = reports.summary()
+
+    assert summary.order_count == 3
+    assert summary.units_sold == 16
+    assert summary.revenue == pytest.approx(32.0)
+    assert summary.average_order_value == pytest.approx(32.0 / 3)
+
+
+def test_summary_respects_order_window(reports):
+    summary = reports.summary(after_id=1, max_id=2)
+
+    assert (summary.order_count, summary.units_sold) == (1, 3)
+    assert summary.revenue == pytest.approx(7.0)
+
+
+def test_product_sales_ranked_by_revenue_and_units(reports):
+    by_revenue = reports.product_sales()
+    by_units = reports.product_sales(order_by="units", limit=1)
+
+    assert [(s.name, s.units_sold, s.revenue) for s in by_revenue] == [
+        ("Nut", 4, 20.0),
+        ("Bolt", 12, 12.0),
+    ]
+    assert [s.name for s in by_units] == ["Bolt"]
+
+
+def test_empty_window_reports_zero(reports):
+    summary = reports.summary(after_id=10)
+
+    assert (summary.order_count, summary.units_sold, summary.revenue) == (0, 0, 0.0)
+    assert summary.average_order_value == 0.0
+    assert reports.product_sales(after_id=10) == []
+
+
+def test_reports_filter_by_creation_time(reports, session):
+    session.execute(
+        OrderORM.__table__.update()
+        .where(OrderORM.id == 1)
+        .values(created_at=datetime(2024, 1, 1))
+    )
+
+    summary = reports.summary(created_to=datetime(2024, 1, 2))
+    recent = reports.product_sales(created_from=datetime(2024, 1, 2))
+
+    assert (summary.order_count, summary.units_sold) == (1, 10)
+    assert [(s.name, s.units_sold) for s in recent] == [("Nut", 4), ("Bolt", 2)]
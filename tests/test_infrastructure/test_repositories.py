@@ -0,0 +1,232 @@
+from datetime import datetime, timedelta
+
+import pytest
+from domain.exceptions import ConcurrentUpdateError
+from domain.models import Order, Product
+from infrastructure.repositories import (
+    SqlAlchemyOrderRepository,
+    SqlAlchemyProductRepository,
+)
+
+
+@pytest.fixture
+def products(session):
+    repo = SqlAlchemyProductRepository(session)
+    for name, quantity in [("Bolt", 10), ("Nut", 3), ("Washer", 0)]:
+        repo.add(Product(id=None, name=name, quantity=quantity, price=1.5))
+    session.commit()
+    return repo
+
+
+def test_get_many_returns_only_existing_products(products):
+    found = products.get_many([1, 3, 42])
+
+    assert sorted(found) == [1, 3]
+    assert found[1].name == "Bolt"
+    assert found[3].quantity == 0
+
+
+def test_reserve_many_decrements_stock(products, session):
+    products.reserve_many({1: 4, 2: 3})
+    session.commit()
+
+    assert products.get(1).quantity == 6
+    assert products.get(2).quantity == 0
+
+
+def test_reserve_many_refuses_to_oversell(products, session):
+    with pytest.raises(ConcurrentUpdateError):
+        products.reserve_many({1: 1, 2: 4})
+    session.rollback()
+
+    assert products.get(1).quantity == 10
+    assert products.get(2).quantity == 3
+
+
+def test_adjust_stock_many_reports_rejected_products(products, session):
+    result = products.adjust_stock_many({1: 5, 2: -4, 3: 0, 42: 1})
+    session.commit()
+
+    assert result.applied == 2
+    assert result.unknown_ids == [42]
+    assert result.negative_stock == {2: -1}
+    assert [(p.quantity, p.version) for p in products.get_many([1, 2, 3]).values()] == [
+        (15, 1),
+        (3, 0),
+        (0, 1),
+    ]
+
+
+def test_reserve_many_refreshes_loaded_products(products):
+    products.get(1)
+
+    products.reserve_many({1: 2})
+
+    assert products.get(1).quantity == 8
+
+
+def test_order_add_bulk_inserts_items(products, session):
+    orders = SqlAlchemyOrderRepository(session)
+    bolt, nut = products.get(1), products.get(2)
+    order = Order(id=None)
+    order.add_item(bolt, 2)
+    order.add_item(nut, 1)
+
+    orders.add(order)
+    session.commit()
+
+    assert order.id == 1
+    stored = orders.get(order.id)
+    assert [(i.product.name, i.quantity_ordered) for i in stored.items] == [
+        ("Bolt", 2),
+        ("Nut", 1),
+    ]
+    assert stored.total_order_cost == order.total_order_cost
+
+
+def test_order_add_rejects_unknown_products(products, session):
+    orders = SqlAlchemyOrderRepository(session)
+    order = Order(id=None)
+    order.add_item(Product(id=99, name="Ghost", quantity=1, price=1.0), 1)
+
+    with pytest.raises(ValueError, match="99"):
+        orders.add(order)
+
+
+def test_iter_products_pages_by_id(products, session):
+    products.add_many(
+        Product(id=None, name=f"Extra {i}", quantity=i, price=1.0) for i in range(4)
+    )
+
+    listed = list(products.iter_products(batch_size=2))
+    after = list(products.iter_products(batch_size=2, after_id=5))
+
+    assert [p.id for p in listed] == [1, 2, 3, 4, 5, 6, 7]
+    assert [p.name for p in after] == ["Extra 2", "Extra 3"]
+
+
+def test_iter_orders_loads_batches_with_shared_products(products, session):
+    orders = SqlAlchemyOrderRepository(session)
+    bolt, nut = products.get(1), products.get(2)
+    for quantities in [(1, 1), (2, 0), (3, 1), (4, 0)]:
+        order = Order(id=None)
+        order.add_item(bolt, quantities[0])
+        if quantities[1]:
+            order.add_item(nut, quantities[1])
+        orders.add(order)
+    session.commit()
+
+    loaded = list(orders.iter_orders(batch_size=3))
+    ranged = list(orders.iter_orders(batch_size=3, after_id=1, max_id=3))
+
+    assert [o.id for o in loaded] == [1, 2, 3, 4]
+    assert [len(o.items) for o in loaded] == [2, 1, 2, 1]
+    assert loaded[0].items[0].product is loaded[2].items[0].product
+    assert loaded[0].items[0].product is not loaded[3].items[0].product
+    assert [o.id for o in ranged] == [2, 3]
+    assert [o.id for o in orders.list()] == [1, 2, 3, 4]
+
+
+def test_update_rejects_stale_version(products, session_factory):
+    first = SqlAlchemyProductRepository(session_factory())
+    second = SqlAlchemyProductRepository(session_factory())
+    stale = second.get(1)
+    second.session.commit()
+
+    fresh = first.get(1)
+    fresh.quantity = 7
+    first.update(fresh)
+    first.session.commit()
+    stale.quantity = 9
+
+    assert fresh.version == 1
+    with pytest.raises(ConcurrentUpdateError):
+        second.update(stale)
+    second.session.rollback()
+    assert second.get(1).quantity == 7
+    first.session.close()
+    second.session.close()
+
+
+def test_update_unknown_product_raises_value_error(products):
+    with pytest.raises(ValueError, match="not found"):
+        products.update(Product(id=99, name="Ghost", quantity=1, price=1.0))
+
+
+def test_order_add_stores_denormalized_totals(products, session):
+    orders = SqlAlchemyOrderRepository(session)
+    order = Order(id=None)
+    order.add_item(products.get(1), 2)
+    order.add_item(products.get(2), 3)
+    orders.add(order)
+    session.commit()
+
+    (summary,) = orders.list_summaries()
+
+    assert (summary.id, summary.item_count) == (order.id, 2)
+    assert summary.total_cost == order.total_order_cost == 7.5
+    assert summary.created_at == order.created_at
+    assert orders.get(order.id).created_at == order.created_at
+
+
+def test_orders_filter_by_creation_time(products, session):
+    orders = SqlAlchemyOrderRepository(session)
+    cutoff = datetime(2024, 5, 1, 12, 0)
+    for created_at in (cutoff - timedelta(seconds=1), cutoff):
+        order = Order(id=None, created_at=created_at)
+        order.add_item(products.get(1), 1)
+        orders.add(order)
+    session.commit()
+    later = cutoff + timedelta(seconds=1)
+
+    assert [o.id for o in orders.iter_orders(created_from=cutoff)] == [2]
+    assert [s.id for s in orders.list_summaries(created_to=cutoff)] == [1]
+    assert list(orders.iter_orders(created_from=later)) == []
+    assert orders.list_summaries(created_from=datetime(2000, 1, 1), limit=1)[0].id == 1
+
+
+def test_search_products_matches_word_prefixes_by_rank(session):
+    repo = SqlAlchemyProductRepository(session)
+    for name in [
+        "Bolt M8 zinc",
+        "Red bolt",
+        "Bolt",
+        "Nut M8",
+        "Bolster",
+        "Café",
+        "foo_bar",
+    ]:
+        repo.add(Product(id=None, name=name, quantity=1, price=1.0))
+    session.commit()
+
+    assert {p.name for p in repo.search_products("bol")} == {
+        "Bolt M8 zinc",
+        "Red bolt",
+        "Bolt",
+        "Bolster",
+    }
+    assert [p.name for p in repo.search_products("bolt")][0] == "Bolt"
+    assert [p.name for p in repo.search_products("m8 BOL")] == ["Bolt M8 zinc"]
+    assert [p.name for p in repo.search_products("cafe")] == ["Café"]
+    assert [p.name for p in repo.search_products("bar")] == ["foo_bar"]
+    assert [p.name for p in repo.search_products("CAFÉ")] == ["Café"]
+    assert repo.search_products("b") == []
+    assert repo.search_products('"*') == []
+    assert len(repo.search_products("bol", limit=2)) == 2
+
+
+def test_search_index_follows_renames_but_not_stock_updates(session):
+    repo = SqlAlchemyProductRepository(session)
+    repo.add(Product(id=None, name="Bolt", quantity=5, price=1.0))
+    session.commit()
+
+    product = repo.get(1)
+    product.name = "Hex nut"
+    repo.update(product)
+    repo.reserve_many({1: 2})
+    session.commit()
+
+    assert repo.search_products("bolt") == []
+    assert [(p.name, p.quantity) for p in repo.search_products("hex")] == [
+        ("Hex nut", 3)
+    ]
@@ -0,0 +1,190 @@
+import threading
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+
+from domain.models import Order, Product
+from domain.services import ReportingService, WarehouseService
+from infrastructure.orm import Base, OrderORM
+from infrastructure.sharding import (
+    HashRouter,
+    RangeRouter,
+    ShardedUnitOfWork,
+    create_shard_engines,
+    shard_urls,
+)
+
+
+def test_routers_allocate_only_owned_ids():
+    hashed = HashRouter(3)
+    assert [hashed.next_id(1, last) for last in (None, 1, 2, 4)] == [1, 4, 4, 7]
+    assert hashed.next_id(0, None) == 3
+    assert hashed.shard_for(7) == 1
+
+    ranged = RangeRouter(2, range_size=10)
+    assert (ranged.next_id(0, None), ranged.next_id(1, None)) == (1, 11)
+    assert [ranged.shard_for(i) for i in (1, 10, 11, 25, 0)] == [0, 0, 1, 1, 0]
+    with pytest.raises(ValueError):
+        ranged.next_id(0, 10)
+
+
+def test_shard_urls():
+    assert shard_urls("sqlite:///data/warehouse.db", 2) == [
+        "sqlite:///data/warehouse.shard0.db",
+        "sqlite:///data/warehouse.shard1.db",
+    ]
+    with pytest.raises(ValueError):
+        shard_urls("sqlite://", 2)
+
+
+@pytest.fixture(
+    params=[HashRouter(2), RangeRouter(2, range_size=2)], ids=["hash", "range"]
+)
+def router(request):
+    return request.param
+
+
+@pytest.fixture
+def shard_engines(tmp_path, router):
+    engines = create_shard_engines(
+        router.shard_count, f"sqlite:///{tmp_path / 'warehouse.db'}", preset="wal"
+    )
+    for engine in engines:
+        Base.metadata.create_all(engine)
+    yield engines
+    for engine in engines:
+        engine.dispose()
+
+
+@pytest.fixture
+def uow(shard_engines, router):
+    return ShardedUnitOfWork(
+        [sessionmaker(bind=engine, autoflush=False) for engine in shard_engines],
+        router,
+    )
+
+
+@pytest.fixture
+def service(uow):
+    service = WarehouseService(uow)
+    service.create_products_bulk(
+        [
+            Product(None, name, 10, price)
+            for name, price in [("Bolt", 1.0), ("Nut", 2.0)]
+        ]
+    )
+    service.create_product("Washer", 10, 0.5)
+    return service
+
+
+@pytest.fixture
+def products(service):
+    return {product.name: product for product in service.list_all_products()}
+
+
+def test_products_are_routed_and_merged(service, products, shard_engines, router):
+    listed = service.list_all_products()
+
+    assert [p.id for p in listed] == sorted(p.id for p in listed)
+    assert {router.shard_for(p.id) for p in listed} == {0, 1}
+    for product in listed:
+        with shard_engines[router.shard_for(product.id)].connect() as conn:
+            name = conn.exec_driver_sql(
+                "SELECT name FROM products WHERE id = ?", (product.id,)
+            ).scalar()
+        assert name == product.name
+    assert service.get_product_details(products["Nut"].id) == products["Nut"]
+    assert [p.name for p in service.search_products("wa")] == ["Washer"]
+    assert service.list_all_products(limit=1, after_id=listed[0].id) == listed[1:2]
+
+
+def test_cross_shard_order_and_reports(service, products):
+    bolt, nut, washer = products["Bolt"], products["Nut"], products["Washer"]
+    first = service.create_order([(bolt.id, 2), (nut.id, 2)])
+    second = service.create_order([(washer.id, 2)])
+
+    loaded = service.get_order(first.id)
+    assert sorted((i.product.name, i.quantity_ordered) for i in loaded.items) == [
+        ("Bolt", 2),
+        ("Nut", 2),
+    ]
+    assert service.get_product_details(nut.id).quantity == 8
+    assert [o.id for o in service.iter_orders()] == sorted([first.id, second.id])
+    summaries = {s.id: s for s in service.list_order_summaries()}
+    assert (summaries[first.id].item_count, summaries[first.id].total_cost) == (2, 6.0)
+    assert len(service.list_order_summaries(limit=1)) == 1
+
+    reports = ReportingService(service.uow)
+    summary = reports.sales_summary()
+    assert (summary.order_count, summary.units_sold, summary.revenue) == (2, 6, 7.0)
+    assert [s.name for s in reports.top_products(limit=2)] == ["Nut", "Bolt"]
+
+
+def test_orders_keep_given_creation_time(service, products):
+    created_at = datetime(2024, 5, 1, 12, 0)
+    order = Order(id=None, created_at=created_at)
+    order.add_item(products["Bolt"], 1)
+    order.add_item(products["Washer"], 1)
+    with service.uow:
+        service.uow.orders.add(order)
+        service.uow.commit()
+
+    assert service.get_order(order.id).created_at == created_at
+
+
+def test_failed_commit_undoes_committed_shards(
+    service, products, shard_engines, monkeypatch
+):
+    uow = service.uow
+    commit = Session.commit
+
+    def fail_on_second_shard(session):
+        if session is uow.shards.open.get(1):
+            raise OperationalError("COMMIT", {}, Exception("disk I/O error"))
+        commit(session)
+
+    monkeypatch.setattr(Session, "commit", fail_on_second_shard)
+    with pytest.raises(OperationalError):
+        service.create_order([(p.id, 1) for p in products.values()])
+    monkeypatch.undo()
+
+    assert {p.name: p.quantity for p in service.list_all_products()} == dict.fromkeys(
+        products, 10
+    )
+    for engine in shard_engines:
+        with engine.connect() as conn:
+            assert conn.scalar(select(func.count()).select_from(OrderORM)) == 0
+
+
+def test_concurrent_creates_on_one_shard_get_distinct_ids(tmp_path):
+    # The default preset takes no lock before the first write.
+    engines = create_shard_engines(
+        2, f"sqlite:///{tmp_path / 'warehouse.db'}", preset="default"
+    )
+    for engine in engines:
+        Base.metadata.create_all(engine)
+    factories = [sessionmaker(bind=engine) for engine in engines]
+    router = HashRouter(2)
+    first = ShardedUnitOfWork(factories, router)
+    second = WarehouseService(ShardedUnitOfWork(factories, router))
+    created = []
+    try:
+        with first:
+            first.products.add(Product(None, "Bolt", 1, 1.0))
+            thread = threading.Thread(
+                target=lambda: created.append(second.create_product("Nut", 1, 1.0))
+            )
+            thread.start()
+            time.sleep(0.2)
+            first.commit()
+        thread.join()
+
+        assert [p.name for p in second.list_all_products()] == ["Bolt", "Nut"]
+        assert created[0].id == 4
+    finally:
+        for engine in engines:
+            engine.dispose()
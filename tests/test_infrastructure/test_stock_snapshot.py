@@ -0,0 +1,95 @@
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm import sessionmaker
+
+from domain.services import WarehouseService
+from infrastructure import snapshot_export
+from infrastructure.database import create_warehouse_engine
+from infrastructure.orm import Base, ProductORM
+from infrastructure.snapshot_export import export_snapshot
+from infrastructure.stock_snapshot import (
+    StockRecord,
+    StockSnapshot,
+    pack_names,
+    write_snapshot,
+)
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+
+
+def test_lookups_and_low_stock(tmp_path):
+    path = str(tmp_path / "stock.snapshot")
+    names, name_ends = pack_names(["Болт".encode(), b"", b"Nut"])
+    write_snapshot(path, [2, 5, 9], [7, 0, 3], [1.5, 2.0, 0.25], names, name_ends, 9, 4)
+
+    with StockSnapshot(path) as snapshot:
+        assert (len(snapshot), snapshot.max_id, snapshot.change_seq) == (3, 9, 4)
+        assert snapshot.get(2) == StockRecord(2, "Болт", 7, 1.5)
+        assert snapshot.get(5) == StockRecord(5, "", 0, 2.0)
+        assert snapshot.get(9).name == "Nut"
+        assert snapshot.get(3) is None
+        assert snapshot.get(10) is None
+        assert snapshot.low_stock(4) == [5, 9]
+        assert snapshot.low_stock(0) == []
+        assert [record.id for record in snapshot] == [2, 5, 9]
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "stock.snapshot"
+    path.write_bytes(b"id,quantity\n" * 10)
+    with pytest.raises(ValueError):
+        StockSnapshot(str(path))
+
+
+def test_incremental_refresh_matches_full_export(engine, service, tmp_path):
+    path = str(tmp_path / "stock.snapshot")
+    assert export_snapshot(engine, path).products == 3
+
+    service.adjust_stock_bulk([(1, -99), (3, -100)])
+    service.create_product("New", 0, 3.0)
+    with engine.begin() as conn:
+        conn.execute(
+            update(ProductORM).where(ProductORM.id == 2).values(name="Renamed")
+        )
+    refreshed = export_snapshot(engine, path)
+    export_snapshot(engine, str(tmp_path / "full.snapshot"), full=True)
+
+    assert (refreshed.incremental, refreshed.added, refreshed.changed) == (True, 1, 3)
+    with (
+        StockSnapshot(path) as snapshot,
+        StockSnapshot(str(tmp_path / "full.snapshot")) as full,
+    ):
+        assert list(snapshot) == list(full)
+        assert snapshot.get(1).quantity == 1
+        assert snapshot.get(2).name == "Renamed"
+        assert sorted(snapshot.low_stock(2)) == [1, 3, 4]
+    assert export_snapshot(engine, path).changed == 0
+
+
+def test_products_added_during_refresh_are_left_for_the_next_one(tmp_path, monkeypatch):
+    # The default preset reads without a transaction, so the insert is visible.
+    engine = create_warehouse_engine(
+        f"sqlite:///{tmp_path / 'warehouse.db'}", preset="default"
+    )
+    Base.metadata.create_all(engine)
+    service = WarehouseService(SqlAlchemyUnitOfWork(sessionmaker(bind=engine)))
+    path = str(tmp_path / "stock.snapshot")
+    service.create_product("First", 1, 1.0)
+    export_snapshot(engine, path)
+    service.create_product("Second", 2, 1.0)
+
+    open_previous = snapshot_export._open_previous
+
+    def insert_during_refresh(*args):
+        previous = open_previous(*args)
+        service.create_product("Late", 3, 1.0)
+        return previous
+
+    monkeypatch.setattr(snapshot_export, "_open_previous", insert_during_refresh)
+    assert export_snapshot(engine, path).added == 1
+    monkeypatch.undo()
+    assert export_snapshot(engine, path).added == 1
+
+    with StockSnapshot(path) as snapshot:
+        assert [record.id for record in snapshot] == [1, 2, 3]
+        assert snapshot.max_id == 3
+    engine.dispose()
@@ -0,0 +1,64 @@
+import time
+
+import pytest
+from sqlalchemy import text, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from domain.services import WarehouseService
+from infrastructure.database import create_warehouse_engine
+from infrastructure.instrumentation import QueryLog, collect, instrument_engine
+from infrastructure.orm import ProductORM
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+
+
+@pytest.fixture
+def uow(service):
+    return service.uow
+
+
+def test_read_does_not_wait_for_writer(session_factory, uow):
+    writer = session_factory()
+    try:
+        writer.execute(update(ProductORM).values(quantity=0))
+        started = time.perf_counter()
+
+        product = WarehouseService(uow).get_product_details(1)
+
+        assert time.perf_counter() - started < 1
+        assert product.quantity == 100
+    finally:
+        writer.close()
+
+
+def test_read_unit_of_work_never_commits(engine, uow):
+    instrument_engine(engine)
+    with collect(QueryLog()) as log:
+        with uow.read() as reader:
+            assert reader.products.get(1).name == "Bolt"
+            with pytest.raises(RuntimeError):
+                reader.commit()
+
+    statements = [query.statement for query in log.queries]
+    assert statements[0] == "BEGIN DEFERRED"
+    assert "COMMIT" not in statements
+
+
+def test_reads_can_use_separate_engine(engine, session_factory, uow, tmp_path):
+    reader = create_warehouse_engine(
+        f"sqlite:///{tmp_path / 'warehouse.db'}", preset="read_only"
+    )
+    uow = SqlAlchemyUnitOfWork(
+        session_factory, read_session_factory=sessionmaker(bind=reader)
+    )
+    try:
+        assert [p.name for p in WarehouseService(uow).list_all_products()] == [
+            "Bolt",
+            "Nut",
+            "Washer",
+        ]
+        with uow.read() as read_uow:
+            with pytest.raises(OperationalError):
+                read_uow.session.execute(text("DELETE FROM products"))
+    finally:
+        reader.dispose()